@@ -0,0 +1,98 @@
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from game import Game
+from batchSimulation import *
+
+
+class BatchSimulationTests:
+  """
+  Class: BatchSimulationTests
+  --------------------------
+  A class containing all tests for the BatchSimulator class.
+  --------------------------
+  """
+
+  def __init__(self):
+    pass
+
+  def createGameState(self, seed):
+    game = Game(playerAgentNums = [0, 0], seed = seed)
+    game.initializePlayers()
+    game.initializeSettlementsAndResourcesLumberBrick()
+    return game.gameState
+
+  def getActionKeys(self, simulator, gameIndex, playerIndex):
+    """
+    Method: getActionKeys
+    --------------------------
+    Returns the (ACTION, location ID) of each legal action of the given
+    player in one of the simulator's games, in order.
+    --------------------------
+    """
+    numEdges, numVertices = simulator.edgeOwner.shape[1], simulator.vertexOwner.shape[1]
+    keys = []
+    for position in simulator.getLegalActionMask(playerIndex)[gameIndex].nonzero()[0]:
+      if position < numEdges:
+        keys.append((ACTIONS.ROAD, position))
+      else:
+        keys.append((BATCH_ACTION_TYPES[1 if position < numEdges + numVertices else 2], (position - numEdges) % numVertices))
+    return keys
+
+  def testMatchesGameState(self):
+    print "Running testMatchesGameState....."
+    # Every simulated turn can be replayed with a GameState, which
+    # ends up with the same resources, victory points and legal actions
+    state = self.createGameState(seed = 2)
+    numGames = 3
+    simulator = BatchSimulator(state, numGames, seed = 2)
+    states = [state.deepCopy() for i in range(numGames)]
+    while (simulator.winners < 0).any():
+      playerIndex = simulator.currentPlayerIndex
+      rolls, actionTypes, locationIds = simulator.step()
+      for gameIndex, gameState in enumerate(states):
+        if gameState.gameOver() >= 0: continue
+        gameState.updatePlayerResourcesForDiceRoll(rolls[gameIndex])
+        actions = dict(((action[0], action[1].id), action) for action in gameState.getLegalActions(playerIndex))
+        if actionTypes[gameIndex] < 0:
+          assert(len(actions) == 0)
+          continue
+        action = actions[(BATCH_ACTION_TYPES[actionTypes[gameIndex]], locationIds[gameIndex])]
+        gameState.playerAgents[playerIndex].applyAction(action, gameState.board)
+        gameState.board.applyAction(playerIndex, action)
+
+      for gameIndex, gameState in enumerate(states):
+        assert(gameState.gameOver() == simulator.winners[gameIndex])
+        for agent in gameState.playerAgents:
+          assert(agent.resources.counts == list(simulator.resources[gameIndex, agent.agentIndex]))
+          assert(agent.victoryPoints == simulator.victoryPoints[gameIndex, agent.agentIndex])
+          assert([(action[0], action[1].id) for action in gameState.getLegalActions(agent.agentIndex)] ==
+            self.getActionKeys(simulator, gameIndex, agent.agentIndex))
+
+  def testRun(self):
+    print "Running testRun....."
+    # Simulators made with the same seed play the same games to the end
+    state = self.createGameState(seed = 3)
+    results = [BatchSimulator(state, 200, seed = 4).run() for i in range(2)]
+    for first, second in zip(*results):
+      assert((first == second).all())
+    # and every game either has a winner or was cut off
+    winners, turnNumbers, victoryPoints = results[0]
+    for winner, turnNumber, points in zip(winners, turnNumbers, victoryPoints):
+      assert(points[winner] >= VICTORY_POINTS_TO_WIN if winner >= 0 else turnNumber > CUTOFF_TURNS)
+
+  def runAllTests(self):
+    """
+    Method: runAllTests
+    --------------------------
+    Run all tests for this test class.
+    --------------------------
+    """
+    print "Running BatchSimulator tests...."
+    print "----------------------"
+
+    self.testMatchesGameState()
+    print "Success!"
+    self.testRun()
+    print "Success!"
@@ -171,7 +171,8 @@ class BoardTests:
       (Vertex(3,6), [10, 14, 15]), # testing odd, even
       (Vertex(0,2), [1]), # testing only one hex
       (Vertex(4,2), [7, 12]), # testing two hexes
-      (Vertex(3,1), [3, 7]) # testing two hexes
+      (Vertex(3,1), [3, 7]), # testing two hexes
+      (Vertex(5,4), [12, 16]) # testing the last row of vertices
       ])
 
     for vertex, hexes in testVertices:
@@ -181,6 +182,122 @@ class BoardTests:
         raise Exception("getHexes was wrong for vertex at " + str(vertex.X) + "," + str(vertex.Y) + "\n"
           + "Should have returned hexes " + str(hexes) + " but instead returned hexes " + str(outputHexList))
 
+  def testDeepCopy(self):
+    print "Testing deepCopy... "
+    board = Board(BeginnerLayout)
+    board.applyAction(0, (ACTIONS.SETTLE, board.getVertex(2, 4)))
+    board.applyAction(0, (ACTIONS.ROAD, board.getEdge(4, 4)))
+    copy = board.deepCopy()
+
+    # The copy shares the board's geometry, and has the same pieces...
+    assert(copy.topology is board.topology)
+    assert(copy.getVertex(2, 4).isSettlement and copy.getVertex(2, 4).player == 0)
+    assert(not copy.getVertex(2, 5).canSettle)
+    assert(copy.getEdge(4, 4).player == 0)
+    assert([(v.X, v.Y) for v in copy.allSettlements] == [(2, 4)])
+
+    # ...but building on the copy doesn't change the original
+    copy.applyAction(1, (ACTIONS.SETTLE, copy.getVertex(4, 4)))
+    copy.applyAction(0, (ACTIONS.CITY, copy.getVertex(2, 4)))
+    assert(board.getVertex(4, 4).canSettle and not board.getVertex(4, 4).isOccupied())
+    assert(board.getVertex(2, 4).isSettlement)
+    assert([(v.X, v.Y) for v in copy.allCities] == [(2, 4)])
+    assert(len(board.allCities) == 0)
+
+    # and the copy makes the same random choices as the original,
+    # without changing the ones the original goes on to make
+    copy = board.deepCopy()
+    copyChoices = [copy.random.random() for i in range(5)]
+    assert([board.random.random() for i in range(5)] == copyChoices)
+
+  def testBuildableMasks(self):
+    print "Testing getBuildableRoadMask and getSettleableMask... "
+    board = Board(BeginnerLayout)
+    locations = lambda pieces: sorted((piece.X, piece.Y) for piece in pieces)
+    board.applyAction(0, (ACTIONS.SETTLE, board.getVertex(2, 4)))
+    board.applyAction(0, (ACTIONS.ROAD, board.getEdge(4, 4)))
+    assert(locations(board.getEdgesInMask(board.getBuildableRoadMask(0))) == [(3, 5), (4, 3), (4, 5), (5, 4)])
+    assert(locations(board.getVerticesInMask(board.getSettleableMask(0))) == [])
+    assert(board.getBuildableRoadMask(1) == 0)
+
+    # Roads can't be built past another player's settlement
+    board.applyAction(1, (ACTIONS.SETTLE, board.getVertex(2, 6)))
+    board.applyAction(0, (ACTIONS.ROAD, board.getEdge(4, 5)))
+    assert(locations(board.getEdgesInMask(board.getBuildableRoadMask(0))) == [(3, 5), (4, 3), (5, 4)])
+    assert(locations(board.getEdgesInMask(board.getBuildableRoadMask(1))) == [(4, 6), (5, 6)])
+
+    # Settlements need to be at the end of a road, and obey the distance rule
+    board.applyAction(0, (ACTIONS.ROAD, board.getEdge(4, 3)))
+    assert(locations(board.getVerticesInMask(board.getSettleableMask(0))) == [])
+    board.applyAction(0, (ACTIONS.ROAD, board.getEdge(4, 2)))
+    assert(locations(board.getVerticesInMask(board.getSettleableMask(0))) == [(2, 2)])
+
+    # The road frontiers kept up to date by applyAction/undoAction should always
+    # match the frontiers computed from scratch
+    board = Board(BeginnerLayout)
+    undoLog = []
+    for action in [(1, (ACTIONS.SETTLE, board.getVertex(2, 6))), (0, (ACTIONS.SETTLE, board.getVertex(2, 4))),
+        (0, (ACTIONS.ROAD, board.getEdge(4, 4))), (0, (ACTIONS.ROAD, board.getEdge(4, 5))),
+        (1, (ACTIONS.ROAD, board.getEdge(5, 6))), (1, (ACTIONS.SETTLE, board.getVertex(2, 3))),
+        (0, (ACTIONS.CITY, board.getVertex(2, 4)))]:
+      frontiers = [board.getBuildableRoadMask(player) for player in range(NUM_PLAYERS)]
+      undoLog.append((action, board.applyAction(*action), frontiers))
+      for player in range(NUM_PLAYERS):
+        assert(board.getBuildableRoadMask(player) == board.computeBuildableRoadMask(player))
+    while len(undoLog) > 0:
+      (player, action), undoInfo, frontiers = undoLog.pop()
+      board.undoAction(player, action, undoInfo)
+      assert([board.getBuildableRoadMask(player) for player in range(NUM_PLAYERS)] == frontiers)
+
+  def testProduction(self):
+    print "Testing getProduction... "
+    board = Board(BeginnerLayout)
+    vertex = board.getVertex(2, 4)
+    expected = {}
+    for hexagon in board.getHexes(vertex):
+      if hexagon.resource != ResourceTypes.NOTHING:
+        expected[hexagon.diceValue] = [0] * NUM_RESOURCES
+        expected[hexagon.diceValue][RESOURCE_ORDER.index(hexagon.resource)] += 1
+    assert(len(expected) == 3)
+
+    # A settlement produces one of each surrounding resource, and a city two
+    undoInfos = []
+    for multiplier, action in [(1, (ACTIONS.SETTLE, vertex)), (2, (ACTIONS.CITY, vertex))]:
+      undoInfos.append(board.applyAction(0, action))
+      for roll in range(2, 13):
+        counts = [multiplier * count for count in expected.get(roll, [0] * NUM_RESOURCES)]
+        assert(board.getProduction(0, roll) == counts)
+        assert(board.getProduction(1, roll) == [0] * NUM_RESOURCES)
+    assert(board.deepCopy().state.production == board.state.production)
+
+    board.undoAction(0, (ACTIONS.CITY, vertex), undoInfos.pop())
+    board.undoAction(0, (ACTIONS.SETTLE, vertex), undoInfos.pop())
+    assert(board.state.production == [0] * len(board.state.production))
+
+  def testOpeningValues(self):
+    print "Testing rankOpeningPairs... "
+    board = Board(BeginnerLayout)
+    table = board.productionTable
+    # A vertex is expected to produce each of its tiles' resources
+    # as often as the tile's number is rolled
+    vertex = board.getVertex(2, 4)
+    expected = [0.0] * NUM_RESOURCES
+    for hexagon in board.getHexes(vertex):
+      if hexagon.resource != ResourceTypes.NOTHING:
+        expected[RESOURCE_ORDER.index(hexagon.resource)] += DICE_ROLL_PROBABILITIES[hexagon.diceValue]
+    assert(table.expectedProduction[vertex.id] == expected)
+    assert(table.hexagonCounts[vertex.id] == len(board.getHexes(vertex)))
+    assert(sum(table.resourceCounts[vertex.id].values()) == 3)
+
+    # Pairs are ranked best first, and never next to each other or settled
+    pairs = board.rankOpeningPairs()
+    values = [value for value, first, second in pairs]
+    assert(values == sorted(values, reverse = True))
+    assert(all(second not in board.getNeighborVertices(first) for value, first, second in pairs))
+    value, first, second = pairs[0]
+    board.applyAction(0, (ACTIONS.SETTLE, first))
+    assert(all(first not in (otherFirst, otherSecond) for value, otherFirst, otherSecond in board.rankOpeningPairs()))
+
   def runAllTests(self):
     self.testGetNeighborHexes()
     print "Success!"
@@ -195,4 +312,12 @@ class BoardTests:
     self.testGetEdgesOfVertex()
     print "Success!"
     self.testGetHexes()
-    print "Success!"
\ No newline at end of file
+    print "Success!"
+    self.testDeepCopy()
+    print "Success!"
+    self.testBuildableMasks()
+    print "Success!"
+    self.testProduction()
+    print "Success!"
+    self.testOpeningValues()
+    print "Success!"
@@ -0,0 +1,453 @@
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import random
+from board import *
+import game as gameModule
+from game import GameState, Game, deserializeGameState
+from agents import PlayerAgent, PlayerAgentAlphaBeta, getActionKey, betterEvalFn, builderEvalFn, resourceEvalFn
+from gameEvents import RecordingEventSink
+
+
+class UnorderedAlphaBeta(PlayerAgentAlphaBeta):
+  """
+  Class: UnorderedAlphaBeta
+  --------------------------
+  A PlayerAgentAlphaBeta that tries actions in getLegalActions' order.
+  --------------------------
+  """
+  __slots__ = ()
+
+  def orderActions(self, actions, currDepth, playerIndex, entry):
+    return list(actions)
+
+
+class GameStateTests:
+  """
+  Class: GameStateTests
+  --------------------------
+  A class containing all tests for the GameState class.
+  --------------------------
+  """
+
+  def __init__(self):
+    pass
+
+  def createGameState(self, playerAgentNums = [0, 0], seed = None):
+    """
+    Method: createGameState
+    --------------------------
+    Returns a GameState with two players (random ones unless other
+    player codes are given) that have been placed on the board and
+    given plenty of resources, so that every kind of action is available.
+    --------------------------
+    """
+    game = Game(playerAgentNums = playerAgentNums, seed = seed)
+    game.initializePlayers()
+    game.initializeSettlementsAndResourcesLumberBrick()
+    for agent in game.gameState.playerAgents:
+      agent.addResources({ResourceTypes.BRICK: 10, ResourceTypes.WOOL: 10, ResourceTypes.ORE: 10,
+        ResourceTypes.GRAIN: 10, ResourceTypes.LUMBER: 10})
+    return game.gameState
+
+  def snapshot(self, state):
+    """
+    Method: snapshot
+    --------------------------
+    Returns a comparable summary of everything in the given
+    GameState that a move can change.
+    --------------------------
+    """
+    board = state.board
+    edges = [(e.X, e.Y, e.player) for row in board.edges for e in row if e != None]
+    vertices = [(v.X, v.Y, v.player, v.isSettlement, v.isCity, v.canSettle) for row in board.vertices for v in row if v != None]
+    boardLists = ([(v.X, v.Y) for v in board.allSettlements], [(v.X, v.Y) for v in board.allCities],
+      [(e.X, e.Y) for e in board.allRoads], list(board.state.production), list(board.state.productionWays),
+      list(board.state.resourceTouches), sorted(board.state.roadFrontier.items()), sorted(board.state.roadEnds.items()))
+    agents = []
+    for agent in state.playerAgents:
+      resources = sorted((r, n) for r, n in agent.resources.items() if n != 0)
+      agents.append((agent.victoryPoints, resources, [(v.X, v.Y) for v in agent.settlements],
+        [(v.X, v.Y) for v in agent.cities], [(e.X, e.Y) for e in agent.roads]))
+    return (edges, vertices, boardLists, agents)
+
+  def testMakeMoveMatchesGenerateSuccessor(self):
+    print "Running testMakeMoveMatchesGenerateSuccessor....."
+    state = self.createGameState()
+    for playerIndex in range(state.getNumPlayerAgents()):
+      for action in state.getLegalActions(playerIndex):
+        successor = state.generateSuccessor(playerIndex, action)
+        successor.updatePlayerResourcesForDiceRoll(8)
+        state.makeMove(playerIndex, action, 8)
+        if self.snapshot(state) != self.snapshot(successor):
+          raise Exception("makeMove with " + str(action) + " doesn't match generateSuccessor")
+        state.undoMove()
+
+  def testUndoMove(self):
+    print "Running testUndoMove....."
+    state = self.createGameState()
+    original = self.snapshot(state)
+    snapshots = []
+    playerIndex = 0
+    # Play a sequence of random moves (including cities, which reorder
+    # the settlement lists) and then undo them all one at a time
+    for i in range(30):
+      actions = state.getLegalActions(playerIndex)
+      if len(actions) == 0: break
+      snapshots.append(self.snapshot(state))
+      cities = [action for action in actions if action[0] == ACTIONS.CITY]
+      action = cities[0] if len(cities) > 0 else random.choice(actions)
+      diceRoll = random.choice([None, 6, 8, 9])
+      state.makeMove(playerIndex, action, diceRoll)
+      playerIndex = 1 - playerIndex
+      # Dice rolls can also be made (and undone) on their own
+      if diceRoll is None:
+        snapshots.append(self.snapshot(state))
+        state.makeDiceRoll(random.choice([5, 10]))
+
+    while len(snapshots) > 0:
+      state.undoMove()
+      if self.snapshot(state) != snapshots.pop():
+        raise Exception("undoMove didn't restore the previous state")
+    assert(self.snapshot(state) == original)
+    assert(len(state.undoLog) == 0)
+
+  def testZobristHash(self):
+    print "Running testZobristHash....."
+    state = self.createGameState()
+    assert(state.getZobristHash(0) == state.computeZobristHash(0))
+    assert(state.getZobristHash(0) != state.getZobristHash(1))
+    original = state.getZobristHash(0)
+
+    # The incremental hash should always match the hash computed from scratch
+    playerIndex = 0
+    for i in range(30):
+      actions = state.getLegalActions(playerIndex)
+      if len(actions) == 0: break
+      state.makeMove(playerIndex, random.choice(actions), random.choice([None, 5, 8, 10]))
+      playerIndex = 1 - playerIndex
+      if state.getZobristHash(playerIndex) != state.computeZobristHash(playerIndex):
+        raise Exception("Incremental Zobrist hash doesn't match the recomputed hash")
+    while len(state.undoLog) > 0:
+      state.undoMove()
+    assert(state.getZobristHash(0) == original)
+
+    # Building two roads in either order reaches the same position
+    roads = [action for action in state.getLegalActions(0) if action[0] == ACTIONS.ROAD]
+    assert(len(roads) >= 2)
+    state.makeMove(0, roads[0]); state.makeMove(0, roads[1])
+    firstOrder = state.getZobristHash(1)
+    state.undoMove(); state.undoMove()
+    state.makeMove(0, roads[1]); state.makeMove(0, roads[0])
+    assert(state.getZobristHash(1) == firstOrder)
+    assert(state.deepCopy().getZobristHash(1) == firstOrder)
+
+  def testEvaluationFeatures(self):
+    print "Running testEvaluationFeatures....."
+    state = self.createGameState()
+    table = state.board.productionTable
+
+    # The board's running totals should always match the totals worked
+    # out from each player's pieces
+    playerIndex = 0
+    for i in range(30):
+      actions = state.getLegalActions(playerIndex)
+      if len(actions) == 0: break
+      cities = [action for action in actions if action[0] == ACTIONS.CITY]
+      action = cities[0] if len(cities) > 0 and i % 3 == 0 else random.choice(actions)
+      state.makeMove(playerIndex, action, random.choice([None, 6, 8]))
+      playerIndex = 1 - playerIndex
+      for index, agent in enumerate(state.playerAgents):
+        buildings = [v.id for v in agent.settlements] + [v.id for v in agent.cities] * 2
+        expected = [sum(table.expectedProduction[v][r] for v in buildings) for r in range(NUM_RESOURCES)]
+        production = state.board.getExpectedProduction(index)
+        assert(all(abs(a - b) < 1e-9 for a, b in zip(production, expected)))
+        assert(state.board.getResourceTouches(index) == sum(table.hexagonCounts[v.id] for v in agent.settlements))
+    while len(state.undoLog) > 0:
+      state.undoMove()
+    assert(state.board.getExpectedProduction(0) == state.deepCopy().board.getExpectedProduction(0))
+
+    # Evaluations are remembered by position, until the evaluation
+    # function changes
+    agent = PlayerAgentAlphaBeta("Player 0", 0, "red", depth = 1, evalFn = betterEvalFn)
+    agent.evalCacheEntries = 16
+    value = agent.evaluate(state)
+    assert(value == betterEvalFn(state, 0))
+    assert(agent.evalCache == {state.getZobristHash(0): value})
+    agent.evaluationFunction = builderEvalFn
+    assert(agent.evaluate(state) == builderEvalFn(state, 0))
+    assert(len(agent.evalCache) == 1)
+
+  def testSeededGames(self):
+    print "Running testSeededGames....."
+    # Games with the same seed play out the same way
+    histories = []
+    verbose, gameModule.VERBOSE = gameModule.VERBOSE, False
+    for i in range(2):
+      game = Game(playerAgentNums = [0, 0], seed = 7)
+      result = game.run()
+      histories.append((result, [(name, action[0], action[1].X, action[1].Y) if action else None
+        for name, action in game.moveHistory]))
+    gameModule.VERBOSE = verbose
+    assert(histories[0] == histories[1])
+
+    # A copy rolls the same dice as the state it came from, without
+    # changing the rolls the original goes on to make
+    state = self.createGameState()
+    copy = state.deepCopy()
+    copyRolls = [copy.diceAgent.rollDice() for i in range(10)]
+    assert([state.diceAgent.rollDice() for i in range(10)] == copyRolls)
+
+    # and legal actions are always listed in the same order
+    state = self.createGameState()
+    board = state.board
+    typeOrder = [ACTIONS.ROAD, ACTIONS.SETTLE, ACTIONS.CITY]
+    for playerIndex in range(state.getNumPlayerAgents()):
+      keys = [(typeOrder.index(action[0]), action[1].id) for action in state.getLegalActions(playerIndex)]
+      assert(len(keys) > 0 and keys == sorted(keys))
+
+  def testResourceVector(self):
+    print "Running testResourceVector....."
+    resources = ResourceVector({ResourceTypes.BRICK: 1, ResourceTypes.LUMBER: 1, ResourceTypes.WOOL: 1})
+    assert(resources.covers(ROAD_COST))
+    assert(not resources.covers(SETTLEMENT_COST))
+    resources[ResourceTypes.GRAIN] += 1
+    assert(resources.covers(SETTLEMENT_COST))
+
+    # Reads like a Counter from resource type to count
+    assert(resources[ResourceTypes.GRAIN] == 1 and resources[ResourceTypes.ORE] == 0)
+    assert(resources[ResourceTypes.NOTHING] == 0)
+    assert(sum(resources.values()) == 4)
+    assert(dict(resources.items()) == dict((r, 0 if r == ResourceTypes.ORE else 1) for r in RESOURCE_ORDER))
+
+    copy = resources.deepCopy()
+    copy[ResourceTypes.ORE] = 3
+    assert(resources[ResourceTypes.ORE] == 0 and copy != resources)
+
+  def testMoveOrdering(self):
+    print "Running testMoveOrdering....."
+    state = self.createGameState()
+    agent = PlayerAgentAlphaBeta("Player1", 0, "red", depth = 1)
+    actions = state.getLegalActions(0)
+    roads = [action for action in actions if action[0] == ACTIONS.ROAD]
+    assert(len(roads) >= 2 and len(roads) < len(actions))
+
+    # Cities (and settlements) before roads
+    ordered = agent.orderActions(actions, 1, 0, None)
+    priorities = [ACTION_ORDER_PRIORITY[action[0]] for action in ordered]
+    assert(sorted(ordered) == sorted(actions) and priorities == sorted(priorities, reverse = True))
+
+    # but a killer move at the same depth goes before them,
+    # and the transposition table's best action before that
+    agent.recordCutoff(roads[-1], 1, 0)
+    assert(agent.orderActions(actions, 1, 0, None)[0] is roads[-1])
+    assert(agent.orderActions(actions, 2, 0, None)[0][0] != ACTIONS.ROAD)
+    agent.transpositionTable.store(0, 0, 1, BOUNDS.EXACT, roads[0])
+    entry = agent.transpositionTable.lookup(0)
+    assert(agent.orderActions(actions, 1, 0, entry)[0] is roads[0])
+
+    # Searching counts the positions visited
+    agent.getAction(state)
+    assert(agent.nodeCount > len(actions))
+
+  def testMoveOrderingKeepsValues(self):
+    print "Running testMoveOrderingKeepsValues....."
+    # Ordering actions only changes how much alpha-beta prunes, not the
+    # value it finds (which is Star2's), in either seat
+    for seed in range(3):
+      for seat in [0, 1]:
+        for evalFn in [betterEvalFn, resourceEvalFn]:
+          values = []
+          for playerCode in [7, 7, 13]:
+            playerCodes = [0, 0]
+            playerCodes[seat] = playerCode
+            state = self.createGameState(playerCodes, seed = seed)
+            agent = state.playerAgents[seat]
+            if len(values) == 1:
+              agent = UnorderedAlphaBeta(agent.name, seat, agent.color)
+              agent.deserialize(state.playerAgents[seat].serialize(), state.board)
+              state.playerAgents[seat] = agent
+            agent.depth, agent.evaluationFunction = 1, evalFn
+            values.append(agent.getAction(state)[0])
+          assert(abs(values[0] - values[1]) < 1e-9 and abs(values[0] - values[2]) < 1e-9)
+
+  def testTranspositionTableAcrossTurns(self):
+    print "Running testTranspositionTableAcrossTurns....."
+    # The bounds an agent's transposition table keeps from one search
+    # don't change the value a later search of the same positions finds,
+    # even with the actions tried in another order (so other windows)
+    for playerCode in [7, 13]:
+      for seed in range(3):
+        state = self.createGameState([playerCode, 0], seed = seed)
+        agent = state.playerAgents[0]
+        agent.depth = 1
+        value = agent.getAction(state)[0]
+        actions = state.getLegalActions(0)
+        agent.transpositionTable.store(state.getZobristHash(0), 0, 0, BOUNDS.EXACT, actions[-1])
+        hits = agent.transpositionTable.hits
+        assert(abs(agent.getAction(state)[0] - value) < 1e-9)
+        assert(agent.transpositionTable.hits > hits + 1)
+
+  def testStar2Search(self):
+    print "Running testStar2Search....."
+    # Star2's pruning finds the same value as a full expectiminimax search
+    values, nodeCounts = [], []
+    for playerCode in [1, 13]:
+      state = self.createGameState([playerCode, 0], seed = 3)
+      agent = state.playerAgents[0]
+      agent.depth = 1
+      values.append(agent.getAction(state)[0])
+      nodeCounts.append(agent.nodeCount)
+    assert(abs(values[0] - values[1]) < 1e-9)
+    assert(nodeCounts[1] < nodeCounts[0])
+
+  def testMCTS(self):
+    print "Running testMCTS....."
+    # A search is limited by its number of playouts, leaves the state as
+    # it was, and makes the same choice when made with the same seed
+    choices = []
+    for i in range(2):
+      state = self.createGameState([14, 0], seed = 5)
+      agent = state.playerAgents[0]
+      agent.numPlayouts = 100
+      original = self.snapshot(state)
+      value, action = agent.getAction(state)
+      assert(agent.playoutCount == 100)
+      assert(action in state.getLegalActions(0))
+      assert(self.snapshot(state) == original and len(state.undoLog) == 0)
+      choices.append((value, getActionKey(action)))
+    assert(choices[0] == choices[1])
+
+    # or by a time limit
+    agent.numPlayouts, agent.timeLimit = None, 0.05
+    agent.getAction(state)
+    assert(agent.playoutCount > 0)
+
+    # A playout that wins is worth a win, not the evaluation of the
+    # position it won in (however high that is)
+    state = self.createGameState([14, 0], seed = 5)
+    agent = state.playerAgents[0]
+    agent.numPlayouts, agent.evaluationFunction = 100, lambda state, playerIndex: 5000
+    agent.victoryPoints = VICTORY_POINTS_TO_WIN - 1
+    value, action = agent.getAction(state)
+    assert(value == EVAL_BOUNDS[1] and action[0] != ACTIONS.ROAD)
+
+  def testSerialize(self):
+    print "Running testSerialize....."
+    state = self.createGameState()
+    for i in range(10):
+      state.makeMove(i % 2, random.choice(state.getLegalActions(i % 2)))
+    copy = deserializeGameState(state.serialize(),
+      [PlayerAgent("Player" + str(i), i, "red") for i in range(state.getNumPlayerAgents())])
+    assert(self.snapshot(copy) == self.snapshot(state))
+    for playerIndex in range(state.getNumPlayerAgents()):
+      assert(copy.getZobristHash(playerIndex) == state.getZobristHash(playerIndex))
+      assert([getActionKey(action) for action in copy.getLegalActions(playerIndex)] ==
+        [getActionKey(action) for action in state.getLegalActions(playerIndex)])
+
+    # Building on the copy leaves the original as it was
+    original = self.snapshot(state)
+    originalActions = [getActionKey(action) for action in state.getLegalActions(0)]
+    for i in range(6):
+      copy.makeMove(i % 2, copy.getLegalActions(i % 2)[-1])
+    assert(self.snapshot(state) == original)
+    assert([getActionKey(action) for action in state.getLegalActions(0)] == originalActions)
+    for playerIndex in range(state.getNumPlayerAgents()):
+      assert(state.computeZobristHash(playerIndex) == state.getZobristHash(playerIndex))
+
+  def testParallelSearch(self):
+    print "Running testParallelSearch....."
+    # Splitting the root actions between processes finds the same value
+    values = []
+    for numProcesses in [1, 2]:
+      state = self.createGameState([13, 0], seed = 3)
+      agent = state.playerAgents[0]
+      agent.depth, agent.numProcesses = 1, numProcesses
+      original = self.snapshot(state)
+      value, action = agent.getAction(state)
+      assert(action in state.getLegalActions(0) and self.snapshot(state) == original)
+      values.append(value)
+    assert(abs(values[0] - values[1]) < 1e-9)
+
+    # and Monte Carlo tree searches share out their playouts
+    state = self.createGameState([14, 0], seed = 5)
+    agent = state.playerAgents[0]
+    agent.numPlayouts, agent.numProcesses = 100, 2
+    value, action = agent.getAction(state)
+    assert(action in state.getLegalActions(0) and agent.playoutCount == 100)
+
+  def testBestOpenings(self):
+    print "Running testBestOpenings....."
+    # Each player in turn settles the best pair of vertices left
+    game = Game(playerAgentNums = [0, 0], seed = 1, initialPlacement = INITIAL_PLACEMENTS.BEST_OPENINGS)
+    game.initializePlayers()
+    bestValue, bestFirst, bestSecond = game.gameState.board.rankOpeningPairs()[0]
+    game.initializeSettlementsAndResources()
+    board = game.gameState.board
+    first, second = game.gameState.playerAgents
+    assert([settlement.id for settlement in first.settlements] == [bestFirst.id, bestSecond.id])
+    assert(len(second.settlements) == 2 and len(first.roads) == 2 and len(second.roads) == 2)
+    assert(board.getOpeningValue([settlement.id for settlement in second.settlements]) <= bestValue)
+    assert(sum(first.resources.values()) > 0)
+
+  def testGameEvents(self):
+    print "Running testGameEvents....."
+    # A game gives its sinks an event for its start, each turn's
+    # start, dice roll and action, and its end
+    eventSink = RecordingEventSink()
+    game = Game(playerAgentNums = [0, 0], seed = 4, eventSinks = [eventSink])
+    winner, turns, victoryPointDiff = game.run()
+    eventTypes = [event.eventType for event in eventSink.events]
+    assert(eventTypes[0] == EVENTS.GAME_START and eventTypes[-1] == EVENTS.GAME_OVER)
+    assert(eventTypes[1:-1] == [EVENTS.TURN_START, EVENTS.DICE_ROLL, EVENTS.ACTION] * len(game.moveHistory))
+    actions = [event.details["action"] for event in eventSink.events if event.eventType == EVENTS.ACTION]
+    assert(actions == [action for name, action in game.moveHistory])
+    assert(eventSink.events[-1].details["winner"] == winner)
+
+    # and a game with no sinks plays out the same way
+    silentGame = Game(playerAgentNums = [0, 0], seed = 4, eventSinks = [])
+    assert(silentGame.run() == (winner, turns, victoryPointDiff))
+    assert([(name, getActionKey(action)) for name, action in silentGame.moveHistory] ==
+      [(name, getActionKey(action)) for name, action in game.moveHistory])
+
+  def runAllTests(self):
+    """
+    Method: runAllTests
+    --------------------------
+    Run all tests for this test class.
+    --------------------------
+    """
+    print "Running GameState tests...."
+    print "----------------------"
+
+    self.testMakeMoveMatchesGenerateSuccessor()
+    print "Success!"
+    self.testUndoMove()
+    print "Success!"
+    self.testZobristHash()
+    print "Success!"
+    self.testEvaluationFeatures()
+    print "Success!"
+    self.testSeededGames()
+    print "Success!"
+    self.testResourceVector()
+    print "Success!"
+    self.testMoveOrdering()
+    print "Success!"
+    self.testMoveOrderingKeepsValues()
+    print "Success!"
+    self.testTranspositionTableAcrossTurns()
+    print "Success!"
+    self.testStar2Search()
+    print "Success!"
+    self.testMCTS()
+    print "Success!"
+    self.testSerialize()
+    print "Success!"
+    self.testParallelSearch()
+    print "Success!"
+    self.testGameEvents()
+    print "Success!"
+    self.testBestOpenings()
+    print "Success!"
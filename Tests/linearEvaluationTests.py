@@ -0,0 +1,124 @@
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import random
+import tempfile
+from game import Game
+from agents import PlayerAgentExpectimax, PlayerAgentExpectiminimax, defaultEvalFn, getActionKey
+from linearEvaluation import *
+
+
+class LinearEvaluationTests:
+  """
+  Class: LinearEvaluationTests
+  --------------------------
+  A class containing all tests for the LinearEvaluator class.
+  --------------------------
+  """
+
+  def __init__(self):
+    pass
+
+  def createGameState(self, seed):
+    """
+    Method: createGameState
+    --------------------------
+    Returns a GameState a few random moves into a game, with players
+    that have enough resources to take every kind of action.
+    --------------------------
+    """
+    game = Game(playerAgentNums = [0, 0], seed = seed)
+    game.initializePlayers()
+    game.initializeSettlementsAndResourcesLumberBrick()
+    state = game.gameState
+    for agent in state.playerAgents:
+      agent.addResources({ResourceTypes.BRICK: 4, ResourceTypes.WOOL: 2, ResourceTypes.ORE: 3,
+        ResourceTypes.GRAIN: 3, ResourceTypes.LUMBER: 4})
+    randomGenerator = random.Random(seed)
+    for i in range(6):
+      actions = state.getLegalActions(i % 2)
+      if len(actions) > 0:
+        state.makeMove(i % 2, randomGenerator.choice(actions), randomGenerator.choice([5, 6, 8, 9]))
+    return state
+
+  def testDefaultWeights(self):
+    print "Running testDefaultWeights....."
+    # The weights the linear evaluation function starts out with are the
+    # default heuristic's
+    evaluator = loadLinearEvaluator()
+    for seed in range(3):
+      state = self.createGameState(seed)
+      for playerIndex in range(state.getNumPlayerAgents()):
+        assert(evaluator(state, playerIndex) == defaultEvalFn(state, playerIndex))
+
+  def testRollFeatures(self):
+    print "Running testRollFeatures....."
+    # The features found for all the rolls at once match the features
+    # found after making each roll
+    state = self.createGameState(1)
+    rolls = range(2, MAX_DICE_ROLL + 1)
+    for playerIndex in range(state.getNumPlayerAgents()):
+      rows = getRollFeatures(state, playerIndex, rolls)
+      assert(rows.shape == (len(rolls), NUM_FEATURES))
+      for roll, row in zip(rolls, rows):
+        state.makeDiceRoll(roll)
+        assert(list(row) == getFeatures(state, playerIndex))
+        state.undoMove()
+
+  def testSaveAndLoad(self):
+    print "Running testSaveAndLoad....."
+    weights = dict((name, i * 0.5 - 3) for i, name in enumerate(FEATURE_NAMES))
+    evaluator = LinearEvaluator(weights)
+    weightsFile, path = tempfile.mkstemp()
+    os.close(weightsFile)
+    try:
+      evaluator.save(path, comment = "test weights")
+      assert(loadLinearEvaluator(path).getWeightDict() == weights)
+      with open(path, "a") as weightsFile:
+        weightsFile.write("noSuchFeature 1.0\n")
+      try:
+        loadLinearEvaluator(path)
+        assert(False)
+      except Exception as error:
+        assert("noSuchFeature" in str(error))
+    finally:
+      os.remove(path)
+
+  def testBatchSearch(self):
+    print "Running testBatchSearch....."
+    # Searches that score the children of a node together find the same
+    # values and actions as searches that evaluate each child on its own
+    # (which a plain function wrapped around the evaluator makes them do)
+    randomGenerator = random.Random(3)
+    evaluator = LinearEvaluator(dict((name, randomGenerator.uniform(-2, 2)) for name in FEATURE_NAMES))
+    unbatched = lambda state, playerIndex: evaluator(state, playerIndex)
+    for agentClass in [PlayerAgentExpectimax, PlayerAgentExpectiminimax]:
+      state = self.createGameState(2)
+      results = []
+      for evalFn in [evaluator, unbatched]:
+        agent = agentClass("Player 0", 0, "red", depth = 1, evalFn = evalFn)
+        value, action = agent.getAction(state)
+        results.append((value, getActionKey(action), agent.nodeCount))
+      (batchValue, batchAction, batchNodes), (value, action, nodes) = results
+      assert(abs(batchValue - value) < 1e-9 and batchAction == action and batchNodes == nodes)
+      assert(agent.canEvaluateInBatches() is False)
+
+  def runAllTests(self):
+    """
+    Method: runAllTests
+    --------------------------
+    Run all tests for this test class.
+    --------------------------
+    """
+    print "Running LinearEvaluator tests...."
+    print "----------------------"
+
+    self.testDefaultWeights()
+    print "Success!"
+    self.testRollFeatures()
+    print "Success!"
+    self.testSaveAndLoad()
+    print "Success!"
+    self.testBatchSearch()
+    print "Success!"
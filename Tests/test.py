@@ -2,6 +2,12 @@ from vertexTests import *
 from hexagonTests import *
 from edgeTests import *
 from boardTests import *
+from gameStateTests import *
+from transpositionTableTests import *
+from tournamentTests import *
+from batchSimulationTests import *
+from linearEvaluationTests import *
+from weightTuningTests import *
 
 # vertexTests = VertexTests()
 # vertexTests.runAllTests()
@@ -15,4 +21,28 @@ from boardTests import *
 # edgeTests.runAllTests()
 
 boardTests = BoardTests()
-boardTests.runAllTests()
\ No newline at end of file
+boardTests.runAllTests()
+print "\n\n"
+
+gameStateTests = GameStateTests()
+gameStateTests.runAllTests()
+print "\n\n"
+
+transpositionTableTests = TranspositionTableTests()
+transpositionTableTests.runAllTests()
+print "\n\n"
+
+tournamentTests = TournamentTests()
+tournamentTests.runAllTests()
+print "\n\n"
+
+batchSimulationTests = BatchSimulationTests()
+batchSimulationTests.runAllTests()
+print "\n\n"
+
+linearEvaluationTests = LinearEvaluationTests()
+linearEvaluationTests.runAllTests()
+print "\n\n"
+
+weightTuningTests = WeightTuningTests()
+weightTuningTests.runAllTests()
@@ -0,0 +1,83 @@
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import tournament as tournamentModule
+from tournament import *
+
+
+class TournamentTests:
+  """
+  Class: TournamentTests
+  --------------------------
+  A class containing all tests for the tournament runner.
+  --------------------------
+  """
+
+  def __init__(self):
+    pass
+
+  def summarize(self, stats):
+    """
+    Method: summarize
+    --------------------------
+    Returns a comparable summary of the given PairingStats,
+    leaving out how long the moves took.
+    --------------------------
+    """
+    return [(s.playerCodes, s.numGames, s.numUnfinished, s.wins, s.victoryPointDiffs, s.totalTurns, s.numMoves)
+      for s in stats]
+
+  def testTournamentTasks(self):
+    print "Running testTournamentTasks....."
+    # Every pairing plays each seed from both seats
+    assert(getPairings([0, 7, 0]) == [(0, 7), (0, 0)])
+    tasks = getTournamentTasks([0, 7], 4, seed = 10)
+    assert(tasks == [((0, 7), 10, None), ((7, 0), 10, None), ((0, 7), 11, None), ((7, 0), 11, None)])
+
+  def testRunTournament(self):
+    print "Running testRunTournament....."
+    # Playing the games in worker processes gives the same results as
+    # playing them here, and every game is counted for both sides
+    serialStats = runTournament([0, 0], 4, numProcesses = 1)
+    parallelStats = runTournament([0, 0], 4, numProcesses = 2)
+    assert(self.summarize(serialStats) == self.summarize(parallelStats))
+    stats = serialStats[0]
+    assert(stats.numGames == 4 and sum(stats.wins) == stats.numGames - stats.numUnfinished)
+    assert(stats.victoryPointDiffs[0] == -stats.victoryPointDiffs[1])
+    assert(sum(stats.numMoves) > 0)
+
+  def testSearchSettings(self):
+    print "Running testSearchSettings....."
+    # A game's search agents search to its depth, leaving DEPTH alone
+    game = Game(playerAgentNums = [7, 13], seed = 0, eventSinks = [], depth = 1)
+    game.initializePlayers()
+    assert([agent.depth for agent in game.gameState.playerAgents] == [1, 1] and DEPTH != 1)
+
+    # and games played in worker processes can't spread their searches
+    # over more processes
+    searchProcesses, tournamentModule.SEARCH_PROCESSES = tournamentModule.SEARCH_PROCESSES, 2
+    try:
+      runTournament([7, 0], 2, numProcesses = 2)
+      assert(False)
+    except Exception as error:
+      assert("SEARCH_PROCESSES" in str(error))
+    finally:
+      tournamentModule.SEARCH_PROCESSES = searchProcesses
+
+  def runAllTests(self):
+    """
+    Method: runAllTests
+    --------------------------
+    Run all tests for this test class.
+    --------------------------
+    """
+    print "Running Tournament tests...."
+    print "----------------------"
+
+    self.testTournamentTasks()
+    print "Success!"
+    self.testRunTournament()
+    print "Success!"
+    self.testSearchSettings()
+    print "Success!"
@@ -0,0 +1,78 @@
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from gameConstants import *
+from transpositionTable import TranspositionTable
+
+
+class TranspositionTableTests:
+  """
+  Class: TranspositionTableTests
+  --------------------------
+  A class containing all tests for the TranspositionTable class.
+  --------------------------
+  """
+
+  def __init__(self):
+    pass
+
+  def testStoreAndLookup(self):
+    print "Running testStoreAndLookup....."
+    table = TranspositionTable(1)
+    assert(table.lookup(12345) is None)
+    table.store(12345, 4.5, 2, BOUNDS.EXACT, "action")
+    entry = table.lookup(12345)
+    assert(entry.value == 4.5)
+    assert(entry.depth == 2)
+    assert(entry.bound is BOUNDS.EXACT)
+    assert(entry.bestAction == "action")
+    # A different position in the same bucket isn't a hit
+    assert(table.lookup(12345 + table.numBuckets) is None)
+
+  def testReplacement(self):
+    print "Running testReplacement....."
+    table = TranspositionTable(1)
+    deep, shallow, other = 7, 7 + table.numBuckets, 7 + 2 * table.numBuckets
+
+    # A shallower entry doesn't evict a deeper one from the same search...
+    table.store(deep, 1, 3, BOUNDS.EXACT, None)
+    table.store(shallow, 2, 1, BOUNDS.EXACT, None)
+    assert(table.lookup(deep).value == 1)
+    assert(table.lookup(shallow).value == 2)
+    # ...but the always-replace slot always takes the newest entry
+    table.store(other, 3, 1, BOUNDS.EXACT, None)
+    assert(table.lookup(deep).value == 1)
+    assert(table.lookup(shallow) is None)
+    assert(table.lookup(other).value == 3)
+
+    # Entries from an earlier search can be replaced by shallower ones
+    table.newSearch()
+    table.store(shallow, 4, 1, BOUNDS.LOWER, None)
+    assert(table.lookup(deep) is None)
+    assert(table.lookup(shallow).value == 4)
+
+  def testMemoryCap(self):
+    print "Running testMemoryCap....."
+    table = TranspositionTable(1)
+    for zobristHash in xrange(10 * table.numBuckets):
+      table.store(zobristHash, 0, 1, BOUNDS.EXACT, None)
+    assert(len(table.depthPreferred) == table.numBuckets)
+    assert(len(table.alwaysReplace) == table.numBuckets)
+
+  def runAllTests(self):
+    """
+    Method: runAllTests
+    --------------------------
+    Run all tests for this test class.
+    --------------------------
+    """
+    print "Running TranspositionTable tests...."
+    print "----------------------"
+
+    self.testStoreAndLookup()
+    print "Success!"
+    self.testReplacement()
+    print "Success!"
+    self.testMemoryCap()
+    print "Success!"
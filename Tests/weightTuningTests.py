@@ -0,0 +1,115 @@
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import tempfile
+from game import Game
+from agents import PlayerAgentAlphaBeta
+from linearEvaluation import loadLinearEvaluator
+from weightTuning import *
+
+
+class WeightTuningTests:
+  """
+  Class: WeightTuningTests
+  --------------------------
+  A class containing all tests for tuning evaluation weights from
+  self-play games (weightTuning.py).
+  --------------------------
+  """
+
+  def __init__(self):
+    pass
+
+  def createTempFile(self, suffix):
+    tempFile, path = tempfile.mkstemp(suffix = suffix)
+    os.close(tempFile)
+    return path
+
+  def testRecordSamples(self):
+    print "Running testRecordSamples....."
+    # Every action of every game gives a sample for each player, with
+    # the outcome of the game for that player
+    path = self.createTempFile(".npz")
+    try:
+      numSamples = generateSamples(path, 2, playerCodes = [0, 0], numProcesses = 1, seed = 3)
+      samples = loadSamples([path])
+    finally:
+      os.remove(path)
+    assert(samples["features"].shape == (numSamples, NUM_FEATURES))
+    for name in ["playerIndices", "turnNumbers", "gameIds", "outcomes"]:
+      assert(len(samples[name]) == numSamples)
+
+    for seed in [3, 4]:
+      game = Game(playerAgentNums = [0, 0], seed = seed, eventSinks = [])
+      winner, turns, victoryPointDiff = game.run()
+      inGame = samples["gameIds"] == seed
+      assert(inGame.sum() == 2 * len(game.moveHistory))
+      if winner < 0:
+        assert((samples["outcomes"][inGame] == UNFINISHED_OUTCOME).all())
+      else:
+        assert((samples["outcomes"][inGame] == (samples["playerIndices"][inGame] == winner)).all())
+
+  def testFit(self):
+    print "Running testFit....."
+    # The fits find the weights that made up some samples
+    randomState = np.random.RandomState(0)
+    trueWeights = randomState.uniform(-1, 1, NUM_FEATURES)
+    features = randomState.normal(size = (5000, NUM_FEATURES))
+    features[:, FEATURE_NAMES.index("bias")] = 1
+
+    outcomes = np.dot(features, trueWeights) + randomState.normal(scale = 0.01, size = 5000)
+    assert(np.abs(fitLeastSquares(features, outcomes, l2 = 0.0) - trueWeights).max() < 0.01)
+
+    winChances = 1.0 / (1.0 + np.exp(-np.dot(features, trueWeights)))
+    outcomes = (randomState.uniform(size = 5000) < winChances).astype(np.int8)
+    logisticWeights = fitLogistic(features, outcomes)
+    assert(np.corrcoef(logisticWeights, trueWeights)[0, 1] > 0.95)
+
+  def testTunedWeights(self):
+    print "Running testTunedWeights....."
+    # Weights fit to self-play samples can be saved, loaded and searched with
+    samplesPath = self.createTempFile(".npz")
+    weightsPath = self.createTempFile(".txt")
+    try:
+      generateSamples(samplesPath, 2, playerCodes = [0, 0], numProcesses = 1, seed = 5)
+      samples = loadSamples([samplesPath, samplesPath])
+      evaluator = fitWeights(samples, "logistic")
+      assert(0.5 <= getPredictionAccuracy(evaluator, samples, 0.0) <= 1.0)
+      evaluator.save(weightsPath)
+      loaded = loadLinearEvaluator(weightsPath)
+      assert(loaded.weights == evaluator.weights)
+      try:
+        fitWeights(samples, "noSuchMethod")
+        assert(False)
+      except Exception as error:
+        assert("noSuchMethod" in str(error))
+    finally:
+      os.remove(samplesPath)
+      os.remove(weightsPath)
+
+    game = Game(playerAgentNums = [0, 0], seed = 5)
+    game.initializePlayers()
+    game.initializeSettlementsAndResourcesLumberBrick()
+    state = game.gameState
+    state.playerAgents[0].addResources({ResourceTypes.BRICK: 2, ResourceTypes.LUMBER: 2})
+    agent = PlayerAgentAlphaBeta("Player 0", 0, "red", depth = 1, evalFn = loaded)
+    value, action = agent.getAction(state)
+    assert(action in state.getLegalActions(0))
+
+  def runAllTests(self):
+    """
+    Method: runAllTests
+    --------------------------
+    Run all tests for this test class.
+    --------------------------
+    """
+    print "Running weight tuning tests...."
+    print "----------------------"
+
+    self.testRecordSamples()
+    print "Success!"
+    self.testFit()
+    print "Success!"
+    self.testTunedWeights()
+    print "Success!"
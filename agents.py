@@ -1,7 +1,12 @@
 from collections import Counter
 import copy
 from gameConstants import *
-from random import choice, randint
+from board import getZobristKey
+from transpositionTable import TranspositionTable
+import math
+import multiprocessing
+import random
+import time
 
 """
 EVALUATION FUNCTIONS
@@ -23,27 +28,19 @@ def defaultEvalFn(currentGameState, currentPlayerIndex):
   return (3 * len(currentPlayer.settlements) + 5 * len(currentPlayer.cities) + len(currentPlayer.roads)
     - (2 * len(otherPlayer.settlements) + 4 * len(otherPlayer.cities) + len(otherPlayer.roads)))
 
+# The number of hexagons the player's settlements touch is kept up to date
+# by the board (see Board.getResourceTouches)
 def betterEvalFn(currentGameState, currentPlayerIndex):
-  board = currentGameState.board
   currentPlayer = currentGameState.playerAgents[currentPlayerIndex]
-  otherPlayer = currentGameState.playerAgents[1-currentPlayerIndex]
-  currentResourceTouches = getResourceTouches(currentPlayer.settlements, board)
-  otherResourceTouches = getResourceTouches(otherPlayer.settlements, board)
-  return 3 * len(currentResourceTouches) + 2 * len(currentPlayer.cities)
-
-def getResourceTouches(settlements, board):
-  resourceTouches = []
-  for settlement in settlements:
-    hexes = board.getHexes(settlement)
-    resourceTouches.extend(hexes)
-  return resourceTouches
+  currentResourceTouches = currentGameState.board.getResourceTouches(currentPlayerIndex)
+  return 3 * currentResourceTouches + 2 * len(currentPlayer.cities)
 
 # EVAL FUNCTION: RESOURCE AGENT
 # --------------------------
 # 1 utility points per resource
 def resourceEvalFn(currentGameState, currentPlayerIndex):
   currentPlayer = currentGameState.playerAgents[currentPlayerIndex]
-  return sum(currentPlayer.resources.values())
+  return sum(currentPlayer.resources.counts)
 
 
 """
@@ -58,13 +55,16 @@ class DiceAgent:
   DiceAgent represents the random agent responsible for the
   roll of the dice for resources each turn.  It generates a
   number from 1-12 with the correct probability distribution
-  corresponding to rolling 2 6-sided dice.
+  corresponding to rolling 2 6-sided dice.  Dice made with the
+  same seed roll the same numbers.
   ---------------------
   """
 
-  def __init__(self, numDiceSides = 6):
+  def __init__(self, numDiceSides = 6, seed = None):
     self.agentType = AGENT.DICE_AGENT
     self.NUM_DICE_SIDES = numDiceSides
+    self.rollDistribution = None
+    self.random = random.Random(seed)
 
   def rollDice(self):
     """
@@ -75,7 +75,7 @@ class DiceAgent:
       roll of 2 6-sided dice
     ----------------------
     """
-    return randint(1, self.NUM_DICE_SIDES) + randint(1, self.NUM_DICE_SIDES)
+    return self.random.randint(1, self.NUM_DICE_SIDES) + self.random.randint(1, self.NUM_DICE_SIDES)
 
   def getRollDistribution(self):
     """
@@ -86,6 +86,10 @@ class DiceAgent:
       all the possible rolls and the probabilities that they will be rolled.
     -----------------------------
     """
+    # The distribution never changes, so only work it out once
+    if self.rollDistribution is not None:
+      return self.rollDistribution
+
     # Tally up all the possible roll combinations
     # and the number of dice roll combinations per dice total
     totalRolls = 0
@@ -96,7 +100,8 @@ class DiceAgent:
         totalRolls += 1
 
     # Return the list of probability tuples
-    return [(roll, rollCounter[roll] / float(totalRolls)) for roll in rollCounter]
+    self.rollDistribution = [(roll, rollCounter[roll] / float(totalRolls)) for roll in rollCounter]
+    return self.rollDistribution
 
   def deepCopy(self):
     """
@@ -105,10 +110,68 @@ class DiceAgent:
     Parameters: NA
     Returns: a new DiceAgent object
 
-    Returns a copy of this agent (which is essentially just a new DiceAgent).
+    Returns a copy of this agent, which goes on to roll the same
+    numbers this agent would.
     -------------------------
     """
-    return DiceAgent()
+    copy = DiceAgent(self.NUM_DICE_SIDES, seed = 0)
+    copy.random.setstate(self.random.getstate())
+    return copy
+
+
+class SearchTimeout(Exception):
+  """
+  Class: SearchTimeout
+  ---------------------
+  Raised inside a search when the searching PlayerAgent runs
+  out of time for its move (see PlayerAgent.iterativeDeepening).
+  ---------------------
+  """
+  pass
+
+
+# Pools of worker processes for parallel searches, by number of processes.
+# Each is started the first time it is needed and then shared by all agents.
+searchPools = {}
+
+def getSearchPool(numProcesses):
+  """
+  Function: getSearchPool
+  ---------------------
+  Parameters:
+    numProcesses - the number of worker processes wanted
+  Returns: a multiprocessing.Pool of that many worker processes
+  ---------------------
+  """
+  pool = searchPools.get(numProcesses)
+  if pool is None:
+    pool = searchPools[numProcesses] = multiprocessing.Pool(numProcesses)
+  return pool
+
+def runSearchWorker(task):
+  """
+  Function: runSearchWorker
+  ---------------------
+  Parameters:
+    task - an (agent class, agent index, search arguments, serialized
+      GameState, root action keys) tuple made by a searchInParallel method
+  Returns: the result of runWorkerSearch for a new agent of the given
+    class (made with the given arguments) in the serialized position,
+    only searching the root actions with the given keys (or all of
+    them, for None)
+
+  Runs in a worker process.  The other players are plain PlayerAgents,
+  since a search only needs their pieces and resources.
+  ---------------------
+  """
+  # (Imported here since the game module imports this one)
+  from game import deserializeGameState
+  agentClass, agentIndex, searchArgs, serializedState, rootActionKeys = task
+  playerAgents = [PlayerAgent("Player " + str(i), i, getColorForPlayer(i)) for i in xrange(len(serializedState[1]))]
+  agent = agentClass("Player " + str(agentIndex), agentIndex, getColorForPlayer(agentIndex), numProcesses = 1, **searchArgs)
+  agent.rootActionKeys = rootActionKeys
+  playerAgents[agentIndex] = agent
+  return agent.runWorkerSearch(deserializeGameState(serializedState, playerAgents))
 
 
 class PlayerAgent(object):
@@ -129,14 +192,25 @@ class PlayerAgent(object):
   color = the color of this player's game pieces on the board
   victoryPoints = the number of victory points the player has
   depth = the maximum depth to recurse in the minimax tree
+  timeLimit = the number of seconds a search may take per move, or None to always search to depth
   roads = a list of Edge objects representing the roads a player has
   settlements = a list of Vertex objects representing the settlements a player has
   cities = a list of Vertex objects representing the cities a player has
-  resources = a Counter containing the count of each resource type (in ResourceTypes) the player has
+  resources = a ResourceVector containing the count of each resource type (in ResourceTypes) the player has
+  zobristHash = the Zobrist hash of the player's resources and victory points
+  nodeCount = the number of positions the last search visited
+  numProcesses = the number of worker processes to spread each search over
+  rootActionKeys = in a worker process, the keys of the root actions to search (None to search them all)
+  evalCacheEntries = the number of evaluation function values to remember (0 for none, see evaluate)
+  evalCache = the values of positions already evaluated, by Zobrist hash
+  evalCacheFunction = the evaluation function the values in evalCache are from
   ---------------------
   """
+  __slots__ = ("agentType", "evaluationFunction", "name", "agentIndex", "color", "victoryPoints", "depth",
+    "timeLimit", "deadline", "completedDepth", "roads", "settlements", "cities", "resources", "zobristHash", "nodeCount",
+    "numProcesses", "rootActionKeys", "evalCacheEntries", "evalCache", "evalCacheFunction")
 
-  def __init__(self, name, agentIndex, color, depth = 3, evalFn = defaultEvalFn):
+  def __init__(self, name, agentIndex, color, depth = 3, evalFn = defaultEvalFn, timeLimit = SEARCH_TIME_LIMIT, numProcesses = SEARCH_PROCESSES):
     self.agentType = AGENT.PLAYER_AGENT
     self.evaluationFunction = evalFn
     self.name = name
@@ -145,6 +219,24 @@ class PlayerAgent(object):
     self.victoryPoints = 0
     self.depth = depth
 
+    # Time budget per move, the time the current search must finish by
+    # (if it has one), and the depth the last search completed
+    self.timeLimit = timeLimit
+    self.deadline = None
+    self.completedDepth = 0
+
+    # Search statistics
+    self.nodeCount = 0
+
+    # Parallel search (see searchInParallel)
+    self.numProcesses = numProcesses
+    self.rootActionKeys = None
+
+    # Values of the positions evaluated so far (see evaluate)
+    self.evalCacheEntries = EVAL_CACHE_ENTRIES
+    self.evalCache = {}
+    self.evalCacheFunction = evalFn
+
     # List of Edges
     self.roads = []
 
@@ -154,12 +246,13 @@ class PlayerAgent(object):
     # List of Cities owned
     self.cities = []
 
-    # Counter of resources initialized to zero
-    self.resources = Counter({ResourceTypes.WOOL: 0, 
-      ResourceTypes.BRICK: 0, 
-      ResourceTypes.ORE: 0, 
-      ResourceTypes.GRAIN: 0, 
-      ResourceTypes.LUMBER: 0})
+    # Count of each resource, initialized to zero
+    self.resources = ResourceVector()
+
+    # Zobrist hash of the resource counts and victory points (all zero so far).
+    # Kept up to date by addResources, subtractResources and addVictoryPoints,
+    # so resources and victoryPoints should only be changed through those.
+    self.zobristHash = 0
     
   def __repr__(self):
     """
@@ -188,15 +281,7 @@ class PlayerAgent(object):
       resources to build a new settlement (based on the SETTLEMENT_COST constant)
     ---------------------
     """
-    modifiedResources = copy.deepcopy(self.resources)
-    modifiedResources.subtract(SETTLEMENT_COST)
-
-    # If any resource counts dip below 0, we don't have enough
-    for resourceType in modifiedResources:
-      if modifiedResources[resourceType] < 0:
-        return False
-
-    return True
+    return self.resources.covers(SETTLEMENT_COST)
 
   def canBuildCity(self):
     """
@@ -207,15 +292,7 @@ class PlayerAgent(object):
       resources to build a new city (based on the CITY_COST constant)
     ----------------------
     """
-    modifiedResources = copy.deepcopy(self.resources)
-    modifiedResources.subtract(CITY_COST)
-
-    # If any resource counts dip below 0, we don't have enough
-    for resourceType in modifiedResources:
-      if modifiedResources[resourceType] < 0:
-        return False
-
-    return True
+    return self.resources.covers(CITY_COST)
 
   def canBuildRoad(self):
     """
@@ -226,15 +303,101 @@ class PlayerAgent(object):
       resources to build a new road (based on the ROAD_COST constant)
     ----------------------
     """
-    modifiedResources = copy.deepcopy(self.resources)
-    modifiedResources.subtract(ROAD_COST)
+    return self.resources.covers(ROAD_COST)
 
-    # If any resource counts dip below 0, we don't have enough
-    for resourceType in modifiedResources:
-      if modifiedResources[resourceType] < 0:
-        return False
+  def evaluate(self, state):
+    """
+    Method: evaluate
+    ----------------------
+    Parameters:
+      state - a GameState to evaluate
+    Returns: the value of the given state to this player by its
+      evaluation function
+
+    Searches evaluate their leaves through this, so that a position
+    reached again (by moves made in another order, or in a later
+    search) is only evaluated once.  Values are remembered by the
+    position's Zobrist hash, up to evalCacheEntries of them, and
+    forgotten when the evaluation function is changed.
+    ----------------------
+    """
+    if self.evalCacheEntries <= 0:
+      return self.evaluationFunction(state, self.agentIndex)
+    evalCache = self.evalCache
+    if self.evalCacheFunction is not self.evaluationFunction:
+      evalCache.clear()
+      self.evalCacheFunction = self.evaluationFunction
+    zobristHash = state.getZobristHash(self.agentIndex)
+    value = evalCache.get(zobristHash)
+    if value is None:
+      value = self.evaluationFunction(state, self.agentIndex)
+      if len(evalCache) >= self.evalCacheEntries:
+        evalCache.clear()
+      evalCache[zobristHash] = value
+    return value
+
+  def canEvaluateInBatches(self):
+    """
+    Method: canEvaluateInBatches
+    ----------------------
+    Parameters: NA
+    Returns: whether this player's evaluation function can score many
+      positions at once from their features (with getRollFeatures and
+      scoreFeatures methods, like a LinearEvaluator), so that
+      evaluateChildren can be used
+    ----------------------
+    """
+    return hasattr(self.evaluationFunction, "scoreFeatures")
 
-    return True
+  def evaluateChildren(self, state, playerIndex, actions):
+    """
+    Method: evaluateChildren
+    ----------------------
+    Parameters:
+      state - a GameState
+      playerIndex - the index of the player to move
+      actions - the actions that player can take
+    Returns: a list of the value of each action to this player, the
+      way a search values the children of a node one move away from
+      its depth: the expected evaluation of the position after the
+      action, over the dice roll that follows it (a position where the
+      game is over is worth inf if the next player to move has won,
+      and -inf otherwise)
+
+    The features of the positions after every action and roll are found
+    first (without making the rolls), and then they are all scored in
+    one go by the evaluation function (which must be able to, see
+    canEvaluateInBatches), instead of evaluating each one on its own.
+    ----------------------
+    """
+    evaluationFunction = self.evaluationFunction
+    nextPlayerIndex = (playerIndex + 1) % state.getNumPlayerAgents()
+    featureBlocks = []
+    numRows = 0
+    # For each action, its dice outcomes and either the index of the
+    # first of their feature rows or the value of the game being over
+    children = []
+    for action in actions:
+      state.makeMove(playerIndex, action)
+      outcomes = state.getDiceOutcomes()
+      self.nodeCount += len(outcomes)
+      winner = state.gameOver()
+      if winner > -1:
+        children.append((outcomes, None, float('inf') if winner == nextPlayerIndex else float('-inf')))
+      else:
+        children.append((outcomes, numRows, None))
+        featureBlocks.append(evaluationFunction.getRollFeatures(state, self.agentIndex, [roll for roll, probability in outcomes]))
+        numRows += len(outcomes)
+      state.undoMove()
+
+    scores = evaluationFunction.scoreFeatures(featureBlocks).tolist() if numRows > 0 else []
+    values = []
+    for outcomes, firstRow, gameOverValue in children:
+      value = 0
+      for i, (roll, probability) in enumerate(outcomes):
+        value += probability * (gameOverValue if firstRow is None else scores[firstRow + i])
+      values.append(value)
+    return values
 
   def deepCopy(self, board):
     """
@@ -251,17 +414,183 @@ class PlayerAgent(object):
     newCopy.depth = self.depth
     newCopy.roads = [board.getEdge(road.X, road.Y) for road in self.roads]
     newCopy.settlements = [board.getVertex(settlement.X, settlement.Y) for settlement in self.settlements]
-    newCopy.resources = copy.deepcopy(self.resources)
+    newCopy.resources = self.resources.deepCopy()
     newCopy.cities = [board.getVertex(city.X, city.Y) for city in self.cities]
+    newCopy.zobristHash = self.zobristHash
+    newCopy.evalCacheEntries = self.evalCacheEntries
     return newCopy
 
+  def serialize(self):
+    """
+    Method: serialize
+    ----------------------
+    Parameters: NA
+    Returns: a compact copy of this player's victory points, resources
+      and pieces (by ID), made only of lists and numbers, for deserialize
+      to give to another PlayerAgent (see GameState.serialize)
+    ----------------------
+    """
+    return (self.victoryPoints, list(self.resources.counts), [settlement.id for settlement in self.settlements],
+      [city.id for city in self.cities], [road.id for road in self.roads], self.zobristHash)
+
+  def deserialize(self, data, board):
+    """
+    Method: deserialize
+    ----------------------
+    Parameters:
+      data - the result of serialize on a PlayerAgent
+      board - the Board this player's pieces are on
+    Returns: NA
+
+    Gives this player the victory points, resources and pieces in data.
+    ----------------------
+    """
+    victoryPoints, resourceCounts, settlementIds, cityIds, roadIds, zobristHash = data
+    self.victoryPoints = victoryPoints
+    self.resources = ResourceVector()
+    self.resources.counts = resourceCounts
+    self.settlements = [board.vertexViews[i] for i in settlementIds]
+    self.cities = [board.vertexViews[i] for i in cityIds]
+    self.roads = [board.edgeViews[i] for i in roadIds]
+    self.zobristHash = zobristHash
+
+  def getCountZobristKey(self, feature, count):
+    """
+    Method: getCountZobristKey
+    ----------------------
+    Parameters:
+      feature - the counted feature, e.g. a resource type or "VICTORY_POINTS"
+      count - how many of that feature this player has
+    Returns: the Zobrist key for this player having count of feature.
+      A count of 0 has key 0, so features the player has none of
+      don't contribute to the hash.
+    ----------------------
+    """
+    if count == 0:
+      return 0
+    return getZobristKey(feature, self.agentIndex, count)
+
+  def computeZobristHash(self):
+    """
+    Method: computeZobristHash
+    ----------------------
+    Parameters: NA
+    Returns: the Zobrist hash of this player's resources and victory points,
+      computed from scratch (zobristHash holds the incrementally updated value)
+    ----------------------
+    """
+    zobristHash = self.getCountZobristKey("VICTORY_POINTS", self.victoryPoints)
+    for resourceType, count in self.resources.iteritems():
+      zobristHash ^= self.getCountZobristKey(resourceType, count)
+    return zobristHash
+
+  def addResources(self, resources):
+    """
+    Method: addResources
+    ----------------------
+    Parameters:
+      resources - a ResourceVector (or a dictionary from resource type
+        to the number of that resource) to give this player
+    Returns: NA
+
+    Adds the given resources to this player's resources, updating
+    the player's Zobrist hash to match.
+    ----------------------
+    """
+    if not isinstance(resources, ResourceVector): resources = ResourceVector(resources)
+    self.changeResourceCounts(resources.counts, 1)
+
+  def subtractResources(self, resources):
+    """
+    Method: subtractResources
+    ----------------------
+    Parameters:
+      resources - a ResourceVector (or a dictionary from resource type
+        to the number of that resource) to take away from this player
+    Returns: NA
+
+    The inverse of addResources.
+    ----------------------
+    """
+    if not isinstance(resources, ResourceVector): resources = ResourceVector(resources)
+    self.changeResourceCounts(resources.counts, -1)
+
+  def addResourceCounts(self, counts):
+    """
+    Method: addResourceCounts
+    ----------------------
+    Parameters:
+      counts - a list of the number of each resource (in RESOURCE_ORDER)
+        to give this player, like Board.getProduction returns
+    Returns: NA
+
+    Like addResources, but for a list of counts.
+    ----------------------
+    """
+    self.changeResourceCounts(counts, 1)
+
+  def subtractResourceCounts(self, counts):
+    """
+    Method: subtractResourceCounts
+    ----------------------
+    Parameters:
+      counts - a list of the number of each resource (in RESOURCE_ORDER)
+        to take away from this player
+    Returns: NA
+
+    The inverse of addResourceCounts.
+    ----------------------
+    """
+    self.changeResourceCounts(counts, -1)
+
+  def changeResourceCounts(self, counts, sign):
+    """
+    Method: changeResourceCounts
+    ----------------------
+    Parameters:
+      counts - a list of the number of each resource (in RESOURCE_ORDER)
+      sign - 1 to give this player those resources, -1 to take them away
+    Returns: NA
+
+    Shared by addResourceCounts and subtractResourceCounts.  Only the
+    resources that change get their Zobrist keys swapped.
+    ----------------------
+    """
+    resourceCounts = self.resources.counts
+    zobristHash = self.zobristHash
+    for i in xrange(NUM_RESOURCES):
+      count = counts[i]
+      if count == 0: continue
+      oldCount = resourceCounts[i]
+      newCount = oldCount + sign * count
+      resourceCounts[i] = newCount
+      if oldCount != 0: zobristHash ^= getZobristKey(RESOURCE_ORDER[i], self.agentIndex, oldCount)
+      if newCount != 0: zobristHash ^= getZobristKey(RESOURCE_ORDER[i], self.agentIndex, newCount)
+    self.zobristHash = zobristHash
+
+  def addVictoryPoints(self, points):
+    """
+    Method: addVictoryPoints
+    ----------------------
+    Parameters:
+      points - the number of victory points to give this player (may be negative)
+    Returns: NA
+
+    Adds to this player's victory points, updating the player's Zobrist hash to match.
+    ----------------------
+    """
+    self.zobristHash ^= self.getCountZobristKey("VICTORY_POINTS", self.victoryPoints)
+    self.victoryPoints += points
+    self.zobristHash ^= self.getCountZobristKey("VICTORY_POINTS", self.victoryPoints)
+
   def applyAction(self, action, board):
     """
     Method: applyAction
     -----------------------
     Parameters:
       action - the action tuple (ACTION, LOCATION) to applyAction
-    Returns: NA
+    Returns: for a city, the (index, settlement) pair removed from
+      the player's list of settlements (needed by undoAction), otherwise None
 
     Applies the given action tuple to the current player.  Does this
     by deducting resources appropriately and adding to/removing from the player's
@@ -281,8 +610,8 @@ class PlayerAgent(object):
       actionVertex = action[1]
       vertex = board.getVertex(actionVertex.X, actionVertex.Y)
       self.settlements.append(vertex)
-      self.resources.subtract(SETTLEMENT_COST)
-      self.victoryPoints += SETTLEMENT_VICTORY_POINTS
+      self.subtractResources(SETTLEMENT_COST)
+      self.addVictoryPoints(SETTLEMENT_VICTORY_POINTS)
 
     # Building a road
     if action[0] is ACTIONS.ROAD:
@@ -293,7 +622,7 @@ class PlayerAgent(object):
       actionEdge = action[1]
       road = board.getEdge(actionEdge.X, actionEdge.Y)
       self.roads.append(road)
-      self.resources.subtract(ROAD_COST)
+      self.subtractResources(ROAD_COST)
 
     # Building a city
     if action[0] is ACTIONS.CITY:
@@ -305,14 +634,51 @@ class PlayerAgent(object):
       actionVertex = action[1]
       vertex = board.getVertex(actionVertex.X, actionVertex.Y)
       self.cities.append(vertex)
-      for settlement in self.settlements:
+      removedSettlement = None
+      for i, settlement in enumerate(self.settlements):
         if settlement.X == vertex.X and settlement.Y == vertex.Y:
-          self.settlements.remove(settlement)
+          del self.settlements[i]
+          removedSettlement = (i, settlement)
           break
 
       # and update victory points and resources
-      self.resources.subtract(CITY_COST)
-      self.victoryPoints += CITY_VICTORY_POINTS
+      self.subtractResources(CITY_COST)
+      self.addVictoryPoints(CITY_VICTORY_POINTS)
+      return removedSettlement
+
+  def undoAction(self, action, undoInfo):
+    """
+    Method: undoAction
+    -----------------------
+    Parameters:
+      action - the action tuple (ACTION, LOCATION) to reverse
+      undoInfo - the value applyAction returned for this action
+    Returns: NA
+
+    Reverses an action previously applied with applyAction by refunding
+    its cost and removing the road, settlement or city it built.  Actions
+    must be undone in the reverse order they were applied.
+    -----------------------
+    """
+    if action is None:
+      return
+
+    if action[0] is ACTIONS.SETTLE:
+      self.settlements.pop()
+      self.addResources(SETTLEMENT_COST)
+      self.addVictoryPoints(-SETTLEMENT_VICTORY_POINTS)
+
+    if action[0] is ACTIONS.ROAD:
+      self.roads.pop()
+      self.addResources(ROAD_COST)
+
+    if action[0] is ACTIONS.CITY:
+      self.cities.pop()
+      if undoInfo is not None:
+        index, settlement = undoInfo
+        self.settlements.insert(index, settlement)
+      self.addResources(CITY_COST)
+      self.addVictoryPoints(-CITY_VICTORY_POINTS)
 
   def updateResources(self, diceRoll, board):
     """
@@ -321,15 +687,15 @@ class PlayerAgent(object):
     Parameters:
       diceRoll - the sum of the two dice Rolled
       board - a Board object representing the current board state
-    Returns: a Counter containing the number of each resource gained
+    Returns: a list of the number of each resource (in RESOURCE_ORDER) gained
 
     Takes the current dice roll and board setup, and awards
     the current player resources depending on built settlements on the board.
     Returns the count of each resource that the player gained.
     -----------------------------
     """
-    newResources = Counter(board.getResourcesFromDieRollForPlayer(self.agentIndex, diceRoll))
-    self.resources += newResources
+    newResources = board.getProduction(self.agentIndex, diceRoll)
+    self.addResourceCounts(newResources)
     return newResources
 
   def collectInitialResources(self, board):
@@ -347,15 +713,11 @@ class PlayerAgent(object):
     one bordering BRICK, this player would receive 2 BRICK and 1 ORE.
     --------------------------------
     """
-    # Get resources for each settlement
+    # Take 1 resource of each of the tiles bordering each settlement
+    # (counted ahead of time in the board's VertexProductionTable)
+    resourceCounts = board.productionTable.resourceCounts
     for settlement in self.settlements:
-
-      # Find all tiles bordering this settlement and
-      # take 1 resource of each of the surrounding tile types
-      borderingTiles = board.getHexes(settlement)
-      for borderingTile in borderingTiles:
-        if borderingTile.resource is not ResourceTypes.NOTHING:
-          self.resources[borderingTile.resource] += 1
+      self.addResources(resourceCounts[settlement.id])
 
   def hasWon(self):
     """
@@ -381,6 +743,134 @@ class PlayerAgent(object):
     """
     raise Exception("Cannot get action for superclass - must implement getAction in PlayerAgent subclass!")
 
+  def checkTime(self):
+    """
+    Method: checkTime
+    -----------------------------
+    Parameters: NA
+    Returns: NA
+
+    Raises a SearchTimeout if the current search has a deadline and
+    it has passed.  Called by searches at every interior node.
+    -----------------------------
+    """
+    if self.deadline is not None and time.time() > self.deadline:
+      raise SearchTimeout("Player " + str(self.agentIndex) + " ran out of time")
+
+  def iterativeDeepening(self, state, possibleActions, searchRoot):
+    """
+    Method: iterativeDeepening
+    -----------------------------
+    Parameters:
+      state - the GameState being searched
+      possibleActions - the actions this player can take in state
+      searchRoot - a function (depth, orderedActions) -> (value, action)
+        that searches the given actions, in order, to the given depth
+    Returns: a (value, action) tuple for the best action found
+
+    Without a time limit this just searches to self.depth.  With one, it
+    searches to depth 1, 2, ... self.depth until the time runs out, and
+    returns the result of the deepest search that finished.  Each search
+    tries the previous search's best action first.  The depth 1 search
+    always runs to completion so that there is a move to return.
+    -----------------------------
+    """
+    self.nodeCount = 0
+    # A worker process only searches its share of the actions
+    if self.rootActionKeys is not None:
+      possibleActions = [action for action in possibleActions if getActionKey(action) in self.rootActionKeys]
+    elif self.numProcesses > 1 and len(possibleActions) > 1:
+      return self.searchInParallel(state, possibleActions)
+
+    if self.timeLimit is None:
+      self.completedDepth = self.depth
+      return searchRoot(self.depth, possibleActions)
+
+    startTime = time.time()
+    undoLogLength = len(state.undoLog)
+    orderedActions = list(possibleActions)
+    best = None
+    self.completedDepth = 0
+    for depth in range(1, self.depth + 1):
+      if depth > 1:
+        self.deadline = startTime + self.timeLimit
+      try:
+        best = searchRoot(depth, orderedActions)
+      except SearchTimeout:
+        # Put back any moves the unfinished search had made
+        while len(state.undoLog) > undoLogLength:
+          state.undoMove()
+        break
+      self.completedDepth = depth
+
+      # No need to search deeper once a win or loss is certain
+      if best[0] == float('inf') or best[0] == float('-inf'):
+        break
+      orderedActions.remove(best[1])
+      orderedActions.insert(0, best[1])
+
+    self.deadline = None
+    return best
+
+  def getSearchArgs(self):
+    """
+    Method: getSearchArgs
+    -----------------------------
+    Parameters: NA
+    Returns: a dictionary of the keyword arguments to make an agent of
+      this class that searches like this one does (for worker processes)
+    -----------------------------
+    """
+    return {"depth": self.depth, "evalFn": self.evaluationFunction, "timeLimit": self.timeLimit}
+
+  def searchInParallel(self, state, possibleActions):
+    """
+    Method: searchInParallel
+    -----------------------------
+    Parameters:
+      state - the GameState being searched
+      possibleActions - the actions this player can take in state,
+        most promising first
+    Returns: a (value, action) tuple for the best action found
+
+    Shares the actions out between numProcesses worker processes, which
+    each search their share the way this agent would (see runSearchWorker)
+    and return their best one.  The actions are dealt out in turn so that
+    each worker gets some of the most promising ones.  The state is sent
+    to the workers serialized (see GameState.serialize).  nodeCount is the
+    workers' total, and completedDepth the shallowest one they completed.
+    -----------------------------
+    """
+    numTasks = min(self.numProcesses, len(possibleActions))
+    serializedState = state.serialize()
+    searchArgs = self.getSearchArgs()
+    tasks = [(type(self), self.agentIndex, searchArgs, serializedState,
+      [getActionKey(action) for action in possibleActions[i::numTasks]]) for i in xrange(numTasks)]
+    actionsByKey = dict((getActionKey(action), action) for action in possibleActions)
+
+    best = None
+    self.nodeCount = 0
+    self.completedDepth = self.depth
+    for value, actionKey, nodeCount, completedDepth in getSearchPool(self.numProcesses).map(runSearchWorker, tasks):
+      self.nodeCount += nodeCount
+      self.completedDepth = min(self.completedDepth, completedDepth)
+      if best is None or value > best[0]:
+        best = (value, actionsByKey[actionKey])
+    return best
+
+  def runWorkerSearch(self, state):
+    """
+    Method: runWorkerSearch
+    -----------------------------
+    Parameters:
+      state - the GameState to search, in a worker process
+    Returns: a (value, action key, node count, completed depth) tuple
+      for the best of this agent's share of the actions
+    -----------------------------
+    """
+    value, action = self.getAction(state)
+    return (value, getActionKey(action), self.nodeCount, self.completedDepth)
+
 
 class PlayerAgentExpectiminimax(PlayerAgent):
   """
@@ -392,9 +882,12 @@ class PlayerAgentExpectiminimax(PlayerAgent):
   (and that the dice follow a random policy).
   --------------------------------
   """
+  __slots__ = ("transpositionTable",)
 
-  def __init__(self, name, agentIndex, color, depth = 3, evalFn = defaultEvalFn):
-    super(PlayerAgentExpectiminimax, self).__init__(name, agentIndex, color, depth=depth, evalFn=evalFn)
+  def __init__(self, name, agentIndex, color, depth = 3, evalFn = defaultEvalFn, transpositionTableMB = TRANSPOSITION_TABLE_MB, timeLimit = SEARCH_TIME_LIMIT, numProcesses = SEARCH_PROCESSES):
+    super(PlayerAgentExpectiminimax, self).__init__(name, agentIndex, color, depth=depth, evalFn=evalFn, timeLimit=timeLimit, numProcesses=numProcesses)
+    # Search results shared by all of this agent's searches in a game
+    self.transpositionTable = TranspositionTable(transpositionTableMB)
 
   def getAction(self, state):
     """
@@ -415,6 +908,7 @@ class PlayerAgentExpectiminimax(PlayerAgent):
     # of the given game state with the given depth on the given player's turn.
     # Assumes other players are minimizing agents.
     def recurse(currState, currDepth, playerIndex):
+      self.nodeCount += 1
       # TERMINAL CASES
       # ---------------------
       # If the player won
@@ -425,22 +919,29 @@ class PlayerAgentExpectiminimax(PlayerAgent):
         return float('-inf')
       # If the max depth has been reached, call the eval function
       elif currDepth is 0:
-        return self.evaluationFunction(currState, self.agentIndex)
+        return self.evaluate(currState)
+
+      # If we've already searched this position at least this deeply
+      # (reached by another order of moves, or on an earlier turn), reuse it
+      zobristHash = currState.getZobristHash(playerIndex)
+      entry = self.transpositionTable.lookup(zobristHash)
+      if entry is not None and entry.depth >= currDepth:
+        return entry.value
+
+      # Stop if we've used up our time for this move
+      self.checkTime()
 
       possibleActions = currState.getLegalActions(playerIndex)
 
       # If there are no possible actions (must pass)
       if len(possibleActions) is 0:
-        return self.evaluationFunction(currState, self.agentIndex)
+        return self.evaluate(currState)
       # if len(possibleActions) > 6:
       #   return self.evaluationFunction(currState, self.agentIndex)
 
       # RECURSIVE CASE
       # ----------------------
 
-      # Get dice roll probabilities to calculate expected utility
-      rollProbabilities = currState.diceAgent.getRollDistribution()
-
       # New depth (depth - 1 for last player, otherwise depth)
       # newPlayerIndex goes through 0, 1,...numAgents - 1 (looping around)
       newDepth = currDepth - 1 if playerIndex is not self.agentIndex else currDepth
@@ -449,29 +950,45 @@ class PlayerAgentExpectiminimax(PlayerAgent):
       # List of all values
       vals = []
 
-      # Try all possible actions
-      for currAction in possibleActions:
-        currVal = 0
+      # If all of the children are leaves and the evaluation function can
+      # score many positions at once, score them all together
+      if newDepth is 0 and self.canEvaluateInBatches():
+        vals = self.evaluateChildren(currState, playerIndex, possibleActions)
+
+      # Otherwise try all possible actions
+      else:
+        for currAction in possibleActions:
+          currVal = 0
 
-        # For each action, the utility is the sum of the weighted
-        # utilities for all possible dice rolls (we need to add all weighted
-        # utilities together to get the expected utility)
-        for probabilityTuple in rollProbabilities:
-          roll, probability = probabilityTuple
-          successor = currState.generateSuccessor(playerIndex, currAction)
-          successor.updatePlayerResourcesForDiceRoll(roll)
-          value = recurse(successor, newDepth, newPlayerIndex)
+          # For each action, the utility is the sum of the weighted
+          # utilities for all possible dice rolls (we need to add all weighted
+          # utilities together to get the expected utility).  Rolls that hand
+          # out the same resources lead to the same state, so we only need to
+          # search one of them, weighted by their total probability.
+          # The action is the same for every roll, so it is only made once,
+          # and each roll just adds (and then takes back) its resources.
+          currState.makeMove(playerIndex, currAction)
+          for probabilityTuple in currState.getDiceOutcomes():
+            roll, probability = probabilityTuple
+            currState.makeDiceRoll(roll)
+            value = recurse(currState, newDepth, newPlayerIndex)
+            currState.undoMove()
 
-          currVal += probability * value
+            currVal += probability * value
+          currState.undoMove()
 
-        vals.append(currVal)
+          vals.append(currVal)
 
       # Maximize/minimize depending on player
       if playerIndex is self.agentIndex:
-        return max(vals)
-      return min(vals)     
+        value = max(vals)
+      else:
+        value = min(vals)
+      self.transpositionTable.store(zobristHash, value, currDepth, BOUNDS.EXACT, possibleActions[vals.index(value)])
+      return value
 
     # Call our recursive function
+    self.transpositionTable.newSearch()
 
     # TERMINAL CASES
     # ---------------------
@@ -486,31 +1003,49 @@ class PlayerAgentExpectiminimax(PlayerAgent):
 
     # If the max depth has been reached, call the eval function
     elif self.depth is 0:
-      return (self.evaluationFunction(state, self.agentIndex), None)
+      return (self.evaluate(state), None)
 
     possibleActions = state.getLegalActions(self.agentIndex)
 
     # If there are no possible actions (must pass)
     if len(possibleActions) is 0:
-      return (self.evaluationFunction(state, self.agentIndex), None)
+      return (self.evaluate(state), None)
 
     # RECURSIVE CASE
     # ----------------------
 
-    # Parallel lists of values and their corresponding actions
-    vals = []
-    actions = []
-
     newPlayerIndex = (self.agentIndex + 1) % state.getNumPlayerAgents()
 
-    # Try all possible actions
-    for currAction in possibleActions:
-      successor = state.generateSuccessor(self.agentIndex, currAction)
-      value = recurse(successor, self.depth, newPlayerIndex)
-      vals.append(value)
-      actions.append(currAction)
+    # Searches all the given actions to the given depth
+    def searchRoot(depth, orderedActions):
+      # Parallel lists of values and their corresponding actions
+      vals = []
+      actions = []
+
+      # Try all possible actions
+      for currAction in orderedActions:
+        state.makeMove(self.agentIndex, currAction)
+        value = recurse(state, depth, newPlayerIndex)
+        state.undoMove()
+        vals.append(value)
+        actions.append(currAction)
+
+      return (max(vals), actions[vals.index(max(vals))])
 
-    return (max(vals), actions[vals.index(max(vals))])
+    return self.iterativeDeepening(state, possibleActions, searchRoot)
+
+def getActionKey(action):
+  """
+  Function: getActionKey
+  ---------------------------
+  Parameters:
+    action - an action tuple (ACTION, LOCATION), or None
+  Returns: a key for the action that is the same for the same action in
+    any copy of a board: (ACTION, the ID of the location on the board)
+  ---------------------------
+  """
+  if action is None: return None
+  return (action[0], action[1].id)
 
 class PlayerAgentAlphaBeta(PlayerAgent):
   """
@@ -521,11 +1056,83 @@ class PlayerAgentAlphaBeta(PlayerAgent):
   to determine what action it should take.  This assumes
   that opponents are following a min adversarial policy
   (and that the dice follow a random policy).
+
+  To prune as much as possible, actions are tried best-looking first
+  (see orderActions): the best action the transposition table knows of,
+  then the killer moves (recent actions that caused a cutoff at the same
+  depth), then cities, settlements and roads, each by their history score
+  (how much searching their cutoffs have saved so far this search).
+
+  Every value in the tree lies within the agent's evalBounds (a loss is
+  worth the lower bound and a win the upper one), so that the window each
+  dice roll outcome is searched with can be narrowed to the one the
+  outcome would need to be outside of to put the expected value of the
+  roll outside the window (Ballard's Star1).  The order actions are tried
+  in changes how much is pruned, but never the value found.
   --------------------------------
   """
+  __slots__ = ("transpositionTable", "killerMoves", "historyScores", "minValue", "maxValue")
+
+  def __init__(self, name, agentIndex, color, depth = 3, evalFn = defaultEvalFn, transpositionTableMB = TRANSPOSITION_TABLE_MB, timeLimit = SEARCH_TIME_LIMIT, numProcesses = SEARCH_PROCESSES, evalBounds = EVAL_BOUNDS):
+    super(PlayerAgentAlphaBeta, self).__init__(name, agentIndex, color, depth, evalFn=evalFn, timeLimit=timeLimit, numProcesses=numProcesses)
+    # The values of a loss and a win
+    self.minValue, self.maxValue = evalBounds
+    # Search results shared by all of this agent's searches in a game
+    self.transpositionTable = TranspositionTable(transpositionTableMB)
+    # Move ordering information for the current search: the killer move keys
+    # for each (depth, player index), and the history score of each player's
+    # action keys (see getActionKey)
+    self.killerMoves = {}
+    self.historyScores = dict((i, {}) for i in xrange(NUM_PLAYERS))
+
+  def getSearchArgs(self):
+    searchArgs = super(PlayerAgentAlphaBeta, self).getSearchArgs()
+    searchArgs["evalBounds"] = (self.minValue, self.maxValue)
+    return searchArgs
+
+  def orderActions(self, actions, currDepth, playerIndex, entry):
+    """
+    Method: orderActions
+    ------------------------
+    Parameters:
+      actions - the legal actions in a position, in getLegalActions' order
+      currDepth - the depth the position is being searched to
+      playerIndex - the index of the player to move
+      entry - the position's TranspositionEntry, or None
+    Returns: the actions sorted so that the ones most likely to cause a
+      cutoff come first (see the class description).  Otherwise equal
+      actions stay in their original order.
+    ------------------------
+    """
+    bestKey = getActionKey(entry.bestAction) if entry is not None else None
+    killers = self.killerMoves.get((currDepth, playerIndex), ())
+    historyScores = self.historyScores[playerIndex]
+    def getPriority(action):
+      key = getActionKey(action)
+      return (key == bestKey, key in killers, ACTION_ORDER_PRIORITY[action[0]], historyScores.get(key, 0))
+    return sorted(actions, key = getPriority, reverse = True)
+
+  def recordCutoff(self, action, currDepth, playerIndex):
+    """
+    Method: recordCutoff
+    ------------------------
+    Parameters:
+      action - an action that caused a cutoff
+      currDepth - the depth the position was being searched to
+      playerIndex - the index of the player who took the action
+    Returns: NA
 
-  def __init__(self, name, agentIndex, color, depth = 3, evalFn = defaultEvalFn):
-    super(PlayerAgentAlphaBeta, self).__init__(name, agentIndex, color, depth, evalFn=evalFn)
+    Makes the action a killer move at this depth, and adds to its history
+    score (more for cutoffs higher up the tree, which save more searching).
+    ------------------------
+    """
+    key = getActionKey(action)
+    killers = self.killerMoves.setdefault((currDepth, playerIndex), [])
+    if key not in killers:
+      killers.insert(0, key)
+      del killers[NUM_KILLER_MOVES:]
+    historyScores = self.historyScores[playerIndex]
+    historyScores[key] = historyScores.get(key, 0) + currDepth * currDepth
 
   def getAction(self, state):
     """
@@ -542,105 +1149,409 @@ class PlayerAgentAlphaBeta(PlayerAgent):
     otherwise - e.g. (ACTIONS.SETTLE, *corresponding Vertex object where settlement is*).
     ------------------------
     """
+    minValue, maxValue = self.minValue, self.maxValue
+
+    # The evaluation function's value for self, kept within the bounds
+    def evaluate(currState):
+      return min(max(self.evaluate(currState), minValue), maxValue)
+
     # A function that recursively calculates and returns the utility for self
-    # of the given game state with the given depth on the given player's turn.
+    # of the given game state with the given depth on the given player's turn,
+    # if it is inside (alpha, beta).  Otherwise it returns a bound outside the
+    # window: an upper bound <= alpha, or a lower bound >= beta.
     # Assumes other players are minimizing agents.
 
     # NOTE: this now returns a tuple (score, action)
     def recurse(currState, currDepth, playerIndex, alpha, beta):
+      self.nodeCount += 1
       # TERMINAL CASES
       # ---------------------
-      # If the player won
-      if currState.gameOver() == playerIndex:
-        return (float('inf'), None)
+      # If this player won
+      winner = currState.gameOver()
+      if winner == self.agentIndex:
+        return (maxValue, None)
       # or lost
-      elif currState.gameOver() > -1:
-        return (float('-inf'), None)
+      elif winner > -1:
+        return (minValue, None)
       # If the max depth has been reached, call the eval function
       elif currDepth is 0:
-        return (self.evaluationFunction(currState, self.agentIndex), None)
+        return (evaluate(currState), None)
+
+      # If we've already searched this position at least this deeply, reuse
+      # the result if it is exact or a bound that causes a cutoff here
+      zobristHash = currState.getZobristHash(playerIndex)
+      entry = self.transpositionTable.lookup(zobristHash)
+      if entry is not None and entry.depth >= currDepth:
+        if (entry.bound is BOUNDS.EXACT
+          or (entry.bound is BOUNDS.LOWER and entry.value >= beta)
+          or (entry.bound is BOUNDS.UPPER and entry.value <= alpha)):
+          return (entry.value, entry.bestAction)
+      originalAlpha, originalBeta = alpha, beta
+
+      # Stop if we've used up our time for this move
+      self.checkTime()
 
       possibleActions = currState.getLegalActions(playerIndex)
 
       # If there are no possible actions (must pass)
       if len(possibleActions) is 0:
-        return (self.evaluationFunction(currState, self.agentIndex), None)
+        return (evaluate(currState), None)
+
+      # Try the actions most likely to cause a cutoff first
+      possibleActions = self.orderActions(possibleActions, currDepth, playerIndex, entry)
 
       # RECURSIVE CASE
       # ----------------------
 
-      # Get dice roll probabilities to calculate expected utility
-      rollProbabilities = currState.diceAgent.getRollDistribution()
-
       # New depth (depth - 1 for last player, otherwise depth)
       # newPlayerIndex goes through 0, 1,...numAgents - 1 (looping around)
       newDepth = currDepth - 1 if playerIndex is not self.agentIndex else currDepth
       newPlayerIndex = (playerIndex + 1) % currState.getNumPlayerAgents()
 
-      # List of all values
-      vals = []
+      # Maximize for self, minimize for the other players
+      maximizing = playerIndex == self.agentIndex
+      best = None
+      for currAction in possibleActions:
+        # The action is the same for every roll, so it is only made once
+        currState.makeMove(playerIndex, currAction)
+        currVal = searchDiceRoll(currState, newDepth, newPlayerIndex, alpha, beta)
+        currState.undoMove()
+
+        if maximizing and (best is None or currVal > best[0]):
+          best = (currVal, currAction)
+          alpha = max(alpha, currVal)
+        elif not maximizing and (best is None or currVal < best[0]):
+          best = (currVal, currAction)
+          beta = min(beta, currVal)
+        if beta <= alpha:
+          self.recordCutoff(currAction, currDepth, playerIndex)
+          break
 
-      # Maximizing Agents
-      if (playerIndex == 0):
-        # Hacky way to get around the fact we use a set
-        firstFlag = True
-        best = (beta, None)
-        for currAction in possibleActions:
-          if firstFlag:
-            best = (beta, currAction)
-            firstFlag = False
-          currVal = 0
+      # A value outside the original window is only a bound on the true value.
+      # The dice rolls above only narrow the window as far as keeps that bound
+      # true (see searchDiceRoll), so it holds for any later search that
+      # reaches this position, on this turn or a later one.
+      value, bestAction = best
+      if value <= originalAlpha:
+        bound = BOUNDS.UPPER
+      elif value >= originalBeta:
+        bound = BOUNDS.LOWER
+      else:
+        bound = BOUNDS.EXACT
+      self.transpositionTable.store(zobristHash, value, currDepth, bound, bestAction)
+      return best
+
+    # Returns the expected utility for self of the dice roll after an action
+    # (playerIndex is the next player to act), with the same window and
+    # return values as recurse.  Rolls that hand out the same resources lead
+    # to the same state, so only one of them is searched, weighted by their
+    # total probability.  Each outcome is searched with the window (Star1)
+    # that it would need to be outside of for the expected value to be
+    # outside (alpha, beta), taking the outcomes not yet searched to be
+    # anywhere between a loss and a win.  So a cutoff in one outcome is
+    # only taken when it settles which side of the window the average is on.
+    def searchDiceRoll(currState, currDepth, playerIndex, alpha, beta):
+      outcomes = currState.getDiceOutcomes()
+      probabilities = [probability for roll, probability in outcomes]
+      searchedSum = 0
+      for i, (roll, probability) in enumerate(outcomes):
+        otherProbability = sum(probabilities[i + 1:])
+        otherUpperSum = searchedSum + otherProbability * maxValue
+        otherLowerSum = searchedSum + otherProbability * minValue
+        childAlpha = (alpha - otherUpperSum) / probability
+        childBeta = (beta - otherLowerSum) / probability
+        if childAlpha >= maxValue:
+          return otherUpperSum + probability * maxValue
+        if childBeta <= minValue:
+          return otherLowerSum + probability * minValue
+
+        currState.makeDiceRoll(roll)
+        value, action = recurse(currState, currDepth, playerIndex, max(childAlpha, minValue), min(childBeta, maxValue))
+        currState.undoMove()
+
+        if value <= childAlpha:
+          return otherUpperSum + probability * value
+        if value >= childBeta:
+          return otherLowerSum + probability * value
+        searchedSum += probability * value
+      return searchedSum
 
-          # For each action, the utility is the sum of the weighted
-          # utilities for all possible dice rolls (we need to add all weighted
-          # utilities together to get the expected utility)
-          for probabilityTuple in rollProbabilities:
-            roll, probability = probabilityTuple
-            successor = currState.generateSuccessor(playerIndex, currAction)
-            successor.updatePlayerResourcesForDiceRoll(roll)
-            value, action = recurse(successor, newDepth, newPlayerIndex, alpha, beta)
+    # Call our recursive function
+    self.transpositionTable.newSearch()
+    self.killerMoves = {}
+    self.historyScores = dict((i, {}) for i in xrange(NUM_PLAYERS))
 
-            currVal += probability * value
+    # TERMINAL CASES
+    # ---------------------
+    
+    # If the player won
+    if state.gameOver() is self.agentIndex:
+      return (float('inf'), None)
 
-          if (currVal > alpha):
-            alpha = currVal
-            best = (alpha, currAction)
-          if beta <= alpha:
-            break
-        return best
-      # Minimizing Agents here
-      else:
-        firstFlag = True
-        alpha = (alpha, None)
-        for currAction in possibleActions:
-          if firstFlag:
-            best = (alpha, currAction)
-            firstFlag = False
+    # or lost
+    elif state.gameOver() > -1:
+      return (float('-inf'), None)
 
-          currVal = 0
-          # For each action, the utility is the sum of the weighted
-          # utilities for all possible dice rolls (we need to add all weighted
-          # utilities together to get the expected utility)
-          for probabilityTuple in rollProbabilities:
-            roll, probability = probabilityTuple
-            successor = currState.generateSuccessor(playerIndex, currAction)
-            successor.updatePlayerResourcesForDiceRoll(roll)
-            value, action = recurse(successor, newDepth, newPlayerIndex, alpha, beta)
+    # If the max depth has been reached, call the eval function
+    elif self.depth is 0:
+      return (self.evaluate(state), None)
 
-            currVal += probability * value
+    possibleActions = state.getLegalActions(self.agentIndex)
 
-          if (currVal < beta):
-            beta = currVal
-            best = (beta, currAction)
-          if beta <= alpha:
-            break
-        return best    
+    # If there are no possible actions (must pass)
+    if len(possibleActions) is 0:
+      return (self.evaluate(state), None)
+
+    # RECURSIVE CASE
+    # ----------------------
+
+    newPlayerIndex = (self.agentIndex + 1) % state.getNumPlayerAgents()
+
+    # Searches all the given actions to the given depth
+    def searchRoot(depth, orderedActions):
+      # Try all possible actions.  Only an action better than the best one
+      # so far matters, so each is searched with the best value so far as alpha
+      # (an action that can't beat it gets a value no higher than it)
+      alpha = minValue
+      best = None
+      for currAction in orderedActions:
+        state.makeMove(self.agentIndex, currAction)
+        value, action = recurse(state, depth, newPlayerIndex, alpha, maxValue)
+        state.undoMove()
+        if best is None or value > best[0]:
+          best = (value, currAction)
+          alpha = max(alpha, value)
+
+      # Report a certain win or loss like the other agents do
+      value, action = best
+      if value >= maxValue:
+        value = float('inf')
+      elif value <= minValue:
+        value = float('-inf')
+      return (value, action)
+
+    # Try the actions most likely to be best first
+    rootEntry = self.transpositionTable.lookup(state.getZobristHash(self.agentIndex))
+    possibleActions = self.orderActions(possibleActions, self.depth, self.agentIndex, rootEntry)
+    return self.iterativeDeepening(state, possibleActions, searchRoot)
+
+class PlayerAgentStar2(PlayerAgentAlphaBeta):
+  """
+  Class: PlayerAgentStar2
+  --------------------------------
+  A subclass of PlayerAgentAlphaBeta that searches the same expectiminimax
+  tree as PlayerAgentExpectiminimax, and like PlayerAgentAlphaBeta prunes
+  at the dice rolls as well as at the players' turns, but using Ballard's
+  Star2 algorithm.
+
+  Once some outcomes of a dice roll have been searched, its expected value
+  is known to lie in a range (since every value lies within evalBounds),
+  and if that range is outside the alpha-beta window the other outcomes
+  need not be searched.  Before searching any outcome fully, each one is
+  probed by searching only the next player's first action, which bounds
+  the outcome from one side (from below for this player, from above for
+  an opponent) and often prunes the roll far more cheaply.  None of this
+  changes the value found.
+  --------------------------------
+  """
+  __slots__ = ()
+
+  def getAction(self, state):
+    """
+    Method: getAction
+    ------------------------
+    Parameters:
+      state - a GameState object containing information about the current state of the game
+    Returns: an action tuple (ACTION, LOCATION) of the action this player should take
+
+    Returns the best possible action that the current player can take, with
+    the same expectiminimax value PlayerAgentExpectiminimax would find (see
+    the class description).  Returns None if no action can be taken, or an
+    action tuple otherwise - e.g. (ACTIONS.SETTLE, *corresponding Vertex object*).
+    ------------------------
+    """
+    minValue, maxValue = self.minValue, self.maxValue
+
+    # The evaluation function's value for self, kept within the bounds
+    def evaluate(currState):
+      return min(max(self.evaluate(currState), minValue), maxValue)
+
+    # The value of a position the search stops at (a win, a loss, or the
+    # maximum depth), or None if the search goes on from it
+    def getLeafValue(currState, currDepth):
+      winner = currState.gameOver()
+      if winner == self.agentIndex:
+        return maxValue
+      elif winner > -1:
+        return minValue
+      elif currDepth is 0:
+        return evaluate(currState)
+      return None
+
+    # Returns the utility for self of the given game state with the given
+    # depth on the given player's turn, if it is inside (alpha, beta).
+    # Otherwise returns a bound outside the window: an upper bound <= alpha,
+    # or a lower bound >= beta.  Assumes other players are minimizing agents.
+    def searchPlayer(currState, currDepth, playerIndex, alpha, beta):
+      self.nodeCount += 1
+      leafValue = getLeafValue(currState, currDepth)
+      if leafValue is not None:
+        return leafValue
+
+      # If we've already searched this position at least this deeply, reuse
+      # the result if it is exact or a bound that causes a cutoff here
+      zobristHash = currState.getZobristHash(playerIndex)
+      entry = self.transpositionTable.lookup(zobristHash)
+      if entry is not None and entry.depth >= currDepth:
+        if (entry.bound is BOUNDS.EXACT
+          or (entry.bound is BOUNDS.LOWER and entry.value >= beta)
+          or (entry.bound is BOUNDS.UPPER and entry.value <= alpha)):
+          return entry.value
+      originalAlpha, originalBeta = alpha, beta
+
+      # Stop if we've used up our time for this move
+      self.checkTime()
+
+      possibleActions = currState.getLegalActions(playerIndex)
+
+      # If there are no possible actions (must pass)
+      if len(possibleActions) is 0:
+        return evaluate(currState)
+
+      # Try the actions most likely to cause a cutoff first
+      possibleActions = self.orderActions(possibleActions, currDepth, playerIndex, entry)
+
+      # New depth (depth - 1 for last player, otherwise depth)
+      # newPlayerIndex goes through 0, 1,...numAgents - 1 (looping around)
+      newDepth = currDepth - 1 if playerIndex is not self.agentIndex else currDepth
+      newPlayerIndex = (playerIndex + 1) % currState.getNumPlayerAgents()
+
+      # Maximize for self, minimize for the other players
+      maximizing = playerIndex == self.agentIndex
+      bestValue, bestAction = None, None
+      for currAction in possibleActions:
+        currState.makeMove(playerIndex, currAction)
+        value = searchDiceRoll(currState, newDepth, newPlayerIndex, alpha, beta)
+        currState.undoMove()
+
+        if maximizing and (bestValue is None or value > bestValue):
+          bestValue, bestAction = value, currAction
+          alpha = max(alpha, value)
+        elif not maximizing and (bestValue is None or value < bestValue):
+          bestValue, bestAction = value, currAction
+          beta = min(beta, value)
+        if beta <= alpha:
+          self.recordCutoff(currAction, currDepth, playerIndex)
+          break
+
+      # A value outside the original window is only a bound on the true value
+      if bestValue <= originalAlpha:
+        bound = BOUNDS.UPPER
+      elif bestValue >= originalBeta:
+        bound = BOUNDS.LOWER
+      else:
+        bound = BOUNDS.EXACT
+      self.transpositionTable.store(zobristHash, bestValue, currDepth, bound, bestAction)
+      return bestValue
+
+    # Returns (lower bound, upper bound) on the value of the given game state
+    # from searching (with the given window) only the player's first action.
+    # Its value is a lower bound for self, and an upper bound for an opponent.
+    def probe(currState, currDepth, playerIndex, alpha, beta):
+      self.nodeCount += 1
+      leafValue = getLeafValue(currState, currDepth)
+      if leafValue is not None:
+        return (leafValue, leafValue)
+
+      zobristHash = currState.getZobristHash(playerIndex)
+      entry = self.transpositionTable.lookup(zobristHash)
+      if entry is not None and entry.depth >= currDepth:
+        if entry.bound is BOUNDS.EXACT:
+          return (entry.value, entry.value)
+        elif entry.bound is BOUNDS.LOWER:
+          return (entry.value, maxValue)
+        return (minValue, entry.value)
+
+      possibleActions = currState.getLegalActions(playerIndex)
+      if len(possibleActions) is 0:
+        value = evaluate(currState)
+        return (value, value)
+
+      firstAction = self.orderActions(possibleActions, currDepth, playerIndex, entry)[0]
+      newDepth = currDepth - 1 if playerIndex is not self.agentIndex else currDepth
+      newPlayerIndex = (playerIndex + 1) % currState.getNumPlayerAgents()
+      currState.makeMove(playerIndex, firstAction)
+      value = searchDiceRoll(currState, newDepth, newPlayerIndex, alpha, beta)
+      currState.undoMove()
+
+      # Only a value that isn't a bound from the wrong side says anything
+      if playerIndex == self.agentIndex:
+        return (value, maxValue) if value > alpha else (minValue, maxValue)
+      return (minValue, value) if value < beta else (minValue, maxValue)
+
+    # Returns the expected utility for self of the dice roll after an action
+    # (playerIndex is the next player to act), with the same window and
+    # return values as searchPlayer
+    def searchDiceRoll(currState, currDepth, playerIndex, alpha, beta):
+      outcomes = currState.getDiceOutcomes()
+      probabilities = [probability for roll, probability in outcomes]
+      lowerBounds = [minValue] * len(outcomes)
+      upperBounds = [maxValue] * len(outcomes)
+
+      # Star2: probe every outcome first.  Stop as soon as the outcomes'
+      # bounds put the expected value outside the window
+      lowerSum, upperSum = minValue, maxValue
+      for i, (roll, probability) in enumerate(outcomes):
+        otherLowerSum = lowerSum - probability * lowerBounds[i]
+        otherUpperSum = upperSum - probability * upperBounds[i]
+        currState.makeDiceRoll(roll)
+        lowerBounds[i], upperBounds[i] = probe(currState, currDepth, playerIndex,
+          (alpha - otherUpperSum) / probability, (beta - otherLowerSum) / probability)
+        currState.undoMove()
+        lowerSum = otherLowerSum + probability * lowerBounds[i]
+        upperSum = otherUpperSum + probability * upperBounds[i]
+        if upperSum <= alpha:
+          return upperSum
+        if lowerSum >= beta:
+          return lowerSum
+
+      # Star1: search each outcome in turn, with the window that it would
+      # need to be outside of for the expected value to be outside (alpha, beta)
+      searchedSum = 0
+      for i, (roll, probability) in enumerate(outcomes):
+        otherLowerSum = searchedSum + sum(p * v for p, v in zip(probabilities[i + 1:], lowerBounds[i + 1:]))
+        otherUpperSum = searchedSum + sum(p * v for p, v in zip(probabilities[i + 1:], upperBounds[i + 1:]))
+        childAlpha = (alpha - otherUpperSum) / probability
+        childBeta = (beta - otherLowerSum) / probability
+        if upperBounds[i] <= childAlpha:
+          return otherUpperSum + probability * upperBounds[i]
+        if lowerBounds[i] >= childBeta:
+          return otherLowerSum + probability * lowerBounds[i]
+
+        if lowerBounds[i] == upperBounds[i]:
+          value = lowerBounds[i]
+        else:
+          currState.makeDiceRoll(roll)
+          value = searchPlayer(currState, currDepth, playerIndex,
+            max(childAlpha, lowerBounds[i]), min(childBeta, upperBounds[i]))
+          currState.undoMove()
+          value = min(max(value, lowerBounds[i]), upperBounds[i])
+
+        if value <= childAlpha:
+          return otherUpperSum + probability * value
+        if value >= childBeta:
+          return otherLowerSum + probability * value
+        searchedSum += probability * value
+      return searchedSum
 
     # Call our recursive function
+    self.transpositionTable.newSearch()
+    self.killerMoves = {}
+    self.historyScores = dict((i, {}) for i in xrange(NUM_PLAYERS))
 
     # TERMINAL CASES
     # ---------------------
-    
+
     # If the player won
     if state.gameOver() is self.agentIndex:
       return (float('inf'), None)
@@ -651,40 +1562,60 @@ class PlayerAgentAlphaBeta(PlayerAgent):
 
     # If the max depth has been reached, call the eval function
     elif self.depth is 0:
-      return (self.evaluationFunction(state, self.agentIndex), None)
+      return (self.evaluate(state), None)
 
     possibleActions = state.getLegalActions(self.agentIndex)
 
     # If there are no possible actions (must pass)
     if len(possibleActions) is 0:
-      return (self.evaluationFunction(state, self.agentIndex), None)
+      return (self.evaluate(state), None)
 
     # RECURSIVE CASE
     # ----------------------
 
-    # Parallel lists of values and their corresponding actions
-    vals = []
-    actions = []
-
     newPlayerIndex = (self.agentIndex + 1) % state.getNumPlayerAgents()
 
-    # Try all possible actions
-    for currAction in possibleActions:
-      successor = state.generateSuccessor(self.agentIndex, currAction)
-      value, action = recurse(successor, self.depth, newPlayerIndex, float("-inf"), float("inf"))
-      vals.append(value)
-      actions.append(currAction)
-
-    return (max(vals), actions[vals.index(max(vals))])
+    # Searches all the given actions to the given depth
+    def searchRoot(depth, orderedActions):
+      # Each action is searched with the best value so far as alpha
+      # (an action that can't beat it gets a value no higher than it)
+      alpha = minValue
+      best = None
+      for currAction in orderedActions:
+        state.makeMove(self.agentIndex, currAction)
+        value = searchPlayer(state, depth, newPlayerIndex, alpha, maxValue)
+        state.undoMove()
+        if best is None or value > best[0]:
+          best = (value, currAction)
+          alpha = max(alpha, value)
+
+      # Report a certain win or loss like the other agents do
+      value, action = best
+      if value >= maxValue:
+        value = float('inf')
+      elif value <= minValue:
+        value = float('-inf')
+      return (value, action)
+
+    # Try the actions most likely to be best first
+    rootEntry = self.transpositionTable.lookup(state.getZobristHash(self.agentIndex))
+    possibleActions = self.orderActions(possibleActions, self.depth, self.agentIndex, rootEntry)
+    return self.iterativeDeepening(state, possibleActions, searchRoot)
 
 class PlayerAgentRandom(PlayerAgent):
   """
   Class: PlayerAgentRandom
   --------------------------
   A subclass of PlayerAgent that randomly determines
-  what action it takes (uniformly random).
+  what action it takes (uniformly random).  Random agents
+  made with the same seed make the same choices.
   --------------------------
   """
+  __slots__ = ("random",)
+
+  def __init__(self, name, agentIndex, color, depth = 3, evalFn = defaultEvalFn, timeLimit = SEARCH_TIME_LIMIT, seed = None):
+    super(PlayerAgentRandom, self).__init__(name, agentIndex, color, depth, evalFn=evalFn, timeLimit=timeLimit)
+    self.random = random.Random(seed)
 
   def getAction(self, state):
     """
@@ -709,7 +1640,327 @@ class PlayerAgentRandom(PlayerAgent):
       return (0, None)
 
     # Otherwise pick a random action
-    return (0, choice(list(possibleActions)))
+    return (0, self.random.choice(possibleActions))
+
+
+class MCTSDecisionNode(object):
+  """
+  Class: MCTSDecisionNode
+  ---------------------
+  A position in a PlayerAgentMCTS search tree where a player is
+  about to act, along with the actions tried from it so far.
+  ---------------------
+  """
+  __slots__ = ("playerIndex", "untriedActions", "children", "visits")
+
+  def __init__(self, playerIndex):
+    self.playerIndex = playerIndex
+    # The legal actions not yet in the tree (None until the node is
+    # first reached), with None standing for passing
+    self.untriedActions = None
+    # An MCTSChanceNode for each action that has been tried
+    self.children = []
+    self.visits = 0
+
+
+class MCTSChanceNode(object):
+  """
+  Class: MCTSChanceNode
+  ---------------------
+  The dice roll after an action in a PlayerAgentMCTS search tree,
+  along with the results of the playouts that have passed through it.
+  ---------------------
+  """
+  __slots__ = ("action", "outcomes", "children", "visits", "totalValue")
+
+  def __init__(self, action, outcomes):
+    self.action = action
+    # (ROLL, PROBABILITY) tuples from GameState.getDiceOutcomes
+    self.outcomes = outcomes
+    # The MCTSDecisionNode after each roll that has come up
+    self.children = {}
+    self.visits = 0
+    self.totalValue = 0.0
+
+  def sampleRoll(self, rng):
+    """
+    Method: sampleRoll
+    ----------------------
+    Parameters:
+      rng - the random.Random to sample with
+    Returns: one of the outcomes' rolls, picked with its probability
+    ----------------------
+    """
+    r = rng.random()
+    for roll, probability in self.outcomes:
+      r -= probability
+      if r < 0:
+        return roll
+    return self.outcomes[-1][0]
+
+
+class PlayerAgentMCTS(PlayerAgent):
+  """
+  Class: PlayerAgentMCTS
+  --------------------------------
+  A subclass of PlayerAgent that uses Monte Carlo tree search (UCT) to
+  determine what action it should take.  Each playout walks down the tree,
+  picking actions by their UCT score (opponents minimizing this player's
+  value) and sampling each dice roll with its probability, until it adds a
+  new action to the tree.  From there it plays rolloutDepth turns of random
+  actions (or, with heuristicRollouts, random ones of the best type: cities,
+  then settlements, then roads) and scores the position: a win or loss
+  (even one the rollout stopped at early) is worth the upper or lower of
+  evalBounds, and anything else its evaluation, kept within them.  Each
+  move costs numPlayouts playouts, or as many as fit in the time limit,
+  whichever runs out first.  With more than one process, each worker
+  process grows its own tree with its share of the playouts, and their
+  results are added up.  Agents made with the same seed make the
+  same choices.
+  --------------------------------
+  """
+  __slots__ = ("numPlayouts", "rolloutDepth", "heuristicRollouts", "explorationConstant", "playoutCount", "random",
+    "minValue", "maxValue")
+
+  def __init__(self, name, agentIndex, color, depth = DEPTH, evalFn = defaultEvalFn, timeLimit = SEARCH_TIME_LIMIT,
+    numProcesses = SEARCH_PROCESSES, numPlayouts = MCTS_PLAYOUTS, rolloutDepth = MCTS_ROLLOUT_DEPTH,
+    heuristicRollouts = False, explorationConstant = MCTS_EXPLORATION, seed = None, evalBounds = EVAL_BOUNDS):
+    super(PlayerAgentMCTS, self).__init__(name, agentIndex, color, depth, evalFn=evalFn, timeLimit=timeLimit, numProcesses=numProcesses)
+    if numPlayouts is None and timeLimit is None:
+      raise Exception("PlayerAgentMCTS needs a number of playouts or a time limit!")
+    self.numPlayouts = numPlayouts
+    self.rolloutDepth = rolloutDepth
+    self.heuristicRollouts = heuristicRollouts
+    self.explorationConstant = explorationConstant
+    # The values of a loss and a win
+    self.minValue, self.maxValue = evalBounds
+    # The number of playouts the last search made
+    self.playoutCount = 0
+    self.random = random.Random(seed)
+
+  def getRolloutAction(self, actions):
+    """
+    Method: getRolloutAction
+    ------------------------
+    Parameters:
+      actions - the (non-empty) legal actions of the player to move in a rollout
+    Returns: the action to take, picked uniformly randomly (from the
+      actions of the highest priority type, with heuristicRollouts)
+    ------------------------
+    """
+    if self.heuristicRollouts:
+      topPriority = max(ACTION_ORDER_PRIORITY[action[0]] for action in actions)
+      actions = [action for action in actions if ACTION_ORDER_PRIORITY[action[0]] == topPriority]
+    return self.random.choice(actions)
+
+  def getSearchArgs(self):
+    searchArgs = super(PlayerAgentMCTS, self).getSearchArgs()
+    searchArgs.update(numPlayouts = self.numPlayouts, rolloutDepth = self.rolloutDepth,
+      heuristicRollouts = self.heuristicRollouts, explorationConstant = self.explorationConstant,
+      evalBounds = (self.minValue, self.maxValue))
+    return searchArgs
+
+  def searchInParallel(self, state, possibleActions):
+    """
+    Method: searchInParallel
+    ------------------------
+    Parameters:
+      state - the GameState being searched
+      possibleActions - the actions this player can take in state
+    Returns: a (value, action) tuple for the action played the most in
+      all the worker processes' trees together (see the class description),
+      and the average value of its playouts
+    ------------------------
+    """
+    serializedState = state.serialize()
+    searchArgs = self.getSearchArgs()
+    if self.numPlayouts is not None:
+      searchArgs["numPlayouts"] = int(math.ceil(self.numPlayouts / float(self.numProcesses)))
+    tasks = [(type(self), self.agentIndex, dict(searchArgs, seed = self.random.getrandbits(32)), serializedState, None)
+      for i in xrange(self.numProcesses)]
+
+    visits, totalValues = Counter(), Counter()
+    self.nodeCount = 0
+    self.playoutCount = 0
+    for childStats, nodeCount, playoutCount in getSearchPool(self.numProcesses).map(runSearchWorker, tasks):
+      self.nodeCount += nodeCount
+      self.playoutCount += playoutCount
+      for actionKey, childVisits, childTotalValue in childStats:
+        visits[actionKey] += childVisits
+        totalValues[actionKey] += childTotalValue
+
+    best = max(possibleActions, key = lambda action: visits[getActionKey(action)])
+    bestKey = getActionKey(best)
+    return (totalValues[bestKey] / visits[bestKey], best)
+
+  def runWorkerSearch(self, state):
+    """
+    Method: runWorkerSearch
+    ------------------------
+    Parameters:
+      state - the GameState to search, in a worker process
+    Returns: a (root statistics, node count, playout count) tuple, where
+      the root statistics are an (action key, visits, total value) tuple
+      for each action tried at the root of the tree
+    ------------------------
+    """
+    root = self.searchTree(state, state.getLegalActions(self.agentIndex))
+    return ([(getActionKey(child.action), child.visits, child.totalValue) for child in root.children],
+      self.nodeCount, self.playoutCount)
+
+  def getAction(self, state):
+    """
+    Method: getAction
+    ------------------------
+    Parameters:
+      state - a GameState object containing information about the current state of the game
+    Returns: a (value, action) tuple for the action this player should take:
+      the most played action at the root of the search, and the average
+      value of its playouts
+    ------------------------
+    """
+    # TERMINAL CASES
+    # ---------------------
+
+    # If the player won
+    if state.gameOver() is self.agentIndex:
+      return (float('inf'), None)
+
+    # or lost
+    elif state.gameOver() > -1:
+      return (float('-inf'), None)
+
+    possibleActions = state.getLegalActions(self.agentIndex)
+
+    # If there are no possible actions (must pass)
+    if len(possibleActions) is 0:
+      return (self.evaluate(state), None)
+
+    if self.numProcesses > 1:
+      return self.searchInParallel(state, possibleActions)
+
+    root = self.searchTree(state, possibleActions)
+    best = max(root.children, key = lambda child: child.visits)
+    return (best.totalValue / best.visits, best.action)
+
+  def searchTree(self, state, possibleActions):
+    """
+    Method: searchTree
+    ------------------------
+    Parameters:
+      state - the GameState to search
+      possibleActions - the (non-empty) legal actions of this player in state
+    Returns: the root MCTSDecisionNode of a tree grown from state by
+      running playouts until they or the time run out
+    ------------------------
+    """
+    numPlayers = state.getNumPlayerAgents()
+    minValue, maxValue = self.minValue, self.maxValue
+    root = MCTSDecisionNode(self.agentIndex)
+    root.untriedActions = list(possibleActions)
+    # The lowest and highest playout values so far, which UCT scores
+    # scale values by so that they are between 0 and 1
+    valueRange = [float('inf'), float('-inf')]
+
+    # Returns the tried action (MCTSChanceNode) with the best UCT score
+    def selectChild(node):
+      lowest, highest = valueRange
+      spread = highest - lowest if highest > lowest else 1.0
+      logVisits = math.log(node.visits)
+      bestChild, bestScore = None, None
+      for child in node.children:
+        value = (child.totalValue / child.visits - lowest) / spread
+        if node.playerIndex != self.agentIndex:
+          value = 1 - value
+        score = value + self.explorationConstant * math.sqrt(logVisits / child.visits)
+        if bestChild is None or score > bestScore:
+          bestChild, bestScore = child, score
+      return bestChild
+
+    # Plays up to rolloutDepth turns from the current state, starting with
+    # the given player's, and returns the value of where it ends up
+    def rollout(playerIndex):
+      for turn in xrange(self.rolloutDepth):
+        if state.gameOver() > -1:
+          break
+        self.nodeCount += 1
+        actions = state.getLegalActions(playerIndex)
+        diceRoll = self.random.randint(1, 6) + self.random.randint(1, 6)
+        if len(actions) > 0:
+          state.makeMove(playerIndex, self.getRolloutAction(actions), diceRoll)
+        else:
+          state.makeDiceRoll(diceRoll)
+        playerIndex = (playerIndex + 1) % numPlayers
+      winner = state.gameOver()
+      if winner == self.agentIndex:
+        value = maxValue
+      elif winner > -1:
+        value = minValue
+      else:
+        value = min(max(self.evaluate(state), minValue), maxValue)
+      valueRange[0] = min(valueRange[0], value)
+      valueRange[1] = max(valueRange[1], value)
+      return value
+
+    # Runs one playout from the root, leaving the state as it was
+    def runPlayout():
+      undoLogLength = len(state.undoLog)
+      node = root
+      visitedNodes = [root]
+
+      # SELECTION AND EXPANSION
+      # ----------------------
+      while state.gameOver() < 0:
+        self.nodeCount += 1
+        if node.untriedActions is None:
+          actions = state.getLegalActions(node.playerIndex)
+          node.untriedActions = actions if len(actions) > 0 else [None]
+
+        # Add an untried action to the tree, or pick the best tried one
+        expanding = len(node.untriedActions) > 0
+        if expanding:
+          action = node.untriedActions.pop(self.random.randrange(len(node.untriedActions)))
+          if action is not None:
+            state.makeMove(node.playerIndex, action)
+          chanceNode = MCTSChanceNode(action, state.getDiceOutcomes())
+          node.children.append(chanceNode)
+        else:
+          chanceNode = selectChild(node)
+          if chanceNode.action is not None:
+            state.makeMove(node.playerIndex, chanceNode.action)
+
+        # Roll the dice
+        diceRoll = chanceNode.sampleRoll(self.random)
+        state.makeDiceRoll(diceRoll)
+        child = chanceNode.children.get(diceRoll)
+        if child is None:
+          child = chanceNode.children[diceRoll] = MCTSDecisionNode((node.playerIndex + 1) % numPlayers)
+        visitedNodes.append(chanceNode)
+        visitedNodes.append(child)
+        node = child
+        if expanding:
+          break
+
+      # ROLLOUT AND BACKPROPAGATION
+      # ----------------------
+      value = rollout(node.playerIndex)
+      for visitedNode in visitedNodes:
+        visitedNode.visits += 1
+        if type(visitedNode) is MCTSChanceNode:
+          visitedNode.totalValue += value
+
+      while len(state.undoLog) > undoLogLength:
+        state.undoMove()
+
+    # Play out until the playouts or the time (if any) run out
+    self.nodeCount = 0
+    self.playoutCount = 0
+    deadline = time.time() + self.timeLimit if self.timeLimit is not None else None
+    while ((self.numPlayouts is None or self.playoutCount < self.numPlayouts)
+      and (deadline is None or self.playoutCount is 0 or time.time() < deadline)):
+      runPlayout()
+      self.playoutCount += 1
+    return root
 
 
 class PlayerAgentExpectimax(PlayerAgent):
@@ -723,8 +1974,12 @@ class PlayerAgentExpectimax(PlayerAgent):
   follow a uniformly random policy).
   -------------------------------
   """
-  def __init__(self, name, agentIndex, color, depth=DEPTH, evalFn = defaultEvalFn):
-    super(PlayerAgentExpectimax, self).__init__(name, agentIndex, color, depth, evalFn=evalFn)
+  __slots__ = ("transpositionTable",)
+
+  def __init__(self, name, agentIndex, color, depth=DEPTH, evalFn = defaultEvalFn, transpositionTableMB = TRANSPOSITION_TABLE_MB, timeLimit = SEARCH_TIME_LIMIT, numProcesses = SEARCH_PROCESSES):
+    super(PlayerAgentExpectimax, self).__init__(name, agentIndex, color, depth, evalFn=evalFn, timeLimit=timeLimit, numProcesses=numProcesses)
+    # Search results shared by all of this agent's searches in a game
+    self.transpositionTable = TranspositionTable(transpositionTableMB)
 
   def getAction(self, state):
     """
@@ -745,6 +2000,7 @@ class PlayerAgentExpectimax(PlayerAgent):
     # of the given game state with the given depth on the given player's turn.
     # Assumes other players are random agents.
     def recurse(currState, currDepth, playerIndex):
+      self.nodeCount += 1
       # TERMINAL CASES
       # ---------------------
       
@@ -758,20 +2014,27 @@ class PlayerAgentExpectimax(PlayerAgent):
 
       # If the max depth has been reached, call the eval function
       elif currDepth is 0:
-        return self.evaluationFunction(currState, self.agentIndex)
+        return self.evaluate(currState)
+
+      # If we've already searched this position at least this deeply
+      # (reached by another order of moves, or on an earlier turn), reuse it
+      zobristHash = currState.getZobristHash(playerIndex)
+      entry = self.transpositionTable.lookup(zobristHash)
+      if entry is not None and entry.depth >= currDepth:
+        return entry.value
+
+      # Stop if we've used up our time for this move
+      self.checkTime()
 
       possibleActions = currState.getLegalActions(playerIndex)
 
       # If there are no possible actions (must pass)
       if len(possibleActions) is 0:
-        return self.evaluationFunction(currState, self.agentIndex)
+        return self.evaluate(currState)
 
       # RECURSIVE CASE
       # ----------------------
 
-      # Get dice roll probabilities to calculate expected utility
-      rollProbabilities = currState.diceAgent.getRollDistribution()
-
       # New depth (depth - 1 for last player, otherwise depth)
       # newPlayerIndex goes through 0, 1,...numAgents - 1 (looping around)
       newDepth = currDepth - 1 if playerIndex is not self.agentIndex else currDepth
@@ -780,29 +2043,47 @@ class PlayerAgentExpectimax(PlayerAgent):
       # List of all values
       vals = []
 
-      # Try all possible actions
-      for currAction in possibleActions:
-        currVal = 0
+      # If all of the children are leaves and the evaluation function can
+      # score many positions at once, score them all together
+      if newDepth is 0 and self.canEvaluateInBatches():
+        vals = self.evaluateChildren(currState, playerIndex, possibleActions)
+
+      # Otherwise try all possible actions
+      else:
+        for currAction in possibleActions:
+          currVal = 0
 
-        # For each action, the utility is the sum of the weighted
-        # utilities for all possible dice rolls (we need to add all weighted
-        # utilities together to get the expected utility)
-        for probabilityTuple in rollProbabilities:
-          roll, probability = probabilityTuple
-          successor = currState.generateSuccessor(playerIndex, currAction)
-          successor.updatePlayerResourcesForDiceRoll(roll)
-          value = recurse(successor, newDepth, newPlayerIndex)
+          # For each action, the utility is the sum of the weighted
+          # utilities for all possible dice rolls (we need to add all weighted
+          # utilities together to get the expected utility).  Rolls that hand
+          # out the same resources lead to the same state, so we only need to
+          # search one of them, weighted by their total probability.
+          # The action is the same for every roll, so it is only made once,
+          # and each roll just adds (and then takes back) its resources.
+          currState.makeMove(playerIndex, currAction)
+          for probabilityTuple in currState.getDiceOutcomes():
+            roll, probability = probabilityTuple
+            currState.makeDiceRoll(roll)
+            value = recurse(currState, newDepth, newPlayerIndex)
+            currState.undoMove()
 
-          currVal += probability * value
+            currVal += probability * value
+          currState.undoMove()
 
-        vals.append(currVal)
+          vals.append(currVal)
 
       # Maximize/take average depending on player
       if playerIndex is self.agentIndex:
-        return max(vals)
-      return sum(vals) / float(len(vals))  
+        value = max(vals)
+        bestAction = possibleActions[vals.index(value)]
+      else:
+        value = sum(vals) / float(len(vals))
+        bestAction = None
+      self.transpositionTable.store(zobristHash, value, currDepth, BOUNDS.EXACT, bestAction)
+      return value
 
     # Call our recursive function
+    self.transpositionTable.newSearch()
 
     # TERMINAL CASES
     # ---------------------
@@ -817,28 +2098,33 @@ class PlayerAgentExpectimax(PlayerAgent):
 
     # If the max depth has been reached, call the eval function
     elif self.depth is 0:
-      return (self.evaluationFunction(state, self.agentIndex), None)
+      return (self.evaluate(state), None)
 
     possibleActions = state.getLegalActions(self.agentIndex)
 
     # If there are no possible actions (must pass)
     if len(possibleActions) is 0:
-      return (self.evaluationFunction(state, self.agentIndex), None)
+      return (self.evaluate(state), None)
 
     # RECURSIVE CASE
     # ----------------------
 
-    # Parallel lists of values and their corresponding actions
-    vals = []
-    actions = []
-
     newPlayerIndex = (self.agentIndex + 1) % state.getNumPlayerAgents()
 
-    # Try all possible actions
-    for currAction in possibleActions:
-      successor = state.generateSuccessor(self.agentIndex, currAction)
-      value = recurse(successor, self.depth, newPlayerIndex)
-      vals.append(value)
-      actions.append(currAction)
+    # Searches all the given actions to the given depth
+    def searchRoot(depth, orderedActions):
+      # Parallel lists of values and their corresponding actions
+      vals = []
+      actions = []
+
+      # Try all possible actions
+      for currAction in orderedActions:
+        state.makeMove(self.agentIndex, currAction)
+        value = recurse(state, depth, newPlayerIndex)
+        state.undoMove()
+        vals.append(value)
+        actions.append(currAction)
+
+      return (max(vals), actions[vals.index(max(vals))])
 
-    return (max(vals), actions[vals.index(max(vals))])
+    return self.iterativeDeepening(state, possibleActions, searchRoot)
@@ -0,0 +1,309 @@
+import numpy as np
+from board import BuildingTypes, getBitIndices
+from gameConstants import *
+
+# The kinds of action a BatchSimulator plays, in the order GameState.getLegalActions
+# lists them (an action's position in a legal action mask picks out its kind)
+BATCH_ACTION_TYPES = [ACTIONS.ROAD, ACTIONS.SETTLE, ACTIONS.CITY]
+
+
+class BatchSimulator(object):
+  """
+  Class: BatchSimulator
+  ---------------------------
+  Plays many independent games between random players (who play like
+  PlayerAgentRandom) from the same starting position at once, one turn
+  of every game at a time, with the games kept in NumPy arrays instead
+  of GameStates.  Each turn the dice for all of the games are rolled as
+  one vector, the resources they produce are worked out from a table of
+  what a settlement on each vertex gets for each roll (built from which
+  hexagons each roll and each vertex touch), and what each player can
+  afford is checked against the costs for all of the games together.
+  Running thousands of games this way is much faster than Game.run, so
+  it is good for estimating the chances of winning from a position.
+
+  All of the games have the same player to move each turn.  Games that
+  are over just stop changing.  Simulators made with the same seed play
+  the same games.
+  ---------------------------
+  Instance Variables:
+  numGames = the number of games being played
+  numPlayers = the number of players in each game
+  currentPlayerIndex = the index of the player whose turn is next
+  turnNumber = the number of the next turn (counted like Game.run)
+  edgeOwner = for each game and edge ID, the index of the player with a road there (-1 for none)
+  vertexOwner = for each game and vertex ID, the index of the player who built there (-1 for none)
+  vertexLevel = for each game and vertex ID, how much of each touching tile's
+    resource it produces: 0 with nothing built, 1 for a settlement, 2 for a city
+  canSettle = for each game and vertex ID, whether it can still be settled
+  roadEnds = for each game, player index and vertex ID, whether it is an end of one of their roads
+  roadFrontier = for each game, player index and edge ID, whether it is in their
+    road frontier (see Board.getBuildableRoadMask)
+  production = for each game, player index and roll, the count of each resource
+    (in RESOURCE_ORDER) the player gets for the roll (see Board.getProduction)
+  resources = for each game and player index, their count of each resource (in RESOURCE_ORDER)
+  victoryPoints = for each game and player index, their victory points
+  winners = for each game, the index of the player that won (-1 until somebody has)
+  turnNumbers = for each game, the turnNumber when it ended (as Game.run returns it)
+  random = the NumPy random number generator for the dice and the players
+  ---------------------------
+  """
+  __slots__ = ("numGames", "numPlayers", "currentPlayerIndex", "turnNumber", "edgeEnds", "vertexEdges",
+    "vertexEdgeMatrix", "vertexNeighborMatrix", "rollProduction", "edgeOwner", "vertexOwner", "vertexLevel",
+    "canSettle", "roadEnds", "roadFrontier", "production", "resources", "victoryPoints", "winners", "turnNumbers", "random")
+
+  def __init__(self, state, numGames, seed = None, currentPlayerIndex = 0, turnNumber = 1):
+    """
+    Method: __init__
+    ---------------------------
+    Parameters:
+      state - the GameState every game starts from
+      numGames - the number of games to play
+      seed - an optional seed for the dice and the players' choices
+      currentPlayerIndex - the index of the player whose turn is first
+      turnNumber - the number of the first turn (Game.run starts at 1)
+    Returns: NA
+    ---------------------------
+    """
+    board = state.board
+    topology = board.topology
+    numEdges, numVertices = len(topology.edgeLocations), len(topology.vertexLocations)
+    self.numGames = numGames
+    self.numPlayers = state.getNumPlayerAgents()
+    self.currentPlayerIndex = currentPlayerIndex
+    self.turnNumber = turnNumber
+    self.random = np.random.RandomState(seed)
+
+    # The board's geometry, as arrays: the two ends of each edge, the
+    # (up to 3) edges at each vertex (repeating the first one to make 3),
+    # and which edges and neighboring vertices (and itself) each vertex touches
+    self.edgeEnds = np.array(topology.edgeVertices, dtype = np.intp)
+    self.vertexEdges = np.array([edges + edges[:1] * (3 - len(edges)) for edges in topology.vertexEdges], dtype = np.intp)
+    self.vertexEdgeMatrix = np.zeros((numVertices, numEdges), dtype = bool)
+    self.vertexNeighborMatrix = np.eye(numVertices, dtype = bool)
+    for vertexId in xrange(numVertices):
+      self.vertexEdgeMatrix[vertexId, list(topology.vertexEdges[vertexId])] = True
+      self.vertexNeighborMatrix[vertexId, list(topology.vertexNeighbors[vertexId])] = True
+
+    # What a settlement on each vertex gets for each roll (rolls by vertices by
+    # resources): the roll -> hexagon incidence times the hexagon -> vertex
+    # incidence, for each hexagon's resource
+    numHexagons = len(topology.hexagonLocations)
+    rollHexagons = np.zeros((MAX_DICE_ROLL + 1, numHexagons), dtype = np.int32)
+    hexagonVertices = np.zeros((numHexagons, numVertices), dtype = np.int32)
+    hexagonResources = np.zeros((numHexagons, NUM_RESOURCES), dtype = np.int32)
+    for hexagonId, (x, y) in enumerate(topology.hexagonLocations):
+      hexagon = board.hexagons[x][y]
+      hexagonVertices[hexagonId, list(topology.hexagonVertices[hexagonId])] = 1
+      if hexagon.resource in RESOURCE_INDICES:
+        rollHexagons[hexagon.diceValue, hexagonId] = 1
+        hexagonResources[hexagonId, RESOURCE_INDICES[hexagon.resource]] = 1
+    self.rollProduction = np.einsum("dh,hv,hr->dvr", rollHexagons, hexagonVertices, hexagonResources)
+
+    # Every game starts from the given state
+    boardState = board.state
+    players = range(self.numPlayers)
+    def repeat(values, dtype):
+      return np.tile(np.array(values, dtype = dtype), (numGames,) + (1,) * np.ndim(values))
+    def bits(mask, size):
+      isSet = [False] * size
+      for i in getBitIndices(mask): isSet[i] = True
+      return isSet
+    self.edgeOwner = repeat([-1 if owner is None else owner for owner in boardState.edgeOwner], np.int8)
+    self.vertexOwner = repeat([-1 if owner is None else owner for owner in boardState.vertexOwner], np.int8)
+    self.vertexLevel = repeat([{BuildingTypes.SETTLEMENT: 1, BuildingTypes.CITY: 2}.get(building, 0)
+      for building in boardState.vertexBuilding], np.int32)
+    self.canSettle = repeat(bits(boardState.canSettleMask, numVertices), bool)
+    self.roadEnds = repeat([bits(boardState.roadEnds.get(i, 0), numVertices) for i in players], bool)
+    self.roadFrontier = repeat([bits(boardState.roadFrontier.get(i, 0), numEdges) for i in players], bool)
+    self.production = repeat([[board.getProduction(i, roll) for roll in xrange(MAX_DICE_ROLL + 1)] for i in players], np.int32)
+    self.resources = repeat([agent.resources.counts for agent in state.playerAgents], np.int32)
+    self.victoryPoints = repeat([agent.victoryPoints for agent in state.playerAgents], np.int32)
+    self.winners = np.full(numGames, state.gameOver(), dtype = np.int8)
+    self.turnNumbers = np.full(numGames, turnNumber, dtype = np.int32)
+
+  def getLegalActionMask(self, playerIndex, games = None):
+    """
+    Method: getLegalActionMask
+    ---------------------------
+    Parameters:
+      playerIndex - the index of a player
+      games - an optional array of the indices of the games to look at
+        (all of them by default)
+    Returns: a (games, edges + 2 * vertices) boolean array of the actions the
+      player can take in each game, in the order of GameState.getLegalActions:
+      a road on each edge, then a settlement on each vertex, then a city on
+      each vertex (no actions in a game that is over)
+    ---------------------------
+    """
+    if games is None: games = np.arange(self.numGames)
+    resources = self.resources[games, playerIndex]
+    canBuildRoad = (resources >= ROAD_COST.counts).all(axis = 1)
+    canSettle = (resources >= SETTLEMENT_COST.counts).all(axis = 1)
+    canBuildCity = (resources >= CITY_COST.counts).all(axis = 1)
+    vertexOwner = self.vertexOwner[games]
+    roads = self.roadFrontier[games, playerIndex] & (self.edgeOwner[games] < 0) & canBuildRoad[:, None]
+    settlements = self.roadEnds[games, playerIndex] & self.canSettle[games] & canSettle[:, None]
+    cities = (vertexOwner == playerIndex) & (self.vertexLevel[games] == 1) & canBuildCity[:, None]
+    return np.concatenate([roads, settlements, cities], axis = 1) & (self.winners[games] < 0)[:, None]
+
+  def step(self):
+    """
+    Method: step
+    ---------------------------
+    Parameters: NA
+    Returns: a (rolls, action types, location IDs) tuple of arrays with the
+      dice rolled in each game (0 if it was already over) and the action the
+      player took there: the index of its type in BATCH_ACTION_TYPES and the
+      ID of its edge or vertex (both -1 if the player passed, or the game
+      was already over)
+
+    Plays the next turn of every game that isn't over: the dice are rolled
+    and everybody collects resources, then the current player takes one of
+    their legal actions, chosen uniformly at random.  Only the games still
+    being played are worked on, so the turns get quicker as games end.
+    ---------------------------
+    """
+    playerIndex = self.currentPlayerIndex
+    games = np.flatnonzero(self.winners < 0)
+    rolls = np.zeros(self.numGames, dtype = np.intp)
+    actionTypes = np.full(self.numGames, -1, dtype = np.intp)
+    locationIds = np.full(self.numGames, -1, dtype = np.intp)
+
+    # Dice roll + resource distribution
+    rolls[games] = self.random.randint(1, 7, len(games)) + self.random.randint(1, 7, len(games))
+    self.resources[games] += self.production[games, :, rolls[games]]
+
+    # Pick one of the legal actions in each game where the player can afford
+    # something: the k'th, for a random k
+    resources = self.resources[games, playerIndex]
+    canAfford = (resources[:, None, :] >= [ROAD_COST.counts, SETTLEMENT_COST.counts, CITY_COST.counts]).all(axis = 2)
+    actingGames = games[canAfford.any(axis = 1)]
+    legalActions = self.getLegalActionMask(playerIndex, actingGames)
+    numLegalActions = legalActions.sum(axis = 1)
+    hasActions = numLegalActions > 0
+    actingGames, legalActions, numLegalActions = actingGames[hasActions], legalActions[hasActions], numLegalActions[hasActions]
+    choices = (self.random.random_sample(len(actingGames)) * numLegalActions).astype(np.int16)
+    positions = (legalActions.cumsum(axis = 1, dtype = np.int16) > choices[:, None]).argmax(axis = 1)
+
+    numEdges, numVertices = self.edgeOwner.shape[1], self.vertexOwner.shape[1]
+    actionTypes[actingGames] = (positions >= numEdges).astype(np.intp) + (positions >= numEdges + numVertices)
+    locationIds[actingGames] = np.where(positions < numEdges, positions, (positions - numEdges) % numVertices)
+
+    roadGames = actingGames[actionTypes[actingGames] == 0]
+    if len(roadGames): self.buildRoads(roadGames, locationIds[roadGames], playerIndex)
+    settleGames = actingGames[actionTypes[actingGames] == 1]
+    if len(settleGames): self.buildSettlements(settleGames, locationIds[settleGames], playerIndex)
+    cityGames = actingGames[actionTypes[actingGames] == 2]
+    if len(cityGames): self.buildCities(cityGames, locationIds[cityGames], playerIndex)
+
+    # Only the player who just acted can have won
+    won = games[self.victoryPoints[games, playerIndex] >= VICTORY_POINTS_TO_WIN]
+    self.winners[won] = playerIndex
+    self.currentPlayerIndex = (playerIndex + 1) % self.numPlayers
+    self.turnNumber += 1
+    self.turnNumbers[games] = self.turnNumber
+    return (rolls, actionTypes, locationIds)
+
+  def buildRoads(self, games, edgeIds, playerIndex):
+    """
+    Method: buildRoads
+    ---------------------------
+    Parameters:
+      games - an array of the indices of some games
+      edgeIds - an array of the edge to build a road on in each of them
+      playerIndex - the index of the player building the roads
+    Returns: NA
+
+    Builds the roads, like Board.applyAction and PlayerAgent.applyAction.
+    ---------------------------
+    """
+    self.edgeOwner[games, edgeIds] = playerIndex
+    self.resources[games, playerIndex] -= ROAD_COST.counts
+    # The builder can now build roads out from the ends of the road, unless
+    # somebody else has built there
+    ends = self.edgeEnds[edgeIds]
+    freeEnds = self.vertexOwner[games[:, None], ends] < 0
+    newFrontier = (self.vertexEdgeMatrix[ends] & freeEnds[:, :, None]).any(axis = 1)
+    self.roadFrontier[games, playerIndex] |= newFrontier
+    self.roadEnds[games[:, None], playerIndex, ends] = True
+
+  def buildSettlements(self, games, vertexIds, playerIndex):
+    """
+    Method: buildSettlements
+    ---------------------------
+    Parameters:
+      games - an array of the indices of some games
+      vertexIds - an array of the vertex to settle in each of them
+      playerIndex - the index of the player settling
+    Returns: NA
+
+    Builds the settlements, like Board.applyAction and PlayerAgent.applyAction.
+    ---------------------------
+    """
+    self.vertexOwner[games, vertexIds] = playerIndex
+    self.vertexLevel[games, vertexIds] = 1
+    self.production[games, playerIndex] += self.rollProduction[:, vertexIds].swapaxes(0, 1)
+    self.resources[games, playerIndex] -= SETTLEMENT_COST.counts
+    self.victoryPoints[games, playerIndex] += SETTLEMENT_VICTORY_POINTS
+    # The vertex and all vertices one away are now unsettleable
+    self.canSettle[games] &= ~self.vertexNeighborMatrix[vertexIds]
+    # The settler can now build roads from here, and other players with
+    # roads ending here can no longer build roads through here (unless
+    # the other end of the road lets them; see Board.updateRoadFrontier)
+    self.roadFrontier[games, playerIndex] |= self.vertexEdgeMatrix[vertexIds]
+    edges = self.vertexEdges[vertexIds]
+    ends = self.edgeEnds[edges]
+    endOwners = self.vertexOwner[games[:, None, None], ends]
+    for otherPlayer in xrange(self.numPlayers):
+      if otherPlayer == playerIndex: continue
+      affected = self.roadEnds[games, otherPlayer, vertexIds]
+      canBuildFrom = (endOwners == otherPlayer) | ((endOwners < 0) & self.roadEnds[games[:, None, None], otherPlayer, ends])
+      frontier = self.roadFrontier[games[:, None], otherPlayer, edges]
+      self.roadFrontier[games[:, None], otherPlayer, edges] = np.where(affected[:, None], canBuildFrom.any(axis = 2), frontier)
+
+  def buildCities(self, games, vertexIds, playerIndex):
+    """
+    Method: buildCities
+    ---------------------------
+    Parameters:
+      games - an array of the indices of some games
+      vertexIds - an array of the settlement to upgrade in each of them
+      playerIndex - the index of the player building the cities
+    Returns: NA
+
+    Builds the cities, like Board.applyAction and PlayerAgent.applyAction.
+    ---------------------------
+    """
+    self.vertexLevel[games, vertexIds] = 2
+    # A city produces one more of each resource than the settlement did
+    self.production[games, playerIndex] += self.rollProduction[:, vertexIds].swapaxes(0, 1)
+    self.resources[games, playerIndex] -= CITY_COST.counts
+    self.victoryPoints[games, playerIndex] += CITY_VICTORY_POINTS
+
+  def run(self):
+    """
+    Method: run
+    ---------------------------
+    Parameters: NA
+    Returns: a (winners, turn numbers, victory points) tuple of arrays with,
+      for each game, the index of the player that won (-1 if the game was
+      cut off after CUTOFF_TURNS turns, like Game.run), the turn number it
+      ended at, and each player's victory points
+
+    Plays every game until it is over.
+    ---------------------------
+    """
+    while (self.winners < 0).any() and self.turnNumber <= CUTOFF_TURNS:
+      self.step()
+    return (self.winners, self.turnNumbers, self.victoryPoints)
+
+  def getWinRates(self):
+    """
+    Method: getWinRates
+    ---------------------------
+    Parameters: NA
+    Returns: the fraction of the games each player has won so far
+    ---------------------------
+    """
+    return [(self.winners == playerIndex).mean() for playerIndex in xrange(self.numPlayers)]
@@ -4,8 +4,10 @@ from sets import Set
 from enum import Enum
 from collections import Counter
 from gameConstants import *
+import hashlib
 import math
 import random
+import struct
 
 # Possible actions a player can take
 Actions = Enum(["DRAW", "SETTLE", "CITY", "ROAD", "TRADE"])
@@ -16,6 +18,60 @@ ResourceTypes = Enum(["BRICK", "WOOL", "ORE", "GRAIN", "LUMBER" ,"NOTHING"])
 # so we can print out the resource type easily
 ResourceDict = {ResourceTypes.GRAIN:"G", ResourceTypes.WOOL:"W", ResourceTypes.ORE:"O", ResourceTypes.LUMBER:"L", ResourceTypes.BRICK:"B", ResourceTypes.NOTHING:"N"}
 
+# Cache of the Zobrist keys handed out so far (see getZobristKey)
+zobristKeys = {}
+
+def getZobristKey(*components):
+  """
+  Function: getZobristKey
+  ---------------------------
+  Parameters:
+    components: the hashable pieces describing one feature of a game
+      position, e.g. ("ROAD", x, y, playerIndex)
+  Returns: the 64-bit Zobrist key for that feature
+
+  A position's Zobrist hash is the XOR of the keys of all of its features,
+  so it can be updated incrementally by XORing keys in and out as the
+  position changes.  Keys are derived from the components themselves
+  (rather than drawn from a random table) so they are the same in every
+  run and every process.
+  ---------------------------
+  """
+  key = zobristKeys.get(components)
+  if key is None:
+    key = struct.unpack("<Q", hashlib.md5(repr(components)).digest()[:8])[0]
+    zobristKeys[components] = key
+  return key
+
+def getMask(ids):
+  """
+  Function: getMask
+  ---------------------------
+  Parameters:
+    ids: a list of dense IDs (see BoardTopology)
+  Returns: a bitmask with the bit of each of the given IDs set
+  ---------------------------
+  """
+  mask = 0
+  for i in ids: mask |= 1 << i
+  return mask
+
+def getBitIndices(mask):
+  """
+  Function: getBitIndices
+  ---------------------------
+  Parameters:
+    mask: a bitmask over dense IDs
+  Returns: the IDs whose bits are set in the mask, in increasing order
+  ---------------------------
+  """
+  indices = []
+  while mask:
+    lowestBit = mask & -mask
+    indices.append(lowestBit.bit_length() - 1)
+    mask ^= lowestBit
+  return indices
+
 # ---------- DELETE? ----------- #
 # Resources = ([ResourceTypes.BRICK, ResourceTypes.BRICK, ResourceTypes.BRICK,
 #   ResourceTypes.WOOL, ResourceTypes.WOOL, ResourceTypes.WOOL, ResourceTypes.WOOL,
@@ -26,7 +82,7 @@ ResourceDict = {ResourceTypes.GRAIN:"G", ResourceTypes.WOOL:"W", ResourceTypes.O
 # NumberChits = [-1, 2, 3, 3, 4, 4, 5, 5, 6, 6, 8, 8, 9, 9, 10, 10, 11, 11, 12]
 # ---------- DELETE? ----------- #
 
-class Hexagon:
+class Hexagon(object):
   """
   Class: Hexagon
   ---------------------------
@@ -36,6 +92,7 @@ class Hexagon:
   and the x and y coordinate of the hexagon in the gameboard.
   ---------------------------
   """
+  __slots__ = ("X", "Y", "resource", "diceValue")
 
   def __init__(self, X, Y, resource, diceValue):
     self.X = X
@@ -69,7 +126,90 @@ class Hexagon:
     return "/" + ResourceDict[self.resource] + str(self.diceValue) + coordinateString + "\\"
 
 
-class Vertex:
+# What can be built on a Vertex (see BoardState.vertexBuilding)
+BuildingTypes = Enum(["NOTHING", "SETTLEMENT", "CITY"])
+
+class BoardState(object):
+  """
+  Class: BoardState
+  ---------------------------
+  The part of a Board that changes during a game, kept in flat arrays
+  indexed by the dense IDs of the board's BoardTopology: the player
+  who owns each edge and vertex (or None), what is built on each vertex
+  (one of BuildingTypes), and a bitmask with bit i set if vertex i can
+  still be settled.  Everything else about a board never changes, so
+  copying a Board only means copying its BoardState.
+
+  The same pieces are also kept as bitboards: for each player index,
+  roads, settlements and cities map to a bitmask with bit i set if
+  that player has that piece on edge/vertex i.  These are kept up to
+  date by the methods that build and remove pieces (Vertex.settle,
+  Edge.build, ...), so that the Board can answer questions about a
+  player's pieces with a few bitwise operations.
+
+  The resources every roll produces are also kept up to date by the
+  Board as pieces are built (see Board.getProduction): production holds
+  the count of each resource (in RESOURCE_ORDER) that each player gets
+  for each roll, flattened into one list.  So are the totals that the
+  evaluation functions look at (see Board.getExpectedProduction):
+  productionWays holds, for each player and resource, the number of
+  ways out of DICE_ROLL_OUTCOMES of getting one of that resource on a
+  roll, summed over the player's buildings, and resourceTouches holds,
+  for each player index, the number of hexagons their settlements touch.
+
+  Finally, the Board keeps each player's frontier up to date (see
+  Board.getBuildableRoadMask): roadEnds maps each player index to a
+  bitmask of the vertices at an end of one of their roads, and
+  roadFrontier maps it to a bitmask of the edges touching a vertex
+  they can build roads out from (some of which may already have
+  roads on them).
+
+  Edge and Vertex objects are views of one entry in a BoardState.
+  ---------------------------
+  """
+  __slots__ = ("edgeOwner", "vertexOwner", "vertexBuilding", "canSettleMask", "roads", "settlements", "cities", "production",
+    "productionWays", "resourceTouches", "roadEnds", "roadFrontier")
+
+  def __init__(self, numEdges, numVertices):
+    self.edgeOwner = [None] * numEdges
+    self.vertexOwner = [None] * numVertices
+    self.vertexBuilding = [BuildingTypes.NOTHING] * numVertices
+    self.canSettleMask = (1 << numVertices) - 1
+    self.roads = dict((i, 0) for i in xrange(NUM_PLAYERS))
+    self.settlements = dict((i, 0) for i in xrange(NUM_PLAYERS))
+    self.cities = dict((i, 0) for i in xrange(NUM_PLAYERS))
+    self.production = [0] * ((MAX_DICE_ROLL + 1) * NUM_PLAYERS * NUM_RESOURCES)
+    self.productionWays = [0] * (NUM_PLAYERS * NUM_RESOURCES)
+    self.resourceTouches = [0] * NUM_PLAYERS
+    self.roadEnds = dict((i, 0) for i in xrange(NUM_PLAYERS))
+    self.roadFrontier = dict((i, 0) for i in xrange(NUM_PLAYERS))
+
+  def deepCopy(self):
+    """
+    Method: deepCopy
+    --------------------------
+    Parameters: NA
+    Returns: a deep copy of self (with all instance variables
+      properly copied)
+    --------------------------
+    """
+    copy = BoardState(0, 0)
+    copy.edgeOwner = self.edgeOwner[:]
+    copy.vertexOwner = self.vertexOwner[:]
+    copy.vertexBuilding = self.vertexBuilding[:]
+    copy.canSettleMask = self.canSettleMask
+    copy.roads = dict(self.roads)
+    copy.settlements = dict(self.settlements)
+    copy.cities = dict(self.cities)
+    copy.production = self.production[:]
+    copy.productionWays = self.productionWays[:]
+    copy.resourceTouches = self.resourceTouches[:]
+    copy.roadEnds = dict(self.roadEnds)
+    copy.roadFrontier = dict(self.roadFrontier)
+    return copy
+
+
+class Vertex(object):
   """
   Class: Vertex
   ---------------------------
@@ -82,18 +222,58 @@ class Vertex:
   this Vertex.  A Vertex can later be settled on (only once)
   by a player, or upgraded (by that player only) from a settlement
   to a city.
+
+  The information about what is built here is stored in a BoardState
+  (this Vertex is a view of entry vertexId in it).  A Vertex on a Board
+  is a view of the Board's state; a Vertex created on its own gets a
+  BoardState of its own.
   ---------------------------
   """
+  __slots__ = ("X", "Y", "state", "id")
 
-  def __init__(self, X, Y):
+  def __init__(self, X, Y, state = None, vertexId = 0):
     self.X = X
     self.Y = Y
 
     # Initially this Vertex is unsettled
-    self.player = None
-    self.isSettlement = False
-    self.isCity = False
-    self.canSettle = True
+    if state is None: state = BoardState(0, 1)
+    self.state = state
+    self.id = vertexId
+
+  def getPlayer(self):
+    return self.state.vertexOwner[self.id]
+
+  def setPlayer(self, playerIndex):
+    self.state.vertexOwner[self.id] = playerIndex
+
+  player = property(getPlayer, setPlayer)
+
+  def getIsSettlement(self):
+    return self.state.vertexBuilding[self.id] == BuildingTypes.SETTLEMENT
+
+  def setIsSettlement(self, isSettlement):
+    if isSettlement: self.state.vertexBuilding[self.id] = BuildingTypes.SETTLEMENT
+    elif self.isSettlement: self.state.vertexBuilding[self.id] = BuildingTypes.NOTHING
+
+  isSettlement = property(getIsSettlement, setIsSettlement)
+
+  def getIsCity(self):
+    return self.state.vertexBuilding[self.id] == BuildingTypes.CITY
+
+  def setIsCity(self, isCity):
+    if isCity: self.state.vertexBuilding[self.id] = BuildingTypes.CITY
+    elif self.isCity: self.state.vertexBuilding[self.id] = BuildingTypes.NOTHING
+
+  isCity = property(getIsCity, setIsCity)
+
+  def getCanSettle(self):
+    return (self.state.canSettleMask >> self.id) & 1 == 1
+
+  def setCanSettle(self, canSettle):
+    if canSettle: self.state.canSettleMask |= 1 << self.id
+    else: self.state.canSettleMask &= ~(1 << self.id)
+
+  canSettle = property(getCanSettle, setCanSettle)
 
   def equivLocation(self, other):
     if other.X == self.X and other.Y == self.Y: return True
@@ -108,7 +288,7 @@ class Vertex:
       built on (settlement or city) by a player
     --------------------------
     """
-    return self.isSettlement or self.isCity
+    return self.state.vertexBuilding[self.id] != BuildingTypes.NOTHING
 
   def deepCopy(self):
     """
@@ -116,13 +296,12 @@ class Vertex:
     --------------------------
     Parameters: NA
     Returns: a deep copy of self (with all instance variables
-      properly copied)
+      properly copied), which has a BoardState of its own
     --------------------------
     """
     copy = Vertex(self.X, self.Y)
     copy.player = self.player
-    copy.isSettlement = self.isSettlement
-    copy.isCity = self.isCity
+    copy.state.vertexBuilding[0] = self.state.vertexBuilding[self.id]
     copy.canSettle = self.canSettle
     return copy
 
@@ -145,9 +324,11 @@ class Vertex:
     elif self.isCity:
       raise Exception("Can't settle here - already a city owned by player " + str(self.player) + "! At " + str(self))
 
-    self.isSettlement = True
-    self.player = playerIndex
-    self.canSettle = False
+    state = self.state
+    state.vertexBuilding[self.id] = BuildingTypes.SETTLEMENT
+    state.vertexOwner[self.id] = playerIndex
+    state.canSettleMask &= ~(1 << self.id)
+    state.settlements[playerIndex] = state.settlements.get(playerIndex, 0) | (1 << self.id)
 
   def upgrade(self, playerIndex):
     """
@@ -174,8 +355,52 @@ class Vertex:
       raise Exception("Player " + str(playerIndex) + " is trying to upgrade Player " + str(self.player) + "'s settlement!")
       
     # Mark as a city and not a settlement
-    self.isCity = True
-    self.isSettlement = False
+    state = self.state
+    state.vertexBuilding[self.id] = BuildingTypes.CITY
+    state.settlements[playerIndex] &= ~(1 << self.id)
+    state.cities[playerIndex] = state.cities.get(playerIndex, 0) | (1 << self.id)
+
+  def unsettle(self):
+    """
+    Method: unsettle
+    --------------------------
+    Parameters: NA
+    Returns: NA
+
+    Removes the settlement built on this Vertex (the inverse
+    of settle).  Whether or not this Vertex can be settled
+    again is restored by the Board, since it depends on
+    the surrounding vertices.  Raises an exception if there
+    is no settlement here.
+    --------------------------
+    """
+    if not self.isSettlement:
+      raise Exception("Can't remove a settlement that isn't there! At " + str(self))
+
+    state = self.state
+    state.settlements[self.player] &= ~(1 << self.id)
+    state.vertexBuilding[self.id] = BuildingTypes.NOTHING
+    state.vertexOwner[self.id] = None
+
+  def downgrade(self):
+    """
+    Method: downgrade
+    --------------------------
+    Parameters: NA
+    Returns: NA
+
+    Turns the city built on this Vertex back into a settlement
+    (the inverse of upgrade).  Raises an exception if there is
+    no city here.
+    --------------------------
+    """
+    if not self.isCity:
+      raise Exception("Can't downgrade a city that isn't there! At " + str(self))
+
+    state = self.state
+    state.vertexBuilding[self.id] = BuildingTypes.SETTLEMENT
+    state.cities[self.player] &= ~(1 << self.id)
+    state.settlements[self.player] |= 1 << self.id
 
   def __repr__(self):
     """
@@ -205,7 +430,7 @@ class Vertex:
     else:
       return "Unoccupied" + coordinateString
 
-class Edge:
+class Edge(object):
   """
     Class: Edge
     --------------------------
@@ -215,13 +440,30 @@ class Edge:
     It stores its X and Y coordinate in the game board, along
     with (optionally) the index of the player that built
     a road on this Edge.
+
+    Like a Vertex, an Edge is a view of entry edgeId in a BoardState
+    (its own one, if it was created on its own).
     --------------------------
     """
+  __slots__ = ("X", "Y", "state", "id")
 
-  def __init__(self, X, Y, playerIndex = None):
+  def __init__(self, X, Y, playerIndex = None, state = None, edgeId = 0):
     self.X = X
     self.Y = Y
-    self.player = playerIndex
+    if state is None:
+      state = BoardState(1, 0)
+      state.edgeOwner[0] = playerIndex
+      if playerIndex != None: state.roads[playerIndex] = 1
+    self.state = state
+    self.id = edgeId
+
+  def getPlayer(self):
+    return self.state.edgeOwner[self.id]
+
+  def setPlayer(self, playerIndex):
+    self.state.edgeOwner[self.id] = playerIndex
+
+  player = property(getPlayer, setPlayer)
 
   def equivLocation(self, other):
     if other.X == self.X and other.Y == self.Y: return True
@@ -236,7 +478,7 @@ class Edge:
       on this Edge.
     --------------------------
     """
-    return self.player != None
+    return self.state.edgeOwner[self.id] != None
 
   def deepCopy(self):
     """
@@ -244,7 +486,7 @@ class Edge:
     --------------------------
     Parameters: NA
     Returns: a deep copy of self (with all instance variables
-      properly copied)
+      properly copied), which has a BoardState of its own
     --------------------------
     """
     return Edge(self.X, self.Y, self.player)
@@ -264,7 +506,26 @@ class Edge:
     """
     if self.player != None:
       raise Exception("Player " + str(self.player) + " already has a road here! At " + str(self))
-    self.player = playerIndex
+    state = self.state
+    state.edgeOwner[self.id] = playerIndex
+    state.roads[playerIndex] = state.roads.get(playerIndex, 0) | (1 << self.id)
+
+  def demolish(self):
+    """
+    Method: demolish
+    --------------------------
+    Parameters: NA
+    Returns: NA
+
+    Removes the road built on this Edge (the inverse of build).
+    Raises an exception if no road has been built here.
+    --------------------------
+    """
+    if self.player == None:
+      raise Exception("There is no road to remove! At " + str(self))
+    state = self.state
+    state.roads[self.player] &= ~(1 << self.id)
+    state.edgeOwner[self.id] = None
 
   def __repr__(self):
     """
@@ -284,6 +545,30 @@ class Edge:
       return "Unoccupied" + coordinateString
 
 
+class PieceViews(dict):
+  """
+  Class: PieceViews
+  ---------------------------
+  A dictionary from dense ID to the Edge or Vertex viewing that ID in
+  one BoardState.  Each view is only created the first time it's asked
+  for, so copying a Board doesn't create any, and asking again returns
+  the same object.
+  ---------------------------
+  """
+
+  def __init__(self, locations, createView):
+    dict.__init__(self)
+    self.locations = locations
+    # Called with (X, Y, ID) to create the view of an ID
+    self.createView = createView
+
+  def __missing__(self, pieceId):
+    x, y = self.locations[pieceId]
+    view = self.createView(x, y, pieceId)
+    self[pieceId] = view
+    return view
+
+
 class Tile:
   def __init__(self, resource, number):
     self.resource = resource
@@ -296,6 +581,243 @@ BeginnerLayout = ([[None, None, Tile(ResourceTypes.GRAIN, 9), None, None],
   [None, Tile(ResourceTypes.BRICK, 8), Tile(ResourceTypes.ORE, 5), Tile(ResourceTypes.GRAIN, 2), None]])
 
 
+class BoardTopology:
+  """
+  Class: BoardTopology
+  ---------------------------
+  The geometry of a board layout: where its hexagons, edges and
+  vertices are, and which of them touch.  None of this changes during
+  a game, so it is worked out once per layout (see getBoardTopology)
+  and shared by every Board with that layout, copies included.
+
+  Hexagons, edges and vertices are each given dense IDs 0, 1, 2, ...
+  in row order, and the adjacency tables are lists indexed by ID
+  holding tuples of IDs (see the Board description below for how the
+  grid coordinates fit together).
+  ---------------------------
+  """
+
+  def __init__(self, layout):
+    self.numRows = len(layout)
+    self.numCols = len(layout[0])
+
+    # Locations of every hexagon, edge and vertex on the board
+    self.hexagonLocations = [(x, y) for x in xrange(self.numRows)
+      for y in xrange(self.numCols) if layout[y][x] != None] # Layout reverse, see Board
+    edgeGrid = [[False] * (self.numCols*2+2) for x in xrange(self.numRows*2+2)]
+    vertexGrid = [[False] * (self.numCols*2+2) for x in xrange(self.numRows*2+2)]
+    for x, y in self.hexagonLocations:
+      for xLoc, yLoc in self.getEdgeLocations(x, y): edgeGrid[xLoc][yLoc] = True
+      for xLoc, yLoc in self.getVertexLocations(x, y): vertexGrid[xLoc][yLoc] = True
+    self.edgeLocations = [(x, y) for x in xrange(len(edgeGrid))
+      for y in xrange(len(edgeGrid[x])) if edgeGrid[x][y]]
+    self.vertexLocations = [(x, y) for x in xrange(len(vertexGrid))
+      for y in xrange(len(vertexGrid[x])) if vertexGrid[x][y]]
+
+    # Maps from (x, y) location to ID
+    self.hexagonIds = dict((location, i) for i, location in enumerate(self.hexagonLocations))
+    self.edgeIds = dict((location, i) for i, location in enumerate(self.edgeLocations))
+    self.vertexIds = dict((location, i) for i, location in enumerate(self.vertexLocations))
+
+    # Adjacency tables
+    self.hexagonVertices = [self.idsOf(self.vertexIds, self.getVertexLocations(x, y))
+      for x, y in self.hexagonLocations]
+    self.hexagonEdges = [self.idsOf(self.edgeIds, self.getEdgeLocations(x, y))
+      for x, y in self.hexagonLocations]
+    self.hexagonNeighbors = [self.idsOf(self.hexagonIds, self.getNeighborHexagonLocations(x, y))
+      for x, y in self.hexagonLocations]
+    self.edgeVertices = [self.idsOf(self.vertexIds, self.getEdgeEndLocations(x, y))
+      for x, y in self.edgeLocations]
+    self.vertexEdges = [self.idsOf(self.edgeIds, self.getVertexEdgeLocations(x, y))
+      for x, y in self.vertexLocations]
+    self.vertexHexagons = [self.idsOf(self.hexagonIds, self.getVertexHexagonLocations(x, y))
+      for x, y in self.vertexLocations]
+    self.vertexNeighbors = [self.idsOf(self.vertexIds, self.getNeighborVertexLocations(x, y))
+      for x, y in self.vertexLocations]
+
+    # The same tables as bitmasks over IDs (see getMask)
+    self.allEdgesMask = (1 << len(self.edgeLocations)) - 1
+    self.allVerticesMask = (1 << len(self.vertexLocations)) - 1
+    self.edgeVertexMasks = [getMask(ids) for ids in self.edgeVertices]
+    self.vertexEdgeMasks = [getMask(ids) for ids in self.vertexEdges]
+    self.vertexNeighborMasks = [getMask(ids) for ids in self.vertexNeighbors]
+
+  def idsOf(self, ids, locations):
+    """
+    Method: idsOf
+    ---------------------------
+    Parameters:
+      ids: one of hexagonIds, edgeIds or vertexIds
+      locations: a list of (x, y) locations
+    Returns: a tuple of the IDs of the given locations, in order,
+      skipping any location that isn't on the board
+    ---------------------------
+    """
+    return tuple(ids[location] for location in locations if location in ids)
+
+  # The methods below work out the raw grid locations around a hexagon,
+  # edge or vertex, some of which may be off the board.  They are only
+  # used to build the tables above.
+
+  def getVertexLocations(self, x, y):
+    offset = 0 - x % 2
+    return [(x, 2*y+offset), # top vertex
+      (x, 2*y+1+offset),     # left top vertex
+      (x, 2*y+2+offset),     # left bottom vertex
+      (x+1, 2*y+offset),     # right top vertex
+      (x+1, 2*y+1+offset),   # right bottom vertex
+      (x+1, 2*y+2+offset)]   # bottom vertex
+
+  def getEdgeLocations(self, x, y):
+    offset = 0 - x % 2
+    return [(2*x, 2*y+offset), (2*x, 2*y+1+offset), (2*x+1, 2*y+offset),
+      (2*x+1, 2*y+2+offset), (2*x+2, 2*y+offset), (2*x+2, 2*y+1+offset)]
+
+  def getNeighborHexagonLocations(self, x, y):
+    offset = 1
+    if x % 2 != 0: offset = -1
+    return [(x, y+1), (x, y-1), (x+1, y), (x-1, y), (x+1, y+offset), (x-1, y+offset)]
+
+  # returns (start, end)
+  def getEdgeEndLocations(self, x, y):
+    if x % 2 == 0: return [(x/2, y), (x/2, y+1)]
+    return [((x-1)/2, y), ((x+1)/2, y)]
+
+  def getVertexEdgeLocations(self, x, y):
+    offset = -1
+    if x % 2 == y % 2: offset = 1
+    return [(x*2, y-1), (x*2, y), (x*2+offset, y)]
+
+  def getVertexHexagonLocations(self, x, y):
+    otherX = x
+    if (x % 2 + y % 2) == 1: otherX = x-1
+    otherY = y/2 - 1
+    if y % 2 == 1: otherY = y/2 + 1
+    return [(x, y/2), (otherX, otherY), (x-1, y/2)]
+
+  def getNeighborVertexLocations(self, x, y):
+    offset = -1
+    if x % 2 == y % 2: offset = 1
+    return [(x, y+1), (x, y-1), (x+offset, y)]
+
+# Cache of the topology of every layout seen so far (see getBoardTopology),
+# keyed by id(layout).  The layout is kept alongside its topology so that
+# its id can't be reused by another layout.
+boardTopologies = {}
+
+# Layouts made by getLayoutFromTiles, keyed by their tiles, so that every Board
+# made from the same tiles shares one layout (and so one BoardTopology)
+layoutsByTiles = {}
+
+def getLayoutTiles(layout):
+  """
+  Function: getLayoutTiles
+  ---------------------------
+  Parameters:
+    layout: a double list of Tiles (see Board)
+  Returns: the layout's tiles as nested tuples of (RESOURCE, NUMBER)
+    tuples (None where there is no tile), which can be hashed and
+    pickled cheaply
+  ---------------------------
+  """
+  return tuple(tuple((tile.resource, tile.number) if tile != None else None for tile in row) for row in layout)
+
+def getLayoutFromTiles(tiles):
+  """
+  Function: getLayoutFromTiles
+  ---------------------------
+  Parameters:
+    tiles: the tiles of a layout, as returned by getLayoutTiles
+  Returns: a layout (double list of Tiles) with those tiles, which
+    is the same layout every time it's asked for with the same tiles
+  ---------------------------
+  """
+  layout = layoutsByTiles.get(tiles)
+  if layout is None:
+    layout = [[Tile(*tile) if tile != None else None for tile in row] for row in tiles]
+    layoutsByTiles[tiles] = layout
+  return layout
+
+class VertexProductionTable(object):
+  """
+  Class: VertexProductionTable
+  ---------------------------
+  What a settlement on each vertex of a board layout touches and
+  produces.  Like the BoardTopology, none of this changes during a
+  game, so it is worked out once per layout (see
+  getVertexProductionTable) and looked up by vertex ID, instead of
+  finding a vertex's hexagons each time.
+  ---------------------------
+  Instance Variables:
+  hexagonCounts = for each vertex ID, the number of hexagons it touches
+  resourceCounts = for each vertex ID, a ResourceVector of the number of
+    tiles of each resource it touches
+  productionWays = for each vertex ID, a list of the number of ways out of
+    DICE_ROLL_OUTCOMES that a settlement there gets each resource (in
+    RESOURCE_ORDER) on a roll (exact, so that running totals of it can
+    be kept without drifting)
+  expectedProduction = for each vertex ID, a list of how many of each
+    resource (in RESOURCE_ORDER) a settlement there produces on an average turn
+  ---------------------------
+  """
+  __slots__ = ("hexagonCounts", "resourceCounts", "productionWays", "expectedProduction")
+
+  def __init__(self, layout, topology):
+    self.hexagonCounts = []
+    self.resourceCounts = []
+    self.productionWays = []
+    self.expectedProduction = []
+    for hexagonIds in topology.vertexHexagons:
+      resourceCounts = ResourceVector()
+      productionWays = [0] * NUM_RESOURCES
+      for hexagonId in hexagonIds:
+        x, y = topology.hexagonLocations[hexagonId]
+        tile = layout[y][x] # Layout reverse, see Board
+        if tile.resource in RESOURCE_INDICES:
+          resourceCounts[tile.resource] += 1
+          productionWays[RESOURCE_INDICES[tile.resource]] += DICE_ROLL_WAYS[tile.number]
+      self.hexagonCounts.append(len(hexagonIds))
+      self.resourceCounts.append(resourceCounts)
+      self.productionWays.append(productionWays)
+      self.expectedProduction.append([ways / float(DICE_ROLL_OUTCOMES) for ways in productionWays])
+
+
+# Vertex production tables of the layouts seen so far, by id() of the layout
+vertexProductionTables = {}
+
+def getVertexProductionTable(layout):
+  """
+  Function: getVertexProductionTable
+  ---------------------------
+  Parameters:
+    layout: a double list of Tiles (see Board)
+  Returns: the VertexProductionTable of the given layout, which is
+    only computed the first time it's asked for
+  ---------------------------
+  """
+  cached = vertexProductionTables.get(id(layout))
+  if cached is None:
+    cached = (layout, VertexProductionTable(layout, getBoardTopology(layout)))
+    vertexProductionTables[id(layout)] = cached
+  return cached[1]
+
+def getBoardTopology(layout):
+  """
+  Function: getBoardTopology
+  ---------------------------
+  Parameters:
+    layout: a double list of Tiles (see Board)
+  Returns: the BoardTopology of the given layout, which is only
+    computed the first time it's asked for
+  ---------------------------
+  """
+  cached = boardTopologies.get(id(layout))
+  if cached is None:
+    cached = (layout, BoardTopology(layout))
+    boardTopologies[id(layout)] = cached
+  return cached[1]
+
+
 """
 Board keeps track of hexagons, edges, and vertexes and how they relate
 Data structure idea from http://stackoverflow.com/a/5040856
@@ -320,52 +842,56 @@ will create a grid like this:
 [N, 13, 17, 18, N]
 Which is necessary to know when creating layouts
 """
-class Board:
+class Board(object):
   # Layout is just a double list of Tiles, some will be None
-  def __init__(self, layout=None):
+  def __init__(self, layout=None, seed=None):
     if layout == None: raise Exception("Must pass layout to Board.")
     self.layout = layout
-    random.seed()
+    # Random number generator for the random setup methods (getRandomVertexOnHex, ...),
+    # so that boards made with the same seed are set up the same way
+    self.random = random.Random(seed)
     
-    self.numRows = len(layout)
-    self.numCols = len(layout[0])
+    # The geometry of the board, and what each vertex produces, shared with
+    # every other Board with this layout
+    self.topology = getBoardTopology(layout)
+    self.productionTable = getVertexProductionTable(layout)
+    self.numRows = self.topology.numRows
+    self.numCols = self.topology.numCols
     self.hexagons = [[None for x in xrange(self.numCols)] for x in xrange(self.numRows)] 
-    self.edges = [[None for x in xrange(self.numCols*2+2)] for x in xrange(self.numRows*2+2)] 
-    self.vertices = [[None for x in xrange(self.numCols*2+2)] for x in xrange(self.numRows*2+2)] 
+    # Everything that can change during a game (see BoardState)
+    self.state = BoardState(len(self.topology.edgeLocations), len(self.topology.vertexLocations))
+    self.createViews()
     self.allSettlements = []
     self.allCities = []
     self.allRoads = []
+    # Zobrist hash of the roads, settlements and cities on the board,
+    # kept up to date by applyAction/undoAction
+    self.zobristHash = 0
     # This dictionary will map a tile's dice number to a list of tiles that that dice roll corresponds to
     self.dieRollDict = {}
+    # For each hexagon ID, the position of the hexagon's resource in each player's
+    # counts in the production table (see addProduction), or None for the desert
+    self.hexagonProductionIndices = [None] * len(self.topology.hexagonLocations)
     self.resourceDict = {}
-    for i in range(self.numRows):
-      for j in range(self.numCols):
-        tile = layout[j][i] # Layout reverse, see above
-        if tile == None:
-          self.hexagons[i][j] = None
-        else:
-          self.hexagons[i][j] = Hexagon(i, j, tile.resource, tile.number)
-          if tile.number in self.dieRollDict:
-            self.dieRollDict[tile.number].append(self.hexagons[i][j])
-          else:
-            self.dieRollDict[tile.number] = [self.hexagons[i][j]]
-
-          if tile.resource in self.resourceDict:
-            self.resourceDict[tile.resource].append(self.hexagons[i][j])
-          else:
-            self.resourceDict[tile.resource] = [self.hexagons[i][j]]
-
-    for row in self.hexagons:
-      for hexagon in row:
-        if hexagon == None: continue
-        edgeLocations = self.getEdgeLocations(hexagon)
-        vertexLocations = self.getVertexLocations(hexagon)
-        for xLoc,yLoc in edgeLocations:
-          if self.edges[xLoc][yLoc] == None:
-            self.edges[xLoc][yLoc] = Edge(xLoc,yLoc)
-        for xLoc,yLoc in vertexLocations:
-          if self.vertices[xLoc][yLoc] == None:
-            self.vertices[xLoc][yLoc] = Vertex(xLoc,yLoc)
+    for x, y in self.topology.hexagonLocations:
+      tile = layout[y][x] # Layout reverse, see above
+      self.hexagons[x][y] = Hexagon(x, y, tile.resource, tile.number)
+      if tile.number in self.dieRollDict:
+        self.dieRollDict[tile.number].append(self.hexagons[x][y])
+      else:
+        self.dieRollDict[tile.number] = [self.hexagons[x][y]]
+
+      if tile.resource in self.resourceDict:
+        self.resourceDict[tile.resource].append(self.hexagons[x][y])
+      else:
+        self.resourceDict[tile.resource] = [self.hexagons[x][y]]
+
+      if tile.resource != ResourceTypes.NOTHING:
+        self.hexagonProductionIndices[self.topology.hexagonIds[x, y]] = (
+          tile.number * NUM_PLAYERS * NUM_RESOURCES + RESOURCE_ORDER.index(tile.resource))
+
+    self.hexagonList = [self.hexagons[x][y] for x, y in self.topology.hexagonLocations]
+
     # brute forcing this because I don't want to debug
     if self.numRows == 5 and self.numCols == 5:
       self.visualBoard = [[None for x in xrange(self.numCols)] for x in xrange(self.numRows)] 
@@ -391,80 +917,464 @@ class Board:
     print self.vertices
 
   def deepCopy(self):
-    copy = Board(self.layout)
-    copy.hexagons = []
-    for row in self.hexagons:
-      copyHexRow = []
-      for hexagon in row:
-        if hexagon != None: copyHexRow.append(hexagon.deepCopy())
-        else: copyHexRow.append(None)
-      copy.hexagons.append(copyHexRow)
-    copy.edges = []
-    for row in self.edges:
-      copyEdgeRow = []
-      for edge in row:
-        if edge != None: copyEdgeRow.append(edge.deepCopy())
-        else: copyEdgeRow.append(None)
-      copy.edges.append(copyEdgeRow)
-    copy.vertices = []
-    for row in self.vertices:
-      copyVertexRow = []
-      for vertex in row:
-        if vertex != None: copyVertexRow.append(vertex.deepCopy())
-        else: copyVertexRow.append(None)
-      copy.vertices.append(copyVertexRow)
-    copy.allSettlements = []
-    for settlement in self.allSettlements:
-      copy.allSettlements.append(settlement.deepCopy())
-    copy.allRoads = []
-    for road in self.allRoads:
-      copy.allRoads.append(road.deepCopy())
+    # Only the BoardState changes during a game, so everything else
+    # (the hexagons, the topology, ...) is shared with the copy
+    copy = Board.__new__(Board)
+    copy.layout = self.layout
+    copy.topology = self.topology
+    copy.productionTable = self.productionTable
+    copy.numRows = self.numRows
+    copy.numCols = self.numCols
+    copy.hexagons = self.hexagons
+    copy.hexagonList = self.hexagonList
+    copy.dieRollDict = self.dieRollDict
+    copy.resourceDict = self.resourceDict
+    copy.hexagonProductionIndices = self.hexagonProductionIndices
+    copy.visualBoard = self.visualBoard
+    copy.tiles = self.tiles
+    # (Its own generator, in the same state, so random placements on the copy
+    # don't change the original's)
+    copy.random = random.Random()
+    copy.random.setstate(self.random.getstate())
+    copy.state = self.state.deepCopy()
+    copy.createViews()
+    copy.allSettlements = [copy.vertexViews[settlement.id] for settlement in self.allSettlements]
+    copy.allCities = [copy.vertexViews[city.id] for city in self.allCities]
+    copy.allRoads = [copy.edgeViews[road.id] for road in self.allRoads]
+    copy.zobristHash = self.zobristHash
     return copy
 
+  def serialize(self):
+    """
+    Method: serialize
+    --------------------------
+    Parameters: NA
+    Returns: a compact copy of this Board, made only of tuples, lists,
+      dictionaries, numbers and strings, that deserializeBoard can make
+      the Board again from.  This is much smaller and quicker to pickle
+      than the Board itself, e.g. to send it to another process.
+    --------------------------
+    """
+    # (A copy of the state, so that a Board made from this one doesn't share it)
+    state = self.state.deepCopy()
+    return (getLayoutTiles(self.layout), [getattr(state, name) for name in BoardState.__slots__],
+      [settlement.id for settlement in self.allSettlements], [city.id for city in self.allCities],
+      [road.id for road in self.allRoads], self.zobristHash)
+
+  def createViews(self):
+    """
+    Method: createViews
+    --------------------------
+    Parameters: NA
+    Returns: NA
+
+    Sets up edgeViews and vertexViews, which map the ID of each
+    edge and vertex on this Board to an Edge or Vertex viewing this
+    Board's state (see PieceViews).
+    --------------------------
+    """
+    state = self.state
+    self.edgeViews = PieceViews(self.topology.edgeLocations,
+      lambda x, y, edgeId: Edge(x, y, state = state, edgeId = edgeId))
+    self.vertexViews = PieceViews(self.topology.vertexLocations,
+      lambda x, y, vertexId: Vertex(x, y, state = state, vertexId = vertexId))
+
+  def getGrid(self, views, locations):
+    """
+    Method: getGrid
+    --------------------------
+    Parameters:
+      views: edgeViews or vertexViews
+      locations: the topology's edgeLocations or vertexLocations
+    Returns: a grid (double list) of the given views by their
+      (x, y) location, with None where there is nothing
+    --------------------------
+    """
+    grid = [[None for x in xrange(self.numCols*2+2)] for x in xrange(self.numRows*2+2)]
+    for pieceId, (x, y) in enumerate(locations):
+      grid[x][y] = views[pieceId]
+    return grid
+
+  # The edges and vertices of the board by (x, y) location
+  edges = property(lambda self: self.getGrid(self.edgeViews, self.topology.edgeLocations))
+  vertices = property(lambda self: self.getGrid(self.vertexViews, self.topology.vertexLocations))
+
+  def computeZobristHash(self):
+    """
+    Method: computeZobristHash
+    --------------------------
+    Parameters: NA
+    Returns: the Zobrist hash of the pieces on the board, computed
+      from scratch (zobristHash holds the incrementally updated value)
+    --------------------------
+    """
+    zobristHash = 0
+    state = self.state
+    for edgeId, (x, y) in enumerate(self.topology.edgeLocations):
+      if state.edgeOwner[edgeId] != None:
+        zobristHash ^= getZobristKey("ROAD", x, y, state.edgeOwner[edgeId])
+    for vertexId, (x, y) in enumerate(self.topology.vertexLocations):
+      if state.vertexBuilding[vertexId] != BuildingTypes.NOTHING:
+        zobristHash ^= getZobristKey(state.vertexBuilding[vertexId], x, y, state.vertexOwner[vertexId])
+    return zobristHash
+
   def applyAction(self, playerIndex, action):
+    """
+    Method: applyAction
+    --------------------------
+    Parameters:
+      playerIndex: the index of the player taking the action
+      action: the action tuple (ACTION, LOCATION) to apply
+    Returns: the information undoAction needs to reverse this action
+
+    Builds the given road, settlement or city on the board.  For
+    a settlement this is the canSettle mask and the road frontiers
+    from before the action, for a road it is the road frontiers and
+    the player's road ends from before the action, and for a city it
+    is the (index, settlement) pair that was removed from allSettlements.
+    --------------------------
+    """
     if action is None:
       return
       
     if action[0] == ACTIONS.SETTLE:
       actionVertex = action[1]
       vertex = self.getVertex(actionVertex.X, actionVertex.Y)
+      # Remember which vertices could be settled (and the road frontiers
+      # this changes) so that the action can be undone
+      state = self.state
+      oldFrontiers = [(playerIndex, state.roadFrontier.get(playerIndex, 0))]
+      undoInfo = (state.canSettleMask, oldFrontiers)
       vertex.settle(playerIndex)
+      self.zobristHash ^= getZobristKey("SETTLEMENT", vertex.X, vertex.Y, playerIndex)
+      self.addProduction(playerIndex, vertex.id, 1)
+      state.resourceTouches[playerIndex] += self.productionTable.hexagonCounts[vertex.id]
       # All vertices one away are now unsettleable
-      for neighborVertex in self.getNeighborVertices(vertex):
-        neighborVertex.canSettle = False
+      state.canSettleMask &= ~self.topology.vertexNeighborMasks[vertex.id]
+      # The settler can now build roads from here, and other players with
+      # roads ending here can no longer build roads through here
+      state.roadFrontier[playerIndex] = oldFrontiers[0][1] | self.topology.vertexEdgeMasks[vertex.id]
+      for player, roadEnds in state.roadEnds.items():
+        if player != playerIndex and (roadEnds >> vertex.id) & 1:
+          oldFrontiers.append((player, state.roadFrontier[player]))
+          self.updateRoadFrontier(player, vertex.id)
       self.allSettlements.append(vertex)
+      return undoInfo
 
     if action[0] == ACTIONS.ROAD:
       actionEdge = action[1]
       edge = self.getEdge(actionEdge.X, actionEdge.Y)
+      state = self.state
+      topology = self.topology
+      frontier = state.roadFrontier.get(playerIndex, 0)
+      roadEnds = state.roadEnds.get(playerIndex, 0)
       edge.build(playerIndex)
+      self.zobristHash ^= getZobristKey("ROAD", edge.X, edge.Y, playerIndex)
+      # The builder can now build roads out from the ends of the road, unless
+      # somebody else has built there
+      for vertexId in topology.edgeVertices[edge.id]:
+        if state.vertexOwner[vertexId] is None: frontier |= topology.vertexEdgeMasks[vertexId]
+      undoInfo = (state.roadFrontier.get(playerIndex, 0), roadEnds)
+      state.roadFrontier[playerIndex] = frontier
+      state.roadEnds[playerIndex] = roadEnds | topology.edgeVertexMasks[edge.id]
       self.allRoads.append(edge)
+      return undoInfo
 
     if action[0] == ACTIONS.CITY:
       actionVertex = action[1]
       vertex = self.getVertex(actionVertex.X, actionVertex.Y)
       vertex.upgrade(playerIndex)
+      self.zobristHash ^= getZobristKey("SETTLEMENT", vertex.X, vertex.Y, playerIndex)
+      self.zobristHash ^= getZobristKey("CITY", vertex.X, vertex.Y, playerIndex)
+      # A city produces one more of each resource than the settlement did
+      # (and is no longer counted as a settlement)
+      self.addProduction(playerIndex, vertex.id, 1)
+      self.state.resourceTouches[playerIndex] -= self.productionTable.hexagonCounts[vertex.id]
       self.allCities.append(vertex)
-      for settlement in self.allSettlements:
+      for i, settlement in enumerate(self.allSettlements):
         if settlement.X == vertex.X and settlement.Y == vertex.Y:
-          self.allSettlements.remove(settlement)
-          break
+          del self.allSettlements[i]
+          return (i, settlement)
+
+  def undoAction(self, playerIndex, action, undoInfo):
+    """
+    Method: undoAction
+    --------------------------
+    Parameters:
+      playerIndex: the index of the player that took the action
+      action: the action tuple (ACTION, LOCATION) to reverse
+      undoInfo: the value applyAction returned for this action
+    Returns: NA
+
+    Reverses an action previously applied with applyAction.  Actions
+    must be undone in the reverse order they were applied.
+    --------------------------
+    """
+    if action is None:
+      return
+
+    if action[0] == ACTIONS.SETTLE:
+      actionVertex = action[1]
+      vertex = self.getVertex(actionVertex.X, actionVertex.Y)
+      vertex.unsettle()
+      self.zobristHash ^= getZobristKey("SETTLEMENT", vertex.X, vertex.Y, playerIndex)
+      self.addProduction(playerIndex, vertex.id, -1)
+      self.state.resourceTouches[playerIndex] -= self.productionTable.hexagonCounts[vertex.id]
+      self.state.canSettleMask, oldFrontiers = undoInfo
+      for player, frontier in oldFrontiers:
+        self.state.roadFrontier[player] = frontier
+      self.allSettlements.pop()
+
+    if action[0] == ACTIONS.ROAD:
+      actionEdge = action[1]
+      edge = self.getEdge(actionEdge.X, actionEdge.Y)
+      edge.demolish()
+      self.zobristHash ^= getZobristKey("ROAD", edge.X, edge.Y, playerIndex)
+      self.state.roadFrontier[playerIndex], self.state.roadEnds[playerIndex] = undoInfo
+      self.allRoads.pop()
+
+    if action[0] == ACTIONS.CITY:
+      actionVertex = action[1]
+      vertex = self.getVertex(actionVertex.X, actionVertex.Y)
+      vertex.downgrade()
+      self.zobristHash ^= getZobristKey("SETTLEMENT", vertex.X, vertex.Y, playerIndex)
+      self.zobristHash ^= getZobristKey("CITY", vertex.X, vertex.Y, playerIndex)
+      self.addProduction(playerIndex, vertex.id, -1)
+      self.state.resourceTouches[playerIndex] += self.productionTable.hexagonCounts[vertex.id]
+      self.allCities.pop()
+      if undoInfo is not None:
+        index, settlement = undoInfo
+        self.allSettlements.insert(index, settlement)
+
+  def addProduction(self, playerIndex, vertexId, amount):
+    """
+    Method: addProduction
+    --------------------------
+    Parameters:
+      playerIndex: the index of the player building (or removing) a piece
+      vertexId: the ID of the vertex the piece is on
+      amount: how many more of each surrounding tile's resource the player
+        gets because of the piece (negative when a piece is removed)
+    Returns: NA
+
+    Updates the production table (see getProduction) and the player's
+    production ways (see getExpectedProduction) for a settlement or city
+    being built or removed.
+    --------------------------
+    """
+    production = self.state.production
+    hexagonProductionIndices = self.hexagonProductionIndices
+    playerOffset = playerIndex * NUM_RESOURCES
+    for hexagonId in self.topology.vertexHexagons[vertexId]:
+      index = hexagonProductionIndices[hexagonId]
+      if index is not None: production[index + playerOffset] += amount
+    productionWays = self.state.productionWays
+    for i, ways in enumerate(self.productionTable.productionWays[vertexId]):
+      productionWays[playerOffset + i] += amount * ways
+
+  def getProduction(self, playerIndex, dieRoll):
+    """
+    Method: getProduction
+    --------------------------
+    Parameters:
+      playerIndex: the index of a player
+      dieRoll: the dice total rolled
+    Returns: a list of the number of each resource (in RESOURCE_ORDER)
+      the given player gets for the given roll
+    --------------------------
+    """
+    start = (dieRoll * NUM_PLAYERS + playerIndex) * NUM_RESOURCES
+    return self.state.production[start:start + NUM_RESOURCES]
+
+  def getExpectedProduction(self, playerIndex):
+    """
+    Method: getExpectedProduction
+    --------------------------
+    Parameters:
+      playerIndex: the index of a player
+    Returns: a list of how many of each resource (in RESOURCE_ORDER) the
+      given player's settlements and cities produce on an average turn
+    --------------------------
+    """
+    start = playerIndex * NUM_RESOURCES
+    return [ways / float(DICE_ROLL_OUTCOMES) for ways in self.state.productionWays[start:start + NUM_RESOURCES]]
+
+  def getResourceTouches(self, playerIndex):
+    """
+    Method: getResourceTouches
+    --------------------------
+    Parameters:
+      playerIndex: the index of a player
+    Returns: the number of hexagons the given player's settlements touch
+      (counting each hexagon once per settlement touching it)
+    --------------------------
+    """
+    return self.state.resourceTouches[playerIndex]
 
   def getResourcesFromDieRollForPlayer(self, playerIndex, dieRoll):
-    hexagons = self.dieRollDict[dieRoll] #retrieve the hexagons that correspond to that dice roll
     resources = []
-    for hexagon in hexagons:
-      for vertex in self.getVertices(hexagon):
-        if vertex.player == playerIndex:
-          if hexagon.resource != ResourceTypes.NOTHING:
-            resources.append(hexagon.resource)
-            if vertex.isCity: resources.append(hexagon.resource)
-
+    for resource, count in zip(RESOURCE_ORDER, self.getProduction(playerIndex, dieRoll)):
+      resources.extend([resource] * count)
     return resources
 
+  def updateRoadFrontier(self, playerIndex, vertexId):
+    """
+    Method: updateRoadFrontier
+    --------------------------
+    Parameters:
+      playerIndex: the index of a player
+      vertexId: the ID of a vertex whose pieces just changed
+    Returns: NA
+
+    Works out again which of the edges at the given vertex are in the
+    player's road frontier: the edges with an end the player can build
+    roads out from.  Only those edges can be affected by a settlement
+    built at the vertex.  A player can build roads out from a vertex with
+    one of their settlements or cities, or at the end of one of their
+    roads if nobody else has built there.
+    --------------------------
+    """
+    state = self.state
+    vertexOwner = state.vertexOwner
+    edgeVertices = self.topology.edgeVertices
+    roadEnds = state.roadEnds.get(playerIndex, 0)
+    frontier = state.roadFrontier.get(playerIndex, 0)
+    for edgeId in self.topology.vertexEdges[vertexId]:
+      frontier &= ~(1 << edgeId)
+      for end in edgeVertices[edgeId]:
+        owner = vertexOwner[end]
+        if owner == playerIndex or (owner is None and (roadEnds >> end) & 1):
+          frontier |= 1 << edgeId
+          break
+    state.roadFrontier[playerIndex] = frontier
+
+  def getBuildableRoadMask(self, playerIndex):
+    """
+    Method: getBuildableRoadMask
+    --------------------------
+    Parameters:
+      playerIndex: the index of a player
+    Returns: a bitmask of the edges the given player could build
+      a road on: the free edges next to one of their settlements or
+      cities, or at the end of one of their roads (unless another
+      player has built at that end).  These are the free edges in
+      the player's road frontier, kept up to date by applyAction/undoAction.
+    --------------------------
+    """
+    occupiedEdges = 0
+    for roads in self.state.roads.itervalues(): occupiedEdges |= roads
+    return self.state.roadFrontier.get(playerIndex, 0) & ~occupiedEdges
+
+  def computeBuildableRoadMask(self, playerIndex):
+    """
+    Method: computeBuildableRoadMask
+    --------------------------
+    Parameters:
+      playerIndex: the index of a player
+    Returns: the same bitmask as getBuildableRoadMask, computed
+      from scratch from all of the pieces on the board
+    --------------------------
+    """
+    state = self.state
+    topology = self.topology
+    occupiedEdges = 0
+    for roads in state.roads.values(): occupiedEdges |= roads
+    otherBuildings = 0
+    for player, settlements in state.settlements.items():
+      if player != playerIndex: otherBuildings |= settlements
+    for player, cities in state.cities.items():
+      if player != playerIndex: otherBuildings |= cities
+    reachableVertices = state.settlements.get(playerIndex, 0) | state.cities.get(playerIndex, 0)
+    edgeVertexMasks = topology.edgeVertexMasks
+    for road in getBitIndices(state.roads.get(playerIndex, 0)):
+      reachableVertices |= edgeVertexMasks[road] & ~otherBuildings
+
+    roadMask = 0
+    vertexEdgeMasks = topology.vertexEdgeMasks
+    for vertex in getBitIndices(reachableVertices):
+      roadMask |= vertexEdgeMasks[vertex]
+    return roadMask & ~occupiedEdges
+
+  def getSettleableMask(self, playerIndex):
+    """
+    Method: getSettleableMask
+    --------------------------
+    Parameters:
+      playerIndex: the index of a player
+    Returns: a bitmask of the vertices the given player could build
+      a settlement on: the vertices at the end of one of their roads
+      that can still be settled
+    --------------------------
+    """
+    return self.state.roadEnds.get(playerIndex, 0) & self.state.canSettleMask
+
+  def getEdgesInMask(self, mask):
+    """
+    Method: getEdgesInMask
+    --------------------------
+    Parameters:
+      mask: a bitmask over edge IDs
+    Returns: a list of this Board's Edges whose bits are set in the mask
+    --------------------------
+    """
+    edgeViews = self.edgeViews
+    return [edgeViews[i] for i in getBitIndices(mask)]
+
+  def getVerticesInMask(self, mask):
+    """
+    Method: getVerticesInMask
+    --------------------------
+    Parameters:
+      mask: a bitmask over vertex IDs
+    Returns: a list of this Board's Vertices whose bits are set in the mask
+    --------------------------
+    """
+    vertexViews = self.vertexViews
+    return [vertexViews[i] for i in getBitIndices(mask)]
+
+  def getOpeningValue(self, vertexIds):
+    """
+    Method: getOpeningValue
+    --------------------------
+    Parameters:
+      vertexIds: the IDs of some vertices to settle
+    Returns: how good the vertices are for a player's first settlements:
+      the number of resources settlements there are expected to produce
+      each turn, plus OPENING_RESOURCE_TYPE_VALUE for each kind of
+      resource they produce
+    --------------------------
+    """
+    expectedProduction = self.productionTable.expectedProduction
+    production = [0.0] * NUM_RESOURCES
+    for vertexId in vertexIds:
+      for i, amount in enumerate(expectedProduction[vertexId]):
+        production[i] += amount
+    return sum(production) + OPENING_RESOURCE_TYPE_VALUE * sum(1 for amount in production if amount > 0)
+
+  def rankOpeningPairs(self):
+    """
+    Method: rankOpeningPairs
+    --------------------------
+    Parameters: NA
+    Returns: a list of (value, Vertex, Vertex) tuples for every pair of
+      vertices that can both still be settled (and aren't next to each
+      other), best first by getOpeningValue (and then in order of ID)
+    --------------------------
+    """
+    vertexNeighborMasks = self.topology.vertexNeighborMasks
+    settleable = getBitIndices(self.state.canSettleMask)
+    pairs = []
+    for i, first in enumerate(settleable):
+      for second in settleable[i+1:]:
+        if not (vertexNeighborMasks[first] >> second) & 1:
+          pairs.append((self.getOpeningValue((first, second)), first, second))
+    pairs.sort(key = lambda pair: -pair[0])
+    vertexViews = self.vertexViews
+    return [(value, vertexViews[first], vertexViews[second]) for value, first, second in pairs]
+
   # Gives back a random hex corresponding to that resource
   def getRandomResourceHex(self, resource):
-    return random.choice(self.resourceDict[resource])
+    return self.random.choice(self.resourceDict[resource])
 
   def getRandomVerticesForAllResources(self):
     resourcesForSettlement = [ResourceTypes.LUMBER, ResourceTypes.BRICK, ResourceTypes.WOOL, ResourceTypes.GRAIN]
@@ -499,7 +1409,7 @@ class Board:
     vertices = self.getVertices(hex)
     vertex = None
     while vertex == None:
-      index = random.randint(0, len(vertices)-1)
+      index = self.random.randint(0, len(vertices)-1)
       vertex = vertices[index]
       if not vertex.canSettle: vertex = None
     return vertex
@@ -507,18 +1417,18 @@ class Board:
   # returns 4 locations for settlements
   def getRandomVerticesForSettlement(self):
     # get random lumber hexes
-    lumberIndexOne = random.randint(1, 4)
-    lumberIndexTwo = random.randint(1, 4)
+    lumberIndexOne = self.random.randint(1, 4)
+    lumberIndexTwo = self.random.randint(1, 4)
     while lumberIndexTwo == lumberIndexOne:
-      lumberIndexTwo = random.randint(1, 4)
+      lumberIndexTwo = self.random.randint(1, 4)
     lumberHexOne = self.getLumberHex(lumberIndexOne)
     lumberHexTwo = self.getLumberHex(lumberIndexTwo)
 
     # get random brick hexes
-    brickIndexOne = random.randint(1, 3)
-    brickIndexTwo = random.randint(1, 3)
+    brickIndexOne = self.random.randint(1, 3)
+    brickIndexTwo = self.random.randint(1, 3)
     while brickIndexTwo == brickIndexOne:
-      brickIndexTwo = random.randint(1, 3)
+      brickIndexTwo = self.random.randint(1, 3)
     brickHexOne = self.getBrickHex(brickIndexOne)
     brickHexTwo = self.getBrickHex(brickIndexTwo)
 
@@ -538,11 +1448,12 @@ class Board:
     return [(vertexOne, vertexTwo), (vertexThree, vertexFour)]
 
   def getRandomVertexForSettlement(self):
+    vertices = self.vertices
     vertex = None
     while vertex == None:
-      vX = random.randint(0, len(self.vertices)-1)
-      vY = random.randint(0, len(self.vertices[vX])-1)
-      vertex = self.vertices[vX][vY]
+      vX = self.random.randint(0, len(vertices)-1)
+      vY = self.random.randint(0, len(vertices[vX])-1)
+      vertex = vertices[vX][vY]
       if vertex != None and not vertex.canSettle: vertex = None
     return vertex
 
@@ -550,187 +1461,90 @@ class Board:
     edges = self.getEdgesOfVertex(vertex)
     randomEdge = None
     while randomEdge == None:
-      randomEdge = edges[random.randint(0, len(edges)-1)]
+      randomEdge = edges[self.random.randint(0, len(edges)-1)]
       if randomEdge.isOccupied(): randomEdge = None
     return randomEdge
 
   def getEdge(self, x, y):
-    return self.edges[x][y]
+    edgeId = self.topology.edgeIds.get((x, y))
+    if edgeId is None: return None
+    return self.edgeViews[edgeId]
 
   def getVertex(self, x, y):
-    return self.vertices[x][y]
+    vertexId = self.topology.vertexIds.get((x, y))
+    if vertexId is None: return None
+    return self.vertexViews[vertexId]
 
   def getHex(self, x, y):
     return self.hexagons[x][y]
 
   def getNeighborHexes(self, hex):
-    neighbors = []
-    x = hex.X
-    y = hex.Y
-    offset = 1
-    if x % 2 != 0:
-      offset = -1
-
-    if (y+1) < len(self.hexagons[x]):
-      hexOne = self.hexagons[x][y+1]
-      if hexOne != None: neighbors.append(hexOne)
-    if y > 0:
-      hexTwo = self.hexagons[x][y-1]
-      if hexTwo != None: neighbors.append(hexTwo)
-    if (x+1) < len(self.hexagons):
-      hexThree = self.hexagons[x+1][y]
-      if hexThree != None: neighbors.append(hexThree)
-    if x > 0:
-      hexFour = self.hexagons[x-1][y]
-      if hexFour != None: neighbors.append(hexFour)
-    if (y+offset) >= 0 and (y+offset) < len(self.hexagons[x]):
-      if (x+1) < len(self.hexagons):
-        hexFive = self.hexagons[x+1][y+offset]
-        if hexFive != None: neighbors.append(hexFive)
-      if x > 0:
-        hexSix = self.hexagons[x-1][y+offset]
-        if hexSix != None: neighbors.append(hexSix)
-    return neighbors
+    hexagonList = self.hexagonList
+    return [hexagonList[i] for i in self.topology.hexagonNeighbors[self.topology.hexagonIds[hex.X, hex.Y]]]
 
   # Vertices connected to vertex via roads
   def getNeighborVerticesViaRoad(self, vertex, player):
     neighbors = []
-    edgesOfVertex = getEdgesOfVertex(vertex)
+    edgesOfVertex = self.getEdgesOfVertex(vertex)
     for edge in edgesOfVertex:
       if edge.player == player:
-        vertexEnds = getVertexEnds(edge)
+        vertexEnds = self.getVertexEnds(edge)
         for vertexEnd in vertexEnds:
-          if vertexEnd != vertex: neighbors.append(vertexEnd)
+          if not vertexEnd.equivLocation(vertex): neighbors.append(vertexEnd)
     return neighbors
 
   def getNeighborVertices(self, vertex):
-    neighbors = []
-    x = vertex.X
-    y = vertex.Y
-    offset = -1
-    if x % 2 == y % 2: offset = 1
-    # Logic from thinking that this is saying getEdgesOfVertex
-    # and then for each edge getVertexEnds, taking out the three that are ==vertex
-    if (y+1) < len(self.vertices[0]):
-      vertexOne = self.vertices[x][y+1]
-      if vertexOne != None: neighbors.append(vertexOne)
-    if y > 0:
-      vertexTwo = self.vertices[x][y-1]
-      if vertexTwo != None: neighbors.append(vertexTwo)
-    if (x+offset) >= 0 and (x+offset) < len(self.vertices):
-      vertexThree = self.vertices[x+offset][y]
-      if vertexThree != None: neighbors.append(vertexThree)
-    return neighbors
+    vertexViews = self.vertexViews
+    return [vertexViews[i] for i in self.topology.vertexNeighbors[self.topology.vertexIds[vertex.X, vertex.Y]]]
 
-  # used to initially create vertices
   def getVertexLocations(self, hex):
-    vertexLocations = []
-    x = hex.X
-    y = hex.Y
-    offset = x % 2
-    offset = 0-offset
-    vertexLocations.append((x, 2*y+offset))
-    vertexLocations.append((x, 2*y+1+offset))
-    vertexLocations.append((x, 2*y+2+offset))
-    vertexLocations.append((x+1, 2*y+offset))
-    vertexLocations.append((x+1, 2*y+1+offset))
-    vertexLocations.append((x+1, 2*y+2+offset))
-    return vertexLocations
-
-  # used to initially create edges
+    return self.topology.getVertexLocations(hex.X, hex.Y)
+
   def getEdgeLocations(self, hex):
-    edgeLocations = []
-    x = hex.X
-    y = hex.Y
-    offset = x % 2
-    offset = 0-offset
-    edgeLocations.append((2*x,2*y+offset))
-    edgeLocations.append((2*x,2*y+1+offset))
-    edgeLocations.append((2*x+1,2*y+offset))
-    edgeLocations.append((2*x+1,2*y+2+offset))
-    edgeLocations.append((2*x+2,2*y+offset))
-    edgeLocations.append((2*x+2,2*y+1+offset))
-    return edgeLocations
+    return self.topology.getEdgeLocations(hex.X, hex.Y)
 
   # tested
   def getVertices(self, hex):
-    hexVertices = []
-    x = hex.X
-    y = hex.Y
-    offset = x % 2
-    offset = 0-offset
-    hexVertices.append(self.vertices[x][2*y+offset]) # top vertex
-    hexVertices.append(self.vertices[x][2*y+1+offset]) # left top vertex
-    hexVertices.append(self.vertices[x][2*y+2+offset]) # left bottom vertex
-    hexVertices.append(self.vertices[x+1][2*y+offset]) # right top vertex
-    hexVertices.append(self.vertices[x+1][2*y+1+offset]) # right bottom vertex
-    hexVertices.append(self.vertices[x+1][2*y+2+offset]) # bottom vertex
-    return hexVertices
+    vertexViews = self.vertexViews
+    return [vertexViews[i] for i in self.topology.hexagonVertices[self.topology.hexagonIds[hex.X, hex.Y]]]
 
   def getEdges(self, hex):
-    hexEdges = []
-    x = hex.X
-    y = hex.Y
-    offset = x % 2
-    offset = 0-offset
-    hexEdges.append(self.edges[2*x][2*y+offset])
-    hexEdges.append(self.edges[2*x][2*y+1+offset])
-    hexEdges.append(self.edges[2*x+1][2*y+offset])
-    hexEdges.append(self.edges[2*x+1][2*y+2+offset])
-    hexEdges.append(self.edges[2*x+2][2*y+offset])
-    hexEdges.append(self.edges[2*x+2][2*y+1+offset])
-    return hexEdges
+    edgeViews = self.edgeViews
+    return [edgeViews[i] for i in self.topology.hexagonEdges[self.topology.hexagonIds[hex.X, hex.Y]]]
 
   # returns (start, end) tuple
   def getVertexEnds(self, edge):
-    x = edge.X
-    y = edge.Y
-    vertexOne = self.vertices[(x-1)/2][y]
-    vertexTwo = self.vertices[(x+1)/2][y]
-    if x%2 == 0:
-      vertexOne = self.vertices[x/2][y]
-      vertexTwo = self.vertices[x/2][y+1]
-    return (vertexOne, vertexTwo)
+    vertexViews = self.vertexViews
+    start, end = self.topology.edgeVertices[self.topology.edgeIds[edge.X, edge.Y]]
+    return (vertexViews[start], vertexViews[end])
 
   def getEdgesOfVertex(self, vertex):
-    vertexEdges = []
-    x = vertex.X
-    y = vertex.Y
-    offset = -1
-    if x % 2 == y % 2: offset = 1
-    edgeOne = self.edges[x*2][y-1]
-    edgeTwo = self.edges[x*2][y]
-    edgeThree = self.edges[x*2+offset][y]
-    if edgeOne != None: vertexEdges.append(edgeOne)
-    if edgeTwo != None: vertexEdges.append(edgeTwo)
-    if edgeThree != None: vertexEdges.append(edgeThree)
-    return vertexEdges
+    edgeViews = self.edgeViews
+    return [edgeViews[i] for i in self.topology.vertexEdges[self.topology.vertexIds[vertex.X, vertex.Y]]]
 
   # tested
   def getHexes(self, vertex):
-    vertexHexes = []
-    x = vertex.X
-    y = vertex.Y
-    xOffset = x % 2
-    yOffset = y % 2
-
-    if x < len(self.hexagons) and y/2 < len(self.hexagons[x]):
-      hexOne = self.hexagons[x][y/2]
-      if hexOne != None: vertexHexes.append(hexOne)
-
-    weirdX = x
-    if (xOffset+yOffset) == 1: weirdX = x-1
-    weirdY = y/2 
-    if yOffset == 1: weirdY += 1
-    else: weirdY -= 1
-    if weirdX >= 0 and weirdX < len(self.hexagons) and weirdY >= 0 and weirdY < len(self.hexagons):
-      hexTwo = self.hexagons[weirdX][weirdY]
-      if hexTwo != None: vertexHexes.append(hexTwo)
-
-    if x > 0 and x < len(self.hexagons) and y/2 < len(self.hexagons[x]):
-      hexThree = self.hexagons[x-1][y/2]
-      if hexThree != None: vertexHexes.append(hexThree)
-      
-    return vertexHexes
-   
+    hexagonList = self.hexagonList
+    return [hexagonList[i] for i in self.topology.vertexHexagons[self.topology.vertexIds[vertex.X, vertex.Y]]]
+
 
+def deserializeBoard(data):
+  """
+  Function: deserializeBoard
+  ---------------------------
+  Parameters:
+    data: the result of Board.serialize
+  Returns: a new Board with the same pieces on it as the Board that
+    was serialized
+  ---------------------------
+  """
+  tiles, stateValues, settlementIds, cityIds, roadIds, zobristHash = data
+  board = Board(getLayoutFromTiles(tiles), seed = 0)
+  # The Board's views all look at its state, so fill that in rather than replacing it
+  for name, value in zip(BoardState.__slots__, stateValues):
+    setattr(board.state, name, value)
+  board.allSettlements = [board.vertexViews[i] for i in settlementIds]
+  board.allCities = [board.vertexViews[i] for i in cityIds]
+  board.allRoads = [board.edgeViews[i] for i in roadIds]
+  board.zobristHash = zobristHash
+  return board
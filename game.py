@@ -1,8 +1,10 @@
 from agents import *
-from board import BeginnerLayout, Board, Edge, Hexagon, Vertex
+from board import BeginnerLayout, Board, Edge, Hexagon, Vertex, getZobristKey, deserializeBoard
 from gameConstants import *
 from collections import Counter
 from draw import *
+from gameEvents import GameEvent, PrintEventSink
+import random
 import time
 
 class GameState:
@@ -15,7 +17,7 @@ class GameState:
   -------------------------------
   """
 
-  def __init__(self, layout = BeginnerLayout):
+  def __init__(self, layout = BeginnerLayout, board = None, diceAgent = None, seed = None):
     """
     Method: __init__
     -----------------------------
@@ -24,6 +26,11 @@ class GameState:
         in, this new GameState object will instead be cloned from prevState
       layout - an optional board layout to pass in to define the layout
         of the game board
+      board - an optional Board object to use instead of creating
+        a new one from the layout
+      diceAgent - an optional DiceAgent to use instead of creating a new one
+      seed - an optional seed for the random number generators of the Board
+        and DiceAgent that are created, so that games can be replayed
 
     Returns: NA
 
@@ -34,18 +41,40 @@ class GameState:
     ------------------------------
     """
     
-    self.board = Board(layout)
+    # (Only make a random number generator if it's needed: seeding
+    # one from the system's randomness takes a while)
+    if board is None or diceAgent is None: seeds = random.Random(seed)
+    self.board = board if board is not None else Board(layout, seed = seeds.getrandbits(32))
     self.playerAgents = [None] * NUM_PLAYERS
 
     # Make the dice agent
-    self.diceAgent = DiceAgent()
+    self.diceAgent = diceAgent if diceAgent is not None else DiceAgent(seed = seeds.getrandbits(32))
+
+    # Stack of moves made with makeMove, most recent last, so that
+    # search can undo them instead of copying the whole state
+    self.undoLog = []
 
   def deepCopy(self):
-    copy = GameState()
-    copy.board = self.board.deepCopy()
+    # The copy goes on to roll the same dice, without advancing this state's
+    # (so a game stays reproducible after copying)
+    copy = GameState(board = self.board.deepCopy(), diceAgent = self.diceAgent.deepCopy())
     copy.playerAgents = [playerAgent.deepCopy(copy.board) for playerAgent in self.playerAgents]
     return copy
 
+  def serialize(self):
+    """
+    Method: serialize
+    ----------------------------
+    Parameters: NA
+    Returns: a compact copy of the board and the players' pieces,
+      resources and victory points, made only of plain values (see
+      Board.serialize), that deserializeGameState can make the GameState
+      again from.  This is what searches send to other processes, since
+      it is much smaller and quicker to pickle than the GameState.
+    ----------------------------
+    """
+    return (self.board.serialize(), [agent.serialize() for agent in self.playerAgents])
+
   # def sortLegalActions(self, actions):
 
 
@@ -57,52 +86,33 @@ class GameState:
       agentIndex - the index of the agent to return legal actions for
 
     Returns: a list of action tuples (ACTION, LOCATION) (e.g. (ACTIONS.SETTLE, *some Vertex object*))
-      representing all the valid actions that the given agent/player can take
+      representing all the valid actions that the given agent/player can take.
+      The list is always in the same order: roads, then settlements, then
+      cities, each in order of their location's ID on the board (see BoardTopology)
     ------------------------------
     """
-    legalActions = set()
+    legalActions = []
     if self.gameOver() >= 0: return legalActions
     agent = self.playerAgents[agentIndex]
+    board = self.board
 
-    # If they can build a road...
+    # If they can build a road, they can build on any free edge coming from
+    # their settlements, cities and roads
     if agent.canBuildRoad():
-      # Look at all unoccupied edges coming from the player's existing settlements and cities
-      agentSettlements = []; agentSettlements.extend(agent.settlements); agentSettlements.extend(agent.cities)
-      for settlement in agentSettlements:
-        currEdges = self.board.getEdgesOfVertex(settlement)
-        for currEdge in currEdges:
-          if not currEdge.isOccupied():
-            if (ACTIONS.ROAD, currEdge) not in legalActions:
-              legalActions.add((ACTIONS.ROAD, currEdge))
-
-      # Look at all unoccupied edges coming from the player's existing roads
-      for road in agent.roads:
-        currVertices = self.board.getVertexEnds(road)
-        for vertex in currVertices:
-          if vertex.player != None and vertex.player != agentIndex: continue
-          currEdges = self.board.getEdgesOfVertex(vertex)
-          for currEdge in currEdges:
-            if not currEdge.isOccupied(): 
-              if (ACTIONS.ROAD, currEdge) not in legalActions:
-                legalActions.add((ACTIONS.ROAD, currEdge)) 
-
-    # If they can settle...
-    if agent.canSettle():
+      for edge in board.getEdgesInMask(board.getBuildableRoadMask(agentIndex)):
+        legalActions.append((ACTIONS.ROAD, edge))
 
-      # Look at all unoccupied endpoints of the player's existing roads
-      for road in agent.roads:
-        possibleSettlements = self.board.getVertexEnds(road)
-        for possibleSettlement in possibleSettlements:
-          if possibleSettlement.canSettle:
-            if (ACTIONS.SETTLE, possibleSettlement) not in legalActions:
-              legalActions.add((ACTIONS.SETTLE, possibleSettlement))
+    # If they can settle, they can settle at any settleable end of their roads
+    if agent.canSettle():
+      for vertex in board.getVerticesInMask(board.getSettleableMask(agentIndex)):
+        legalActions.append((ACTIONS.SETTLE, vertex))
 
     # If they can build a city...
     if agent.canBuildCity():
       # All current settlements are valid city locations
-      for settlement in agent.settlements:
-        legalActions.add((ACTIONS.CITY, settlement))
-    return list(legalActions)
+      for settlement in board.getVerticesInMask(board.state.settlements.get(agentIndex, 0)):
+        legalActions.append((ACTIONS.CITY, settlement))
+    return legalActions
 
   def generateSuccessor(self, playerIndex, action):
     """
@@ -129,19 +139,131 @@ class GameState:
     copy.board.applyAction(playerIndex, action)
     return copy
 
-  def makeMove(self, playerIndex, action):
+  def makeMove(self, playerIndex, action, diceRoll = None):
     """
-    Method: generateSuccessor
+    Method: makeMove
     ----------------------------
     Parameters:
       playerIndex - the number of the player that is about to take an action
       action - the action that the player is about to take
+      diceRoll - an optional dice total to distribute resources for
+        after the action is taken
+
+    Returns: NA
+
+    Modifies the current game state in place to reflect the action that
+    is passed in (and the resources granted by diceRoll, if given), and
+    records what changed in the undo log so that undoMove can restore
+    the previous state.  This is the cheap alternative to generateSuccessor
+    for search, since nothing is copied.
+    ----------------------------
+    """
+    playerUndoInfo = self.playerAgents[playerIndex].applyAction(action, self.board)
+    boardUndoInfo = self.board.applyAction(playerIndex, action)
+    gainedResources = None
+    if diceRoll is not None:
+      gainedResources = self.updatePlayerResourcesForDiceRoll(diceRoll)
+    self.undoLog.append((playerIndex, action, playerUndoInfo, boardUndoInfo, gainedResources))
+
+  def makeDiceRoll(self, diceRoll):
+    """
+    Method: makeDiceRoll
+    ----------------------------
+    Parameters:
+      diceRoll - the dice total to distribute resources for
+
+    Returns: NA
+
+    Hands out the resources for the given dice roll, recording it in the
+    undo log like makeMove so that undoMove can take them back.  This lets
+    a search make an action once and then try each dice roll after it.
+    ----------------------------
+    """
+    gainedResources = self.updatePlayerResourcesForDiceRoll(diceRoll)
+    self.undoLog.append((None, None, None, None, gainedResources))
+
+  def undoMove(self):
+    """
+    Method: undoMove
+    ----------------------------
+    Parameters: NA
+    Returns: NA
+
+    Reverses the most recent makeMove (or makeDiceRoll) call, including
+    any resources handed out for its dice roll.
+    ----------------------------
+    """
+    playerIndex, action, playerUndoInfo, boardUndoInfo, gainedResources = self.undoLog.pop()
+    if gainedResources is not None:
+      for agent, resources in zip(self.playerAgents, gainedResources):
+        agent.subtractResourceCounts(resources)
+    if playerIndex is not None:
+      self.board.undoAction(playerIndex, action, boardUndoInfo)
+      self.playerAgents[playerIndex].undoAction(action, playerUndoInfo)
+
+  def getZobristHash(self, playerIndex):
+    """
+    Method: getZobristHash
+    ----------------------------
+    Parameters:
+      playerIndex - the index of the player whose turn it is
+    Returns: a 64-bit Zobrist hash of the whole position (the pieces on
+      the board, every player's resources and victory points, and whose
+      turn it is).  Equal positions have equal hashes no matter what
+      order the moves that led to them were made in.
+
+    This is O(1), since the board and players keep their parts of the hash
+    up to date as moves are made and undone.
+    ----------------------------
+    """
+    zobristHash = self.board.zobristHash ^ getZobristKey("TO_MOVE", playerIndex)
+    for agent in self.playerAgents:
+      zobristHash ^= agent.zobristHash
+    return zobristHash
 
-    Modifies the current game state to reflect the action that is passed in
+  def computeZobristHash(self, playerIndex):
+    """
+    Method: computeZobristHash
+    ----------------------------
+    Parameters:
+      playerIndex - the index of the player whose turn it is
+    Returns: the same hash as getZobristHash, but computed from scratch.
+      Useful for checking that the incremental hash is correct.
+    ----------------------------
+    """
+    zobristHash = self.board.computeZobristHash() ^ getZobristKey("TO_MOVE", playerIndex)
+    for agent in self.playerAgents:
+      zobristHash ^= agent.computeZobristHash()
+    return zobristHash
+
+  def getDiceOutcomes(self):
+    """
+    Method: getDiceOutcomes
+    ----------------------------
+    Parameters: NA
+    Returns: a list of (ROLL, PROBABILITY) tuples like
+      DiceAgent.getRollDistribution, except that rolls that would hand
+      out exactly the same resources to every player are merged into
+      a single tuple (one of those rolls, and their total probability).
+
+    Rolling any roll in a merged group leads to the same state, so
+    searching just these outcomes gives the same expected values as
+    searching all 11 rolls.  Rolls that nobody has built next to (and
+    the 7) all fall into one group, so there are usually only a few.
     ----------------------------
     """
-    self.playerAgents[playerIndex].applyAction(action, self.board)
-    self.board.applyAction(playerIndex, action)
+    outcomes = []
+    outcomeIndices = {}
+    for roll, probability in self.diceAgent.getRollDistribution():
+      gainedResources = tuple(tuple(self.board.getProduction(agent.agentIndex, roll))
+        for agent in self.playerAgents)
+      if gainedResources in outcomeIndices:
+        index = outcomeIndices[gainedResources]
+        outcomes[index] = (outcomes[index][0], outcomes[index][1] + probability)
+      else:
+        outcomeIndices[gainedResources] = len(outcomes)
+        outcomes.append((roll, probability))
+    return outcomes
 
   def getNumPlayerAgents(self):
     """
@@ -174,18 +296,34 @@ class GameState:
     Parameters:
       diceRoll - the dice total of the 2 rolled 6-sided dice
         to use to distribute more resources
-    Returns: NA
+    Returns: a list of resource counts (see Board.getProduction), one
+      per agent, of the resources each agent gained
 
     Updates the resource counts of all agents based on the
     given dice roll.
     -----------------------------------------
     """
-    for agent in self.playerAgents:
-      gainedResources = agent.updateResources(diceRoll, self.board)
-      if VERBOSE and DEBUG:
-        print str(agent.name) + " received: " + str(gainedResources)
-        print str(agent.name) + " now has: " + str(agent.resources)
+    return [agent.updateResources(diceRoll, self.board) for agent in self.playerAgents]
+
 
+def deserializeGameState(data, playerAgents):
+  """
+  Function: deserializeGameState
+  ----------------------------
+  Parameters:
+    data - the result of GameState.serialize
+    playerAgents - a PlayerAgent for each player in the serialized GameState,
+      in order, which are given that player's pieces, resources and victory points
+  Returns: a new GameState in the same position as the one that was serialized,
+    played by the given PlayerAgents (its dice are not the same, though)
+  ----------------------------
+  """
+  boardData, playerData = data
+  state = GameState(board = deserializeBoard(boardData), diceAgent = DiceAgent(seed = 0))
+  state.playerAgents = playerAgents
+  for agent, agentData in zip(playerAgents, playerData):
+    agent.deserialize(agentData, state.board)
+  return state
 
 class Game:
   """
@@ -194,17 +332,29 @@ class Game:
   Represents all information about a game, and controls game flow.
   In addition to containing a GameState object to keep track of all game
   state, a Game object also contains the game's move history as a list
-  of (AGENTNAME, ACTION) tuples.
+  of (AGENTNAME, ACTION) tuples, and the seconds each of those moves
+  took to choose.  What happens in the game is given to its event sinks
+  as GameEvents (see gameEvents.py).
   ------------------------
   """
 
-  def __init__(self, playerAgentNums = None):
+  def __init__(self, playerAgentNums = None, seed = None, eventSinks = None, initialPlacement = DEFAULT_INITIAL_PLACEMENT,
+    depth = None):
     """
     Method: __init__
     ----------------------
     Parameters:
       gameState - an optional pre-defined GameState object to use for the game.
         If one isn't passed in, the Game begins with a newly-created GameState object.
+      seed - an optional seed for all of the game's randomness (the board setup,
+        the dice and the random players), so that games with the same seed and
+        players play out the same way
+      eventSinks - an optional list of the objects to give the game's events to.
+        By default the game is printed (if VERBOSE is set); with no sinks,
+        no time is spent describing the game at all.
+      initialPlacement - how the players' first settlements and roads are
+        placed (one of INITIAL_PLACEMENTS, see initializeSettlementsAndResources)
+      depth - the depth the search agents search to (None for DEPTH)
 
     Returns: NA
 
@@ -213,7 +363,12 @@ class Game:
     ----------------------
     """
     self.moveHistory = []
-    self.gameState = GameState()
+    self.moveTimes = []
+    self.eventSinks = eventSinks
+    self.initialPlacement = initialPlacement
+    self.depth = depth if depth is not None else DEPTH
+    self.random = random.Random(seed)
+    self.gameState = GameState(seed = self.random.getrandbits(32))
     self.playerAgentNums = playerAgentNums 
     if GRAPHICS: self.draw = Draw(self.gameState.board.tiles)
 
@@ -245,31 +400,44 @@ class Game:
     color = getColorForPlayer(index)
 
     if playerCode == 0:
-      return PlayerAgentRandom("Player "+str(index), index, color)
+      return PlayerAgentRandom("Player "+str(index), index, color, seed=self.random.getrandbits(32))
     elif playerCode == 1:
-      return PlayerAgentExpectiminimax("Player "+str(index), index, color, depth=DEPTH)
+      return PlayerAgentExpectiminimax("Player "+str(index), index, color, depth=self.depth)
     elif playerCode == 2:
-      return PlayerAgentExpectiminimax("Player "+str(index), index, color, depth=DEPTH,evalFn=builderEvalFn)
+      return PlayerAgentExpectiminimax("Player "+str(index), index, color, depth=self.depth,evalFn=builderEvalFn)
     elif playerCode == 3:
-      return PlayerAgentExpectiminimax("Player "+str(index), index, color, depth=DEPTH,evalFn=resourceEvalFn)
+      return PlayerAgentExpectiminimax("Player "+str(index), index, color, depth=self.depth,evalFn=resourceEvalFn)
     elif playerCode == 4:
-      return PlayerAgentExpectimax("Player "+str(index), index, color, depth=DEPTH, evalFn=betterEvalFn)
+      return PlayerAgentExpectimax("Player "+str(index), index, color, depth=self.depth, evalFn=betterEvalFn)
     elif playerCode == 5:
-      return PlayerAgentExpectimax("Player "+str(index), index, color, depth=DEPTH,evalFn=builderEvalFn)
+      return PlayerAgentExpectimax("Player "+str(index), index, color, depth=self.depth,evalFn=builderEvalFn)
     elif playerCode == 6:
-      return PlayerAgentExpectimax("Player "+str(index), index, color, depth=DEPTH,evalFn=resourceEvalFn)
+      return PlayerAgentExpectimax("Player "+str(index), index, color, depth=self.depth,evalFn=resourceEvalFn)
     elif playerCode == 7:
-      return PlayerAgentAlphaBeta("Player "+str(index), index, color, depth=DEPTH)
+      return PlayerAgentAlphaBeta("Player "+str(index), index, color, depth=self.depth)
     elif playerCode == 8:
-      return PlayerAgentAlphaBeta("Player "+str(index), index, color, depth=DEPTH,evalFn=builderEvalFn)
+      return PlayerAgentAlphaBeta("Player "+str(index), index, color, depth=self.depth,evalFn=builderEvalFn)
     elif playerCode == 9:
-      return PlayerAgentAlphaBeta("Player "+str(index), index, color, depth=DEPTH,evalFn=resourceEvalFn)
+      return PlayerAgentAlphaBeta("Player "+str(index), index, color, depth=self.depth,evalFn=resourceEvalFn)
     elif playerCode == 10:
-      return PlayerAgentAlphaBeta("Player "+str(index), index, color, depth=DEPTH,evalFn=betterEvalFn)
+      return PlayerAgentAlphaBeta("Player "+str(index), index, color, depth=self.depth,evalFn=betterEvalFn)
     elif playerCode == 11:
-      return PlayerAgentExpectimax("Player "+str(index), index, color, depth=DEPTH,evalFn=betterEvalFn)
+      return PlayerAgentExpectimax("Player "+str(index), index, color, depth=self.depth,evalFn=betterEvalFn)
     elif playerCode == 12:
-      return PlayerAgentExpectiminimax("Player "+str(index), index, color, depth=DEPTH,evalFn=betterEvalFn)
+      return PlayerAgentExpectiminimax("Player "+str(index), index, color, depth=self.depth,evalFn=betterEvalFn)
+    elif playerCode == 13:
+      return PlayerAgentStar2("Player "+str(index), index, color, depth=self.depth)
+    elif playerCode == 14:
+      return PlayerAgentMCTS("Player "+str(index), index, color, seed=self.random.getrandbits(32))
+    elif playerCode == 15:
+      return PlayerAgentMCTS("Player "+str(index), index, color, heuristicRollouts=True, seed=self.random.getrandbits(32))
+    elif playerCode == 16:
+      # (Imported here so that only these players need numpy)
+      from linearEvaluation import loadLinearEvaluator
+      return PlayerAgentExpectimax("Player "+str(index), index, color, depth=self.depth, evalFn=loadLinearEvaluator())
+    elif playerCode == 17:
+      from linearEvaluation import loadLinearEvaluator
+      return PlayerAgentAlphaBeta("Player "+str(index), index, color, depth=self.depth, evalFn=loadLinearEvaluator())
 
   def initializePlayers(self):
     if (self.playerAgentNums == None):
@@ -277,6 +445,49 @@ class Game:
     for i in xrange(NUM_PLAYERS):
       self.gameState.playerAgents[i] = self.createPlayer(self.playerAgentNums[i], i)
 
+  def initializeSettlementsAndResources(self):
+    """
+    Method: initializeSettlementsAndResources
+    ----------------------
+    Parameters: NA
+    Returns: NA
+
+    Places the players' first settlements and roads, and gives them
+    their first resources, the way the game's initialPlacement says:
+      LUMBER_BRICK - two settlements next to lumber and brick, and two at random
+      RANDOM - NUM_INITIAL_SETTLEMENTS settlements at random
+      PRESET - the beginner board's suggested settlements
+      ALL_RESOURCES - next to lumber, brick, wool and grain
+      BEST_OPENINGS - the best pair of settlements left (see
+        initializeSettlementsAndResourcesBestOpenings)
+    ----------------------
+    """
+    {INITIAL_PLACEMENTS.LUMBER_BRICK: self.initializeSettlementsAndResourcesLumberBrick,
+      INITIAL_PLACEMENTS.RANDOM: self.initializeSettlementsAndResourcesRandom,
+      INITIAL_PLACEMENTS.PRESET: self.initializeSettlementsAndResourcesPreset,
+      INITIAL_PLACEMENTS.ALL_RESOURCES: self.initializeSettlementsAndResourcesForSettlements,
+      INITIAL_PLACEMENTS.BEST_OPENINGS: self.initializeSettlementsAndResourcesBestOpenings}[self.initialPlacement]()
+
+  def initializeSettlementsAndResourcesBestOpenings(self):
+    # --- START RESOURCE/SETTLEMENT OPENING INITIALIZATION --- #
+    # Each player in turn settles the best pair of vertices left, ranked by
+    # how much they are expected to produce (see Board.rankOpeningPairs),
+    # with a road from each
+    board = self.gameState.board
+    for agent in self.gameState.playerAgents:
+      value, settleOne, settleTwo = board.rankOpeningPairs()[0]
+      for settlement in (settleOne, settleTwo):
+        board.applyAction(agent.agentIndex, (ACTIONS.SETTLE, settlement))
+        agent.settlements.append(settlement)
+        road = board.getRandomRoad(settlement)
+        board.applyAction(agent.agentIndex, (ACTIONS.ROAD, road))
+        agent.roads.append(road)
+
+    # Each player starts with resources for each of their settlements
+    for agent in self.gameState.playerAgents:
+      agent.collectInitialResources(self.gameState.board)
+    # --- START RESOURCE/SETTLEMENT OPENING INITIALIZATION --- #
+
   def initializeSettlementsAndResourcesLumberBrick(self):
     # --- START RESOURCE/SETTLEMENT RANDOM INITIALIZATION --- #
     settlements = self.gameState.board.getRandomVerticesForSettlement()
@@ -388,15 +599,14 @@ class Game:
     VICTORY_POINTS_TO_WIN victory points.
     ----------------------
     """
+    eventSinks = self.eventSinks
+    if eventSinks is None:
+      eventSinks = [PrintEventSink()] if VERBOSE else []
     # Welcome message
-    if VERBOSE:
-      print "WELCOME TO SETTLERS OF CATAN!"
-      print "-----------------------------"
+    if eventSinks: self.logEvent(eventSinks, GameEvent(EVENTS.GAME_START, 0))
     # DEBUG = True if raw_input("DEBUG mode? (y/n) ") == "y" else False
     self.initializePlayers()
-    # self.initializeSettlementsAndResourcesPreset()
-    # self.initializeSettlementsAndResourcesRandom()
-    self.initializeSettlementsAndResourcesLumberBrick()
+    self.initializeSettlementsAndResources()
     # Turn tracking
     turnNumber = 1
     currentAgentIndex = 0
@@ -406,36 +616,27 @@ class Game:
       if GRAPHICS: self.drawGame()
       # Initial information
       currentAgent = self.gameState.playerAgents[currentAgentIndex]
-      if VERBOSE:
-        print "---------- TURN " + str(turnNumber) + " --------------"
-        print "It's " + str(currentAgent.name) + "'s turn!"
-
-      # Print player info
-      if VERBOSE:
-        print "PLAYER INFO:"
-        for a in self.gameState.playerAgents:
-          print a
+      if eventSinks: self.logEvent(eventSinks, GameEvent(EVENTS.TURN_START, turnNumber, currentAgentIndex))
 
       if GRAPHICS: raw_input("Press ENTER to proceed:")
       # Dice roll + resource distribution
       diceRoll = self.gameState.diceAgent.rollDice()
-      if VERBOSE: print "Rolled a " + str(diceRoll)
-      self.gameState.updatePlayerResourcesForDiceRoll(diceRoll)
+      gainedResources = self.gameState.updatePlayerResourcesForDiceRoll(diceRoll)
+      if eventSinks:
+        self.logEvent(eventSinks, GameEvent(EVENTS.DICE_ROLL, turnNumber, currentAgentIndex,
+          diceRoll = diceRoll, gainedResources = gainedResources))
       # The current player performs 1 action
+      moveStartTime = time.time()
       value, action = currentAgent.getAction(self.gameState)
-      if VERBOSE: 
-        print "Best Action: " + str(action)
-        print "Best Value: " + str(value)
+      moveTime = time.time() - moveStartTime
       currentAgent.applyAction(action, self.gameState.board)
       self.gameState.board.applyAction(currentAgent.agentIndex, action)
-      
-      if VERBOSE:# Print out the updated game state
-        if (action != None):
-          print str(currentAgent.name) + " took action " + str(action[0]) + " at " + str(action[1]) + "\n"
-        else:
-          print str(currentAgent.name) + " had no actions to take"
+      if eventSinks:
+        self.logEvent(eventSinks, GameEvent(EVENTS.ACTION, turnNumber, currentAgentIndex,
+          action = action, value = value, seconds = moveTime))
       # Track the game's move history
       self.moveHistory.append((currentAgent.name, action))
+      self.moveTimes.append(moveTime)
       # Go to the next player/turn
       currentAgentIndex = (currentAgentIndex+1) % self.gameState.getNumPlayerAgents()
       turnNumber += 1
@@ -444,11 +645,31 @@ class Game:
       if turnNumber > CUTOFF_TURNS: break
 
     winner = self.gameState.gameOver()
-    if winner < 0: return (winner, turnNumber, -1)
-    agentWinner = self.gameState.playerAgents[winner]
-    agentLoser = self.gameState.playerAgents[1-winner]
-    if VERBOSE: print agentWinner.name + " won the game"
-    return (winner, turnNumber, agentWinner.victoryPoints - agentLoser.victoryPoints)
+    victoryPointDiff = -1
+    if winner >= 0:
+      agentWinner = self.gameState.playerAgents[winner]
+      agentLoser = self.gameState.playerAgents[1-winner]
+      victoryPointDiff = agentWinner.victoryPoints - agentLoser.victoryPoints
+    if eventSinks:
+      self.logEvent(eventSinks, GameEvent(EVENTS.GAME_OVER, turnNumber, None,
+        winner = winner, victoryPointDiff = victoryPointDiff))
+    return (winner, turnNumber, victoryPointDiff)
+
+  def logEvent(self, eventSinks, event):
+    """
+    Method: logEvent
+    ----------------------
+    Parameters:
+      eventSinks - the (non-empty) list of the game's event sinks
+      event - a GameEvent that just happened
+    Returns: NA
+
+    Gives the event to each of the sinks.  Events are only made at all
+    when there are sinks to give them to.
+    ----------------------
+    """
+    for eventSink in eventSinks:
+      eventSink.handleEvent(event, self)
 
 def getStringForPlayer(playerCode):
   return ({
@@ -464,7 +685,12 @@ def getStringForPlayer(playerCode):
     9: "AlphaBeta Agent - with resource Heuristic",
     10: "AlphaBeta Agent - with better Heuristic",
     11: "Expectimax Agent - with better Heuristic",
-    12: "Expectiminimax Agent - with better Heuristic"
+    12: "Expectiminimax Agent - with better Heuristic",
+    13: "Star2 Agent - with default Heuristic",
+    14: "MCTS Agent - with random rollouts",
+    15: "MCTS Agent - with heuristic rollouts",
+    16: "Expectimax Agent - with linear Heuristic",
+    17: "AlphaBeta Agent - with linear Heuristic"
   }.get(playerCode, "Not a player."))
 
 def getPlayerAgentSpecifications():
@@ -484,6 +710,11 @@ def getPlayerAgentSpecifications():
     print "10: AlphaBeta Agent - with better Heuristic"
     print "11: Expectimax Agent - with better Heuristic"
     print "12: Expectiminimax Agent - with better Heuristic"
+    print "13: Star2 Agent - with default Heuristic"
+    print "14: MCTS Agent - with random rollouts"
+    print "15: MCTS Agent - with heuristic rollouts"
+    print "16: Expectimax Agent - with linear Heuristic"
+    print "17: AlphaBeta Agent - with linear Heuristic"
 
     firstPlayerAgent = int(raw_input("Which player type should the first player be: ").strip())
     secondPlayerAgent = int(raw_input("Which player type should the second player be: ").strip())
@@ -491,6 +722,7 @@ def getPlayerAgentSpecifications():
   else:
     return DEFAULT_PLAYER_ARRAY
 
+# (To play many games between agents, see tournament.py)
 # We now have 7 agents including the alpha beta agents
 # NUM_ITERATIONS = int(raw_input("Enter number of iterations: "));
 # DEPTH = int(raw_input("Enter depth of recursion for non-random agents: "));
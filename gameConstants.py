@@ -16,7 +16,7 @@ SETTLEMENT_VICTORY_POINTS = 1
 CITY_VICTORY_POINTS = SETTLEMENT_VICTORY_POINTS + 1
 
 NUM_INITIAL_SETTLEMENTS = 2
-TOTAL_NUM_AGENTS = 13
+TOTAL_NUM_AGENTS = 18
 CUTOFF_TURNS = 600
 
 VERBOSE = True
@@ -27,10 +27,105 @@ ACTIONS = Enum(["SETTLE", "CITY", "ROAD"])
 
 ResourceTypes = Enum(["BRICK", "WOOL", "ORE", "GRAIN", "LUMBER" ,"NOTHING"])
 
+# The resource types that tiles produce, in the order their counts are kept
+# in fixed-size lists of resource counts (like Board.getProduction returns)
+RESOURCE_ORDER = [ResourceTypes.BRICK, ResourceTypes.WOOL, ResourceTypes.ORE, ResourceTypes.GRAIN, ResourceTypes.LUMBER]
+RESOURCE_INDICES = dict((resourceType, i) for i, resourceType in enumerate(RESOURCE_ORDER))
+NUM_RESOURCES = len(RESOURCE_ORDER)
+# The highest possible roll of two dice
+MAX_DICE_ROLL = 12
+# The number of ways (out of DICE_ROLL_OUTCOMES) of rolling each total
+# (0 to MAX_DICE_ROLL) with two 6-sided dice, and the chance of rolling it
+DICE_ROLL_OUTCOMES = 36
+DICE_ROLL_WAYS = [max(0, 6 - abs(roll - 7)) for roll in xrange(MAX_DICE_ROLL + 1)]
+DICE_ROLL_PROBABILITIES = [ways / float(DICE_ROLL_OUTCOMES) for ways in DICE_ROLL_WAYS]
+
+class ResourceVector(object):
+  """
+  Class: ResourceVector
+  ---------------------------
+  A count of each resource type, kept as a fixed-size list of counts
+  (in RESOURCE_ORDER) so that it can be added, subtracted and compared
+  a whole vector at a time.  It can be read (and printed) like a
+  Counter from resource type to count: resources[ResourceTypes.ORE],
+  resources.items(), sum(resources.values()), ...
+  ---------------------------
+  """
+  __slots__ = ("counts",)
+
+  def __init__(self, resources = None):
+    self.counts = [0] * NUM_RESOURCES
+    if resources is not None:
+      for resourceType, count in resources.items():
+        self.counts[RESOURCE_INDICES[resourceType]] += count
+
+  def deepCopy(self):
+    """
+    Method: deepCopy
+    --------------------------
+    Parameters: NA
+    Returns: a deep copy of self
+    --------------------------
+    """
+    copy = ResourceVector()
+    copy.counts = self.counts[:]
+    return copy
+
+  def covers(self, other):
+    """
+    Method: covers
+    --------------------------
+    Parameters:
+      other: another ResourceVector, e.g. one of the costs below
+    Returns: whether there are at least as many of every
+      resource here as in other
+    --------------------------
+    """
+    for count, otherCount in zip(self.counts, other.counts):
+      if count < otherCount: return False
+    return True
+
+  def __getitem__(self, resourceType):
+    # Like a Counter, resource types that aren't counted (e.g. NOTHING) have 0
+    index = RESOURCE_INDICES.get(resourceType)
+    return 0 if index is None else self.counts[index]
+
+  def __setitem__(self, resourceType, count):
+    self.counts[RESOURCE_INDICES[resourceType]] = count
+
+  def __iter__(self):
+    return iter(RESOURCE_ORDER)
+
+  def __len__(self):
+    return NUM_RESOURCES
+
+  def __eq__(self, other):
+    return isinstance(other, ResourceVector) and self.counts == other.counts
+
+  def __ne__(self, other):
+    return not self == other
+
+  def keys(self):
+    return list(RESOURCE_ORDER)
+
+  def values(self):
+    return list(self.counts)
+
+  def items(self):
+    return zip(RESOURCE_ORDER, self.counts)
+
+  def iteritems(self):
+    return iter(self.items())
+
+  def __repr__(self):
+    # Printed like a Counter, most common first
+    items = sorted(self.items(), key = lambda item: -item[1])
+    return "ResourceVector({" + ", ".join("%r: %r" % item for item in items) + "})"
+
 # Resource costs of a Road, a Settlement, and a City
-ROAD_COST = Counter({ResourceTypes.BRICK: 1, ResourceTypes.LUMBER: 1})
-SETTLEMENT_COST = Counter({ResourceTypes.LUMBER: 1, ResourceTypes.BRICK: 1, ResourceTypes.WOOL: 1, ResourceTypes.GRAIN: 1})
-CITY_COST = Counter({ResourceTypes.GRAIN: 2, ResourceTypes.ORE: 3})
+ROAD_COST = ResourceVector({ResourceTypes.BRICK: 1, ResourceTypes.LUMBER: 1})
+SETTLEMENT_COST = ResourceVector({ResourceTypes.LUMBER: 1, ResourceTypes.BRICK: 1, ResourceTypes.WOOL: 1, ResourceTypes.GRAIN: 1})
+CITY_COST = ResourceVector({ResourceTypes.GRAIN: 2, ResourceTypes.ORE: 3})
 
 # A dictionary from resource type (enum, above) to string representation
 # so we can print out the resource type easily
@@ -39,8 +134,72 @@ NUM_PLAYERS = 2
 NUM_ITERATIONS = 4
 DEPTH = 3
 
+# Seconds a search agent may spend on each move, searching one level deeper
+# at a time up to DEPTH.  None always searches to DEPTH however long it takes.
+SEARCH_TIME_LIMIT = None
+
+# Number of worker processes a search agent spreads each move's search over
+# (1 searches in the agent's own process)
+SEARCH_PROCESSES = 1
+
 # Types of Agents
 AGENT = Enum(["PLAYER_AGENT", "DICE_AGENT"])
 
+# Kinds of events in a game, given to the game's event sinks (see gameEvents.py)
+EVENTS = Enum(["GAME_START", "TURN_START", "DICE_ROLL", "ACTION", "GAME_OVER"])
+
+# Kinds of values stored in a transposition table: an exact value, or a
+# lower/upper bound on the value (from an alpha-beta cutoff)
+BOUNDS = Enum(["EXACT", "LOWER", "UPPER"])
+
+# Default memory cap (in megabytes) of each search agent's transposition table
+TRANSPOSITION_TABLE_MB = 32
+
+# Default number of evaluation function values each search agent remembers,
+# by the Zobrist hash of the position evaluated (see PlayerAgent.evaluate).
+# 0 remembers none: hashing a position costs more than the evaluation
+# functions in agents.py, so remembering values only pays for costlier ones.
+EVAL_CACHE_ENTRIES = 0
+
+# The file of weights the linear evaluation function is loaded from by default
+# (see linearEvaluation.py), in the same directory as this file
+LINEAR_EVAL_WEIGHTS = "linearEvalWeights.txt"
+
+# Tuning the linear evaluation function's weights (see weightTuning.py): the
+# createPlayer codes of the players in the self-play games, and how strongly
+# the fits pull the weights (other than the bias) towards 0
+SELF_PLAY_PLAYERS = [17, 17]
+TUNING_L2 = 1.0
+
+# Move ordering for alpha-beta search: how early each type of action is tried
+# (highest first, after the transposition table's and the killer moves), and
+# how many killer moves are kept for each depth
+ACTION_ORDER_PRIORITY = {ACTIONS.CITY: 2, ACTIONS.SETTLE: 1, ACTIONS.ROAD: 0}
+NUM_KILLER_MOVES = 2
+
+# The lowest and highest values alpha-beta (and Star2) and Monte Carlo tree
+# search agents give a position: a loss and a win, with evaluation function
+# values limited to lie between them.  The pruning at dice rolls relies on
+# every value being within these bounds.
+EVAL_BOUNDS = (-1000, 1000)
+
+# Monte Carlo tree search: the number of playouts for each move (None plays
+# as many as fit in the agent's time limit), how many turns each rollout
+# plays before the evaluation function scores it, and the UCT exploration
+# constant (for values scaled to between 0 and 1)
+MCTS_PLAYOUTS = 1000
+MCTS_ROLLOUT_DEPTH = 8
+MCTS_EXPLORATION = 1.4
+
+# Ways of placing the players' first settlements and roads (see
+# Game.initializeSettlementsAndResources)
+INITIAL_PLACEMENTS = Enum(["LUMBER_BRICK", "RANDOM", "PRESET", "ALL_RESOURCES", "BEST_OPENINGS"])
+DEFAULT_INITIAL_PLACEMENT = INITIAL_PLACEMENTS.LUMBER_BRICK
+
+# Opening placement (see Board.rankOpeningPairs): how much each kind of
+# resource a pair of settlements produces adds to the pair's value, on top of
+# the number of resources they are expected to produce each turn (two dots)
+OPENING_RESOURCE_TYPE_VALUE = 2 / 36.0
+
 # Set debug mode on or off
 DEBUG = False
@@ -0,0 +1,104 @@
+from gameConstants import *
+
+
+class GameEvent(object):
+  """
+  Class: GameEvent
+  ---------------------------
+  Something that happened in a game (see Game.run), given to each of
+  the game's event sinks.  A sink is any object with a
+  handleEvent(event, game) method.
+  ---------------------------
+  Instance Variables:
+  eventType = the kind of event, one of EVENTS
+  turnNumber = the turn it happened in (0 before the first turn)
+  playerIndex = the index of the player whose turn it is (None for none)
+  details = a dictionary of the event's details, by type:
+    GAME_START - none
+    TURN_START - none
+    DICE_ROLL - "diceRoll": the roll, "gainedResources": the resources
+      each player received for it
+    ACTION - "action": the action taken (None for a pass), "value": its value
+      to the player, "seconds": how long the player took to choose it
+    GAME_OVER - "winner": the index of the winner (-1 if the game was cut off),
+      "victoryPointDiff": the winner's victory points minus the loser's
+  ---------------------------
+  """
+  __slots__ = ("eventType", "turnNumber", "playerIndex", "details")
+
+  def __init__(self, eventType, turnNumber, playerIndex = None, **details):
+    self.eventType = eventType
+    self.turnNumber = turnNumber
+    self.playerIndex = playerIndex
+    self.details = details
+
+  def __repr__(self):
+    return "GameEvent(" + str(self.eventType) + ", turn " + str(self.turnNumber) + ", player " + \
+      str(self.playerIndex) + ", " + str(self.details) + ")"
+
+
+class PrintEventSink(object):
+  """
+  Class: PrintEventSink
+  ---------------------------
+  Prints a running commentary of a game, with the players' pieces and
+  resources each turn (Game's sink when VERBOSE is set).
+  ---------------------------
+  """
+
+  def handleEvent(self, event, game):
+    """
+    Method: handleEvent
+    ---------------------------
+    Parameters:
+      event - the GameEvent that happened
+      game - the Game it happened in
+    Returns: NA
+    ---------------------------
+    """
+    playerAgents = game.gameState.playerAgents
+    if event.eventType == EVENTS.GAME_START:
+      print "WELCOME TO SETTLERS OF CATAN!"
+      print "-----------------------------"
+    elif event.eventType == EVENTS.TURN_START:
+      print "---------- TURN " + str(event.turnNumber) + " --------------"
+      print "It's " + str(playerAgents[event.playerIndex].name) + "'s turn!"
+      print "PLAYER INFO:"
+      for agent in playerAgents:
+        print agent
+    elif event.eventType == EVENTS.DICE_ROLL:
+      print "Rolled a " + str(event.details["diceRoll"])
+      if DEBUG:
+        for agent, gainedResources in zip(playerAgents, event.details["gainedResources"]):
+          print str(agent.name) + " received: " + str(gainedResources)
+          print str(agent.name) + " now has: " + str(agent.resources)
+    elif event.eventType == EVENTS.ACTION:
+      action = event.details["action"]
+      agent = playerAgents[event.playerIndex]
+      print "Best Action: " + str(action)
+      print "Best Value: " + str(event.details["value"])
+      if (action != None):
+        print str(agent.name) + " took action " + str(action[0]) + " at " + str(action[1]) + "\n"
+      else:
+        print str(agent.name) + " had no actions to take"
+    elif event.eventType == EVENTS.GAME_OVER:
+      if event.details["winner"] >= 0:
+        print playerAgents[event.details["winner"]].name + " won the game"
+
+
+class RecordingEventSink(object):
+  """
+  Class: RecordingEventSink
+  ---------------------------
+  Keeps every GameEvent of a game, in order, for looking at afterwards.
+  ---------------------------
+  Instance Variables:
+  events = the list of GameEvents so far
+  ---------------------------
+  """
+
+  def __init__(self):
+    self.events = []
+
+  def handleEvent(self, event, game):
+    self.events.append(event)
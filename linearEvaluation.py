@@ -0,0 +1,231 @@
+import os
+import numpy as np
+from gameConstants import *
+
+# The features of a position that a LinearEvaluator weighs, in the order
+# getFeatures lists them
+FEATURE_NAMES = (["bias", "settlements", "cities", "roads", "victoryPoints", "resourceTouches"] +
+  [resource.lower() + "Production" for resource in RESOURCE_ORDER] +
+  [resource.lower() + "InHand" for resource in RESOURCE_ORDER] +
+  ["roadShortfall", "settlementShortfall", "cityShortfall"] +
+  ["opponentSettlements", "opponentCities", "opponentRoads", "opponentVictoryPoints", "opponentProduction",
+    "opponentResources"])
+FEATURE_INDICES = dict((name, i) for i, name in enumerate(FEATURE_NAMES))
+NUM_FEATURES = len(FEATURE_NAMES)
+
+# The costs the shortfall features are measured against, in FEATURE_NAMES order
+SHORTFALL_COSTS = [ROAD_COST, SETTLEMENT_COST, CITY_COST]
+SHORTFALL_COST_ARRAY = np.array([cost.counts for cost in SHORTFALL_COSTS])
+
+# The columns of the features that a dice roll changes (see getRollFeatures)
+IN_HAND_COLUMNS = slice(FEATURE_INDICES["brickInHand"], FEATURE_INDICES["brickInHand"] + NUM_RESOURCES)
+SHORTFALL_COLUMNS = slice(FEATURE_INDICES["roadShortfall"], FEATURE_INDICES["roadShortfall"] + len(SHORTFALL_COSTS))
+OPPONENT_RESOURCES_COLUMN = FEATURE_INDICES["opponentResources"]
+
+def getFeatures(state, playerIndex):
+  """
+  Function: getFeatures
+  ---------------------------
+  Parameters:
+    state - a GameState
+    playerIndex - the index of the player to describe the position for
+  Returns: a list of the position's features for the given player, in
+    FEATURE_NAMES order:
+    bias - always 1
+    settlements, cities, roads - how many of each piece the player has
+    victoryPoints - the player's victory points
+    resourceTouches - the number of hexagons the player's settlements touch
+    ...Production - how many of each resource (in RESOURCE_ORDER) the
+      player's buildings produce on an average turn
+    ...InHand - how many of each resource the player has
+    ...Shortfall - how many more resources the player needs to be able
+      to build a road, a settlement or a city
+    opponent... - the same pieces and victory points summed over the
+      other players, with their total expected production and resources
+
+  Everything here is kept up to date as moves are made (see BoardState),
+  so this takes the same time however far into the game it is.
+  ---------------------------
+  """
+  board = state.board
+  player = state.playerAgents[playerIndex]
+  counts = player.resources.counts
+  features = [1, len(player.settlements), len(player.cities), len(player.roads), player.victoryPoints,
+    board.getResourceTouches(playerIndex)]
+  features += board.getExpectedProduction(playerIndex)
+  features += counts
+  for cost in SHORTFALL_COSTS:
+    shortfall = 0
+    for needed, count in zip(cost.counts, counts):
+      if needed > count: shortfall += needed - count
+    features.append(shortfall)
+
+  settlements = cities = roads = victoryPoints = production = resources = 0
+  for opponent in state.playerAgents:
+    if opponent.agentIndex == playerIndex: continue
+    settlements += len(opponent.settlements)
+    cities += len(opponent.cities)
+    roads += len(opponent.roads)
+    victoryPoints += opponent.victoryPoints
+    production += sum(board.getExpectedProduction(opponent.agentIndex))
+    resources += sum(opponent.resources.counts)
+  features += [settlements, cities, roads, victoryPoints, production, resources]
+  return features
+
+def getRollFeatures(state, playerIndex, rolls):
+  """
+  Function: getRollFeatures
+  ---------------------------
+  Parameters:
+    state - a GameState
+    playerIndex - the index of the player to describe the positions for
+    rolls - some dice totals
+  Returns: a 2D NumPy array with a row for each roll, of the features
+    (see getFeatures) of the position after the resources for that roll
+    are handed out
+
+  A roll only changes the players' resources, so the features of the
+  position now are found once, and the changes each roll makes to them
+  are worked out for all of the rolls together.
+  ---------------------------
+  """
+  board = state.board
+  rows = np.tile(np.array(getFeatures(state, playerIndex), dtype = np.float64), (len(rolls), 1))
+  # For each roll, each player and each resource, how many they would get
+  gained = np.array([[board.getProduction(agent.agentIndex, roll) for agent in state.playerAgents] for roll in rolls])
+  hand = rows[:, IN_HAND_COLUMNS] + gained[:, playerIndex]
+  rows[:, IN_HAND_COLUMNS] = hand
+  rows[:, SHORTFALL_COLUMNS] = np.maximum(SHORTFALL_COST_ARRAY[np.newaxis] - hand[:, np.newaxis], 0).sum(axis = 2)
+  rows[:, OPPONENT_RESOURCES_COLUMN] += gained.sum(axis = (1, 2)) - gained[:, playerIndex].sum(axis = 1)
+  return rows
+
+
+class LinearEvaluator(object):
+  """
+  Class: LinearEvaluator
+  ---------------------------
+  An evaluation function that values a position as a weighted sum of
+  its features (see getFeatures).  It is called like the evaluation
+  functions in agents.py, with a GameState and a player index, and its
+  weights come from a file (see loadLinearEvaluator).
+
+  It can also score many positions at once from their features, with
+  one NumPy dot product (see scoreFeatures).  Searches use this to
+  score all the children of a node together (see
+  PlayerAgent.evaluateChildren), with the features of the positions
+  after each dice roll found by getRollFeatures.
+  ---------------------------
+  Instance Variables:
+  weights = the weight of each feature, in FEATURE_NAMES order
+  weightVector = the same weights, as a NumPy array
+  ---------------------------
+  """
+  __slots__ = ("weights", "weightVector")
+
+  def __init__(self, weights):
+    """
+    Method: __init__
+    ---------------------------
+    Parameters:
+      weights - a dictionary of the weight of each feature, by name
+        (features that aren't in it have no weight)
+    ---------------------------
+    """
+    for name in weights:
+      if name not in FEATURE_INDICES:
+        raise Exception("Unknown evaluation feature: " + str(name))
+    self.weights = [float(weights.get(name, 0)) for name in FEATURE_NAMES]
+    self.weightVector = np.array(self.weights)
+
+  def __call__(self, state, playerIndex):
+    return sum(weight * feature for weight, feature in zip(self.weights, getFeatures(state, playerIndex)))
+
+  def getRollFeatures(self, state, playerIndex, rolls):
+    """
+    Method: getRollFeatures
+    ---------------------------
+    Parameters:
+      state - a GameState
+      playerIndex - the index of the player to describe the positions for
+      rolls - some dice totals
+    Returns: the features of the position after each roll (see the
+      getRollFeatures function)
+    ---------------------------
+    """
+    return getRollFeatures(state, playerIndex, rolls)
+
+  def scoreFeatures(self, featureBlocks):
+    """
+    Method: scoreFeatures
+    ---------------------------
+    Parameters:
+      featureBlocks - a list of 2D NumPy arrays of the features of some
+        positions, one row per position (like getRollFeatures returns)
+    Returns: a NumPy array of the value of each position, in order
+    ---------------------------
+    """
+    return np.dot(np.vstack(featureBlocks), self.weightVector)
+
+  def getWeightDict(self):
+    """
+    Method: getWeightDict
+    ---------------------------
+    Parameters: NA
+    Returns: a dictionary of the weight of each feature, by name
+    ---------------------------
+    """
+    return dict(zip(FEATURE_NAMES, self.weights))
+
+  def save(self, path, comment = None):
+    """
+    Method: save
+    ---------------------------
+    Parameters:
+      path - the file to write the weights to
+      comment - a line to put at the top of the file (None for none)
+    Returns: NA
+
+    Writes the weights in the format loadLinearEvaluator reads: one
+    "feature weight" line per feature, with # starting a comment.
+    ---------------------------
+    """
+    with open(path, "w") as weightsFile:
+      if comment is not None:
+        weightsFile.write("# " + comment + "\n")
+      for name, weight in zip(FEATURE_NAMES, self.weights):
+        weightsFile.write(name + " " + repr(weight) + "\n")
+
+
+def getDefaultWeightsPath():
+  """
+  Function: getDefaultWeightsPath
+  ---------------------------
+  Parameters: NA
+  Returns: the path of the LINEAR_EVAL_WEIGHTS file (which is in the
+    same directory as this file)
+  ---------------------------
+  """
+  return os.path.join(os.path.dirname(os.path.abspath(__file__)), LINEAR_EVAL_WEIGHTS)
+
+def loadLinearEvaluator(path = None):
+  """
+  Function: loadLinearEvaluator
+  ---------------------------
+  Parameters:
+    path - a file of weights written by LinearEvaluator.save (None for
+      the LINEAR_EVAL_WEIGHTS file)
+  Returns: a LinearEvaluator with the weights in the file
+  ---------------------------
+  """
+  if path is None:
+    path = getDefaultWeightsPath()
+  weights = {}
+  with open(path) as weightsFile:
+    for line in weightsFile:
+      line = line.split("#")[0].strip()
+      if len(line) == 0: continue
+      fields = line.split()
+      if len(fields) != 2:
+        raise Exception("Bad line in evaluation weights file " + path + ": " + line)
+      weights[fields[0]] = float(fields[1])
+  return LinearEvaluator(weights)
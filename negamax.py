@@ -21,6 +21,10 @@ class Settlers(TwoPlayersGame):
   def make_move(self, action):
     self.game.gameState.makeMove(self.nplayer-1, action)
 
+  def unmake_move(self, action):
+    # Lets easyAI undo moves instead of deep-copying the game each ply
+    self.game.gameState.undoMove()
+
   def is_over(self):
     """
     Method: is_over()
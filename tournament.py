@@ -0,0 +1,211 @@
+import argparse
+import itertools
+import multiprocessing
+import time
+from game import Game, getStringForPlayer
+from gameConstants import *
+
+
+class PairingStats(object):
+  """
+  Class: PairingStats
+  ---------------------------
+  The results of the games played between two kinds of player (two
+  createPlayer codes) in a tournament, from the point of view of each
+  side of the pairing (whichever seat it played from).
+  ---------------------------
+  Instance Variables:
+  playerCodes = the (codeA, codeB) player codes of the two sides
+  numGames = the number of games played
+  numUnfinished = the number of games cut off after CUTOFF_TURNS turns
+  wins = the number of games each side won
+  victoryPointDiffs = the total of each side's victory points minus the other side's
+  totalTurns = the total number of turns in the finished games
+  moveSeconds = the total seconds each side spent choosing its moves
+  numMoves = the number of moves each side made
+  ---------------------------
+  """
+  __slots__ = ("playerCodes", "numGames", "numUnfinished", "wins", "victoryPointDiffs", "totalTurns",
+    "moveSeconds", "numMoves")
+
+  def __init__(self, playerCodes):
+    self.playerCodes = playerCodes
+    self.numGames = 0
+    self.numUnfinished = 0
+    self.wins = [0, 0]
+    self.victoryPointDiffs = [0, 0]
+    self.totalTurns = 0
+    self.moveSeconds = [0.0, 0.0]
+    self.numMoves = [0, 0]
+
+  def addGame(self, result):
+    """
+    Method: addGame
+    ---------------------------
+    Parameters:
+      result - the result of playTournamentGame for a game between these two sides
+    Returns: NA
+
+    Adds the game to the totals.
+    ---------------------------
+    """
+    seatedCodes, seed, winner, victoryPoints, turns, moveSeconds, numMoves = result
+    # The seat each side played from
+    seats = [0, 1] if seatedCodes == self.playerCodes else [1, 0]
+    self.numGames += 1
+    if winner < 0:
+      self.numUnfinished += 1
+    else:
+      self.wins[seats.index(winner)] += 1
+      self.totalTurns += turns
+    for side, seat in enumerate(seats):
+      self.victoryPointDiffs[side] += victoryPoints[seat] - victoryPoints[1 - seat]
+      self.moveSeconds[side] += moveSeconds[seat]
+      self.numMoves[side] += numMoves[seat]
+
+  def __str__(self):
+    lines = [str(self.playerCodes[0]) + " vs " + str(self.playerCodes[1]) + ": " + str(self.numGames) +
+      " games (" + str(self.numUnfinished) + " unfinished)"]
+    for side, playerCode in enumerate(self.playerCodes):
+      lines.append("  " + str(playerCode) + " (" + getStringForPlayer(playerCode) + ") won " + str(self.wins[side]) +
+        " (%.1f%%)" % (100.0 * self.wins[side] / max(self.numGames, 1)) +
+        ", %+.2f victory points per game" % (self.victoryPointDiffs[side] / float(max(self.numGames, 1))) +
+        ", %.3f seconds per move" % (self.moveSeconds[side] / max(self.numMoves[side], 1)))
+    numFinished = self.numGames - self.numUnfinished
+    lines.append("  %.1f turns per finished game" % (self.totalTurns / float(max(numFinished, 1))))
+    return "\n".join(lines)
+
+
+def playTournamentGame(task):
+  """
+  Function: playTournamentGame
+  ---------------------------
+  Parameters:
+    task - a (player codes, seed, depth) tuple: the createPlayer code of each
+      seat, the game's seed, and the depth of the search agents (None for DEPTH)
+  Returns: a (player codes, seed, winner, victory points, turns, move seconds,
+    moves) tuple for the game, where the winner is a seat (or -1 if the game
+    was cut off), and the victory points, seconds spent choosing moves and
+    number of moves are listed by seat
+
+  Plays the game without describing it at all (with no event sinks).
+  Runs in a worker process of runTournament, so the players' searches
+  all run in that process.
+  ---------------------------
+  """
+  playerCodes, seed, depth = task
+  game = Game(playerAgentNums = list(playerCodes), seed = seed, eventSinks = [], depth = depth)
+  winner, turns, victoryPointDiff = game.run()
+
+  numPlayers = game.gameState.getNumPlayerAgents()
+  victoryPoints = [agent.victoryPoints for agent in game.gameState.playerAgents]
+  # Players move in turn, starting with seat 0
+  moveSeconds = [sum(game.moveTimes[seat::numPlayers]) for seat in xrange(numPlayers)]
+  numMoves = [len(game.moveTimes[seat::numPlayers]) for seat in xrange(numPlayers)]
+  return (playerCodes, seed, winner, victoryPoints, turns, moveSeconds, numMoves)
+
+def getPairings(playerCodes):
+  """
+  Function: getPairings
+  ---------------------------
+  Parameters:
+    playerCodes - the createPlayer codes of the players in a tournament
+  Returns: a list of the different (codeA, codeB) pairings of the players,
+    in order (a code given twice is paired with itself)
+  ---------------------------
+  """
+  pairings = []
+  for pairing in itertools.combinations(playerCodes, 2):
+    if pairing not in pairings and pairing[::-1] not in pairings:
+      pairings.append(pairing)
+  return pairings
+
+def getTournamentTasks(playerCodes, numGames, seed = 0, depth = None):
+  """
+  Function: getTournamentTasks
+  ---------------------------
+  Parameters:
+    playerCodes - the createPlayer codes of the players in the tournament
+    numGames - the number of games to play for each pairing of them
+    seed - the seed of the first game of each pairing
+    depth - the depth of the search agents (None for DEPTH)
+  Returns: a list of the playTournamentGame tasks for the tournament
+
+  Each seed is played twice, once from each seat, and every pairing
+  plays the same seeds, so that luck evens out as much as it can.
+  ---------------------------
+  """
+  tasks = []
+  for pairing in getPairings(playerCodes):
+    for i in xrange(numGames):
+      seatedCodes = pairing if i % 2 == 0 else pairing[::-1]
+      tasks.append((seatedCodes, seed + i // 2, depth))
+  return tasks
+
+def runTournament(playerCodes, numGames, numProcesses = None, seed = 0, depth = None, verbose = False):
+  """
+  Function: runTournament
+  ---------------------------
+  Parameters:
+    playerCodes - the createPlayer codes of the players in the tournament
+    numGames - the number of games to play for each pairing of them
+    numProcesses - the number of games to play at once, in worker
+      processes (None for one per CPU, 1 to play them in this process)
+    seed - the seed of the first game of each pairing (see getTournamentTasks)
+    depth - the depth of the search agents (None for DEPTH)
+    verbose - whether to print a line as each game finishes
+  Returns: a PairingStats for each pairing of the players, in order
+
+  The search agents must search in their own process (SEARCH_PROCESSES = 1)
+  unless the games are played in this process, since worker processes
+  can't start processes of their own.
+  ---------------------------
+  """
+  if numProcesses != 1 and SEARCH_PROCESSES > 1:
+    raise Exception("Games played in worker processes can't spread their searches over more processes "
+      "(set SEARCH_PROCESSES to 1, or play the games in this process)")
+  tasks = getTournamentTasks(playerCodes, numGames, seed, depth)
+  stats = [PairingStats(pairing) for pairing in getPairings(playerCodes)]
+  statsByPairing = dict((pairingStats.playerCodes, pairingStats) for pairingStats in stats)
+
+  pool = None
+  if numProcesses == 1:
+    results = itertools.imap(playTournamentGame, tasks)
+  else:
+    pool = multiprocessing.Pool(numProcesses)
+    results = pool.imap_unordered(playTournamentGame, tasks)
+  try:
+    for i, result in enumerate(results):
+      seatedCodes, gameSeed, winner, victoryPoints, turns, moveSeconds, numMoves = result
+      pairing = seatedCodes if seatedCodes in statsByPairing else seatedCodes[::-1]
+      statsByPairing[pairing].addGame(result)
+      if verbose:
+        outcome = "Player " + str(winner) + " won" if winner >= 0 else "unfinished"
+        print "Game " + str(i + 1) + "/" + str(len(tasks)) + ": " + str(seatedCodes[0]) + " vs " + \
+          str(seatedCodes[1]) + ", seed " + str(gameSeed) + ": " + outcome + " after " + str(turns) + \
+          " turns, victory points " + str(victoryPoints)
+  finally:
+    if pool is not None:
+      pool.terminate()
+      pool.join()
+  return stats
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description = "Plays games between every pairing of the given players "
+    "(createPlayer codes, see getStringForPlayer in game.py) without graphics or printing, and sums up the results.")
+  parser.add_argument("playerCodes", type = int, nargs = "+", help = "the codes of the players")
+  parser.add_argument("-n", "--games", type = int, default = NUM_ITERATIONS, help = "the number of games for each pairing")
+  parser.add_argument("-p", "--processes", type = int, default = None, help = "the number of games to play at once (default: one per CPU)")
+  parser.add_argument("-s", "--seed", type = int, default = 0, help = "the seed of the first game of each pairing")
+  parser.add_argument("-d", "--depth", type = int, default = None, help = "the depth of the search agents (default: DEPTH)")
+  args = parser.parse_args()
+  if len(args.playerCodes) < 2:
+    parser.error("at least two players are needed")
+
+  startTime = time.time()
+  stats = runTournament(args.playerCodes, args.games, args.processes, args.seed, args.depth, verbose = True)
+  print "============="
+  for pairingStats in stats:
+    print pairingStats
+  print "Total elapsed time: %.1f seconds" % (time.time() - startTime)
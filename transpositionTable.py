@@ -0,0 +1,130 @@
+from gameConstants import *
+
+# Rough number of bytes one stored entry takes up (the entry object, its
+# 64-bit key and its float value), used to turn a memory cap into a table size
+ENTRY_BYTES = 160
+
+class TranspositionEntry(object):
+  """
+  Class: TranspositionEntry
+  ---------------------------
+  A single search result stored in a TranspositionTable: the value
+  of a position, the depth it was searched to, whether the value is
+  exact or a bound (one of BOUNDS), the best action found there, and
+  the search generation that stored it.
+  ---------------------------
+  """
+  __slots__ = ("zobristHash", "value", "depth", "bound", "bestAction", "generation")
+
+  def __init__(self, zobristHash, value, depth, bound, bestAction, generation):
+    self.zobristHash = zobristHash
+    self.value = value
+    self.depth = depth
+    self.bound = bound
+    self.bestAction = bestAction
+    self.generation = generation
+
+
+class TranspositionTable:
+  """
+  Class: TranspositionTable
+  ---------------------------
+  A fixed-size hash table of search results keyed by a position's
+  Zobrist hash (see GameState.getZobristHash), so that a search can
+  reuse the result for a position it reaches by a different order of
+  moves, or that it searched on an earlier turn.
+
+  Each bucket has two slots.  The depth-preferred slot keeps the most
+  deeply searched entry (an entry left over from an earlier search
+  can always be replaced), and the always-replace slot takes every
+  entry that doesn't make it into the depth-preferred slot.  The number
+  of buckets is fixed by the memory cap, so the table never grows.
+  ---------------------------
+  """
+
+  def __init__(self, sizeMB = TRANSPOSITION_TABLE_MB):
+    self.numBuckets = max(1, int(sizeMB * 1024 * 1024) / (2 * ENTRY_BYTES))
+    self.depthPreferred = [None] * self.numBuckets
+    self.alwaysReplace = [None] * self.numBuckets
+    self.generation = 0
+
+    # Statistics
+    self.lookups = 0
+    self.hits = 0
+    self.stores = 0
+
+  def newSearch(self):
+    """
+    Method: newSearch
+    ---------------------------
+    Parameters: NA
+    Returns: NA
+
+    Marks the start of a new search.  Entries stored by earlier
+    searches can still be looked up, but no longer take priority
+    over new entries in the depth-preferred slots.
+    ---------------------------
+    """
+    self.generation += 1
+
+  def lookup(self, zobristHash):
+    """
+    Method: lookup
+    ---------------------------
+    Parameters:
+      zobristHash - the Zobrist hash of the position to look up
+    Returns: the TranspositionEntry stored for this position, or None
+    ---------------------------
+    """
+    self.lookups += 1
+    bucket = zobristHash % self.numBuckets
+    entry = self.depthPreferred[bucket]
+    if entry is None or entry.zobristHash != zobristHash:
+      entry = self.alwaysReplace[bucket]
+      if entry is None or entry.zobristHash != zobristHash:
+        return None
+    self.hits += 1
+    return entry
+
+  def store(self, zobristHash, value, depth, bound, bestAction):
+    """
+    Method: store
+    ---------------------------
+    Parameters:
+      zobristHash - the Zobrist hash of the searched position
+      value - the value the search found for the position
+      depth - the depth the position was searched to
+      bound - whether value is exact or a bound (one of BOUNDS)
+      bestAction - the best action found in this position
+    Returns: NA
+
+    Stores a search result, replacing an older entry in the same
+    bucket if there is one (see the class description).
+    ---------------------------
+    """
+    self.stores += 1
+    bucket = zobristHash % self.numBuckets
+    newEntry = TranspositionEntry(zobristHash, value, depth, bound, bestAction, self.generation)
+    entry = self.depthPreferred[bucket]
+    if (entry is None or entry.zobristHash == zobristHash
+      or entry.generation != self.generation or depth >= entry.depth):
+      self.depthPreferred[bucket] = newEntry
+      # Don't keep a stale copy of the same position in the other slot
+      otherEntry = self.alwaysReplace[bucket]
+      if otherEntry is not None and otherEntry.zobristHash == zobristHash:
+        self.alwaysReplace[bucket] = None
+    else:
+      self.alwaysReplace[bucket] = newEntry
+
+  def clear(self):
+    """
+    Method: clear
+    ---------------------------
+    Parameters: NA
+    Returns: NA
+
+    Removes all entries from the table.
+    ---------------------------
+    """
+    self.depthPreferred = [None] * self.numBuckets
+    self.alwaysReplace = [None] * self.numBuckets
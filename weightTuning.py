@@ -0,0 +1,311 @@
+import argparse
+import itertools
+import multiprocessing
+import time
+import numpy as np
+from game import Game
+from gameConstants import *
+from linearEvaluation import FEATURE_NAMES, NUM_FEATURES, LinearEvaluator, getFeatures, getDefaultWeightsPath
+
+# The outcome recorded for a sample from a game that was cut off
+UNFINISHED_OUTCOME = -1
+
+
+class FeatureRecordingEventSink(object):
+  """
+  Class: FeatureRecordingEventSink
+  ---------------------------
+  An event sink (see gameEvents.py) that records the features (see
+  linearEvaluation.getFeatures) of each position a game reaches after
+  an action, from every player's point of view, to learn evaluation
+  weights from.
+  ---------------------------
+  Instance Variables:
+  features = a list of the feature rows recorded
+  playerIndices = for each row, the index of the player it describes the position for
+  turnNumbers = for each row, the turn it was recorded in
+  winner = the index of the winner once the game is over (-1 if it was
+    cut off, None until it is over)
+  ---------------------------
+  """
+
+  def __init__(self):
+    self.features = []
+    self.playerIndices = []
+    self.turnNumbers = []
+    self.winner = None
+
+  def handleEvent(self, event, game):
+    if event.eventType == EVENTS.ACTION:
+      for playerIndex in xrange(game.gameState.getNumPlayerAgents()):
+        self.features.append(getFeatures(game.gameState, playerIndex))
+        self.playerIndices.append(playerIndex)
+        self.turnNumbers.append(event.turnNumber)
+    elif event.eventType == EVENTS.GAME_OVER:
+      self.winner = event.details["winner"]
+
+
+def playSelfPlayGame(task):
+  """
+  Function: playSelfPlayGame
+  ---------------------------
+  Parameters:
+    task - a (player codes, seed, depth) tuple: the createPlayer code of each
+      seat, the game's seed, and the depth of the search agents (None for DEPTH)
+  Returns: a (seed, features, player indices, turn numbers, winner) tuple of
+    the game's seed, the samples a FeatureRecordingEventSink recorded in it
+    (as NumPy arrays), and its winner (-1 if it was cut off)
+
+  Runs in a worker process of generateSamples, like playTournamentGame.
+  ---------------------------
+  """
+  playerCodes, seed, depth = task
+  recorder = FeatureRecordingEventSink()
+  game = Game(playerAgentNums = list(playerCodes), seed = seed, eventSinks = [recorder], depth = depth)
+  game.run()
+  features = np.array(recorder.features, dtype = np.float32).reshape(-1, NUM_FEATURES)
+  return (seed, features, np.array(recorder.playerIndices, dtype = np.int8),
+    np.array(recorder.turnNumbers, dtype = np.int16), recorder.winner)
+
+def generateSamples(path, numGames, playerCodes = SELF_PLAY_PLAYERS, numProcesses = None, seed = 0, depth = None,
+  verbose = False):
+  """
+  Function: generateSamples
+  ---------------------------
+  Parameters:
+    path - the .npz file to save the samples to
+    numGames - the number of games to play
+    playerCodes - the createPlayer code of each seat (they swap seats every game)
+    numProcesses - the number of games to play at once, in worker
+      processes (None for one per CPU, 1 to play them in this process)
+    seed - the seed of the first game (the others follow on from it)
+    depth - the depth of the search agents (None for DEPTH)
+    verbose - whether to print a line as each game finishes
+  Returns: the number of samples saved
+
+  Plays the games without describing them, and saves a sample for each
+  player after every action in them: the features of the position for
+  that player and how the game turned out for them.  The samples are
+  saved column by column (see saveSamples).  As in runTournament, the
+  search agents can only spread their searches over more processes
+  (SEARCH_PROCESSES > 1) when the games are played in this process.
+  ---------------------------
+  """
+  if numProcesses != 1 and SEARCH_PROCESSES > 1:
+    raise Exception("Games played in worker processes can't spread their searches over more processes "
+      "(set SEARCH_PROCESSES to 1, or play the games in this process)")
+  tasks = []
+  for i in xrange(numGames):
+    seatedCodes = tuple(playerCodes) if i % 2 == 0 else tuple(playerCodes[::-1])
+    tasks.append((seatedCodes, seed + i, depth))
+
+  pool = None
+  if numProcesses == 1:
+    results = itertools.imap(playSelfPlayGame, tasks)
+  else:
+    pool = multiprocessing.Pool(numProcesses)
+    results = pool.imap_unordered(playSelfPlayGame, tasks)
+  columns = {"features": [], "playerIndices": [], "turnNumbers": [], "gameIds": [], "outcomes": []}
+  try:
+    for i, (gameSeed, features, playerIndices, turnNumbers, winner) in enumerate(results):
+      columns["features"].append(features)
+      columns["playerIndices"].append(playerIndices)
+      columns["turnNumbers"].append(turnNumbers)
+      columns["gameIds"].append(np.full(len(features), gameSeed, dtype = np.int32))
+      if winner < 0:
+        outcomes = np.full(len(features), UNFINISHED_OUTCOME, dtype = np.int8)
+      else:
+        outcomes = (playerIndices == winner).astype(np.int8)
+      columns["outcomes"].append(outcomes)
+      if verbose:
+        outcome = "Player " + str(winner) + " won" if winner >= 0 else "unfinished"
+        print "Game " + str(i + 1) + "/" + str(numGames) + ", seed " + str(gameSeed) + ": " + outcome + ", " + \
+          str(len(features)) + " samples"
+  finally:
+    if pool is not None:
+      pool.terminate()
+      pool.join()
+
+  samples = dict((name, np.concatenate(arrays)) for name, arrays in columns.items())
+  saveSamples(path, samples)
+  return len(samples["outcomes"])
+
+def saveSamples(path, samples):
+  """
+  Function: saveSamples
+  ---------------------------
+  Parameters:
+    path - the .npz file to save the samples to
+    samples - a dictionary of the samples' columns, by name: features (a
+      row per sample, in FEATURE_NAMES order), playerIndices, turnNumbers,
+      gameIds (the seed of each sample's game) and outcomes (1 if the
+      sample's player won, 0 if they lost, UNFINISHED_OUTCOME if the game
+      was cut off)
+  Returns: NA
+
+  Each column is stored as its own compressed NumPy array, along with
+  the names of the features, so that loadSamples can check that the
+  features are the ones getFeatures finds now.
+  ---------------------------
+  """
+  np.savez_compressed(path, featureNames = np.array(FEATURE_NAMES), **samples)
+
+def loadSamples(paths):
+  """
+  Function: loadSamples
+  ---------------------------
+  Parameters:
+    paths - a list of .npz files saved by saveSamples
+  Returns: a dictionary of the columns of all of the samples in the
+    files together, by name (see saveSamples)
+  ---------------------------
+  """
+  columns = {}
+  for path in paths:
+    with np.load(path) as data:
+      if list(data["featureNames"]) != FEATURE_NAMES:
+        raise Exception("The samples in " + path + " have different features from the evaluation function's")
+      for name in data.files:
+        if name != "featureNames":
+          columns.setdefault(name, []).append(data[name])
+  return dict((name, np.concatenate(arrays)) for name, arrays in columns.items())
+
+
+def getPenalties(l2):
+  """
+  Function: getPenalties
+  ---------------------------
+  Parameters:
+    l2 - how strongly to pull the weights towards 0
+  Returns: a NumPy array of the penalty on each weight, in FEATURE_NAMES
+    order (the bias isn't pulled towards 0)
+  ---------------------------
+  """
+  penalties = np.full(NUM_FEATURES, float(l2))
+  penalties[FEATURE_NAMES.index("bias")] = 0.0
+  return penalties
+
+def fitLeastSquares(features, outcomes, l2 = TUNING_L2):
+  """
+  Function: fitLeastSquares
+  ---------------------------
+  Parameters:
+    features - a 2D NumPy array of the samples' features, a row per sample
+    outcomes - a NumPy array of each sample's outcome (1 for a win, 0 for a loss)
+    l2 - how strongly to pull the weights (other than the bias) towards 0
+  Returns: a NumPy array of the weights (in FEATURE_NAMES order) whose
+    weighted sum of each sample's features is closest to its outcome
+    (ridge regression)
+  ---------------------------
+  """
+  features = np.asarray(features, dtype = np.float64)
+  gram = np.dot(features.T, features) + np.diag(getPenalties(l2))
+  return np.linalg.solve(gram, np.dot(features.T, np.asarray(outcomes, dtype = np.float64)))
+
+def fitLogistic(features, outcomes, l2 = TUNING_L2, maxIterations = 50, tolerance = 1e-8):
+  """
+  Function: fitLogistic
+  ---------------------------
+  Parameters:
+    features - a 2D NumPy array of the samples' features, a row per sample
+    outcomes - a NumPy array of each sample's outcome (1 for a win, 0 for a loss)
+    l2 - how strongly to pull the weights (other than the bias) towards 0
+    maxIterations - the most Newton steps to take
+    tolerance - the largest change in a weight at which to stop
+  Returns: a NumPy array of the weights (in FEATURE_NAMES order) for which
+    the weighted sum of a sample's features best predicts the log odds of
+    its player winning (regularized logistic regression, fit by Newton's
+    method)
+  ---------------------------
+  """
+  features = np.asarray(features, dtype = np.float64)
+  outcomes = np.asarray(outcomes, dtype = np.float64)
+  penalties = getPenalties(l2)
+  weights = np.zeros(NUM_FEATURES)
+  for i in xrange(maxIterations):
+    predictions = 1.0 / (1.0 + np.exp(-np.dot(features, weights)))
+    gradient = np.dot(features.T, predictions - outcomes) + penalties * weights
+    hessian = np.dot(features.T * (predictions * (1 - predictions)), features) + np.diag(penalties)
+    step = np.linalg.solve(hessian, gradient)
+    weights -= step
+    if np.abs(step).max() < tolerance:
+      break
+  return weights
+
+# The ways fitWeights can fit weights, by name
+FIT_METHODS = {"logistic": fitLogistic, "leastSquares": fitLeastSquares}
+
+def fitWeights(samples, method = "logistic", l2 = TUNING_L2):
+  """
+  Function: fitWeights
+  ---------------------------
+  Parameters:
+    samples - the columns of some samples (see loadSamples)
+    method - how to fit the weights, one of FIT_METHODS
+    l2 - how strongly to pull the weights (other than the bias) towards 0
+  Returns: a LinearEvaluator with weights fit to the samples from games
+    that were won (samples from games that were cut off are left out)
+  ---------------------------
+  """
+  if method not in FIT_METHODS:
+    raise Exception("Unknown way of fitting weights: " + str(method))
+  finished = samples["outcomes"] != UNFINISHED_OUTCOME
+  if not finished.any():
+    raise Exception("None of the samples are from finished games")
+  weights = FIT_METHODS[method](samples["features"][finished], samples["outcomes"][finished], l2)
+  return LinearEvaluator(dict(zip(FEATURE_NAMES, weights)))
+
+def getPredictionAccuracy(evaluator, samples, threshold):
+  """
+  Function: getPredictionAccuracy
+  ---------------------------
+  Parameters:
+    evaluator - a LinearEvaluator
+    samples - the columns of some samples (see loadSamples)
+    threshold - the value above which a position counts as a predicted win
+      (0 for logistic weights, 0.5 for least squares ones)
+  Returns: the fraction of the samples from finished games whose outcome
+    the evaluator predicts
+  ---------------------------
+  """
+  finished = samples["outcomes"] != UNFINISHED_OUTCOME
+  values = evaluator.scoreFeatures([samples["features"][finished]])
+  return np.mean((values > threshold) == (samples["outcomes"][finished] == 1))
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description = "Tunes the weights of the linear evaluation function "
+    "(see linearEvaluation.py) from games the agents play against each other.")
+  subparsers = parser.add_subparsers(dest = "command")
+  generateParser = subparsers.add_parser("generate", help = "play games and save samples of their positions")
+  generateParser.add_argument("samples", help = "the .npz file to save the samples to")
+  generateParser.add_argument("-n", "--games", type = int, default = NUM_ITERATIONS, help = "the number of games to play")
+  generateParser.add_argument("-c", "--players", type = int, nargs = 2, default = SELF_PLAY_PLAYERS,
+    help = "the createPlayer codes of the two players (default: %(default)s)")
+  generateParser.add_argument("-p", "--processes", type = int, default = None, help = "the number of games to play at once (default: one per CPU)")
+  generateParser.add_argument("-s", "--seed", type = int, default = 0, help = "the seed of the first game")
+  generateParser.add_argument("-d", "--depth", type = int, default = None, help = "the depth of the search agents (default: DEPTH)")
+  fitParser = subparsers.add_parser("fit", help = "fit weights to saved samples")
+  fitParser.add_argument("samples", nargs = "+", help = "the .npz files of samples to fit to")
+  fitParser.add_argument("-o", "--output", default = None,
+    help = "the file to save the weights to (default: " + LINEAR_EVAL_WEIGHTS + ", which the linear agents use)")
+  fitParser.add_argument("-m", "--method", choices = sorted(FIT_METHODS), default = "logistic", help = "how to fit the weights")
+  fitParser.add_argument("--l2", type = float, default = TUNING_L2, help = "how strongly to pull the weights towards 0")
+  args = parser.parse_args()
+
+  startTime = time.time()
+  if args.command == "generate":
+    numSamples = generateSamples(args.samples, args.games, args.players, args.processes, args.seed, args.depth,
+      verbose = True)
+    print "Saved " + str(numSamples) + " samples to " + args.samples
+  else:
+    samples = loadSamples(args.samples)
+    evaluator = fitWeights(samples, args.method, args.l2)
+    output = args.output if args.output is not None else getDefaultWeightsPath()
+    numGames = len(np.unique(samples["gameIds"]))
+    evaluator.save(output, comment = "Fit by " + args.method + " regression to " + str(len(samples["outcomes"])) +
+      " positions from " + str(numGames) + " games (see weightTuning.py)")
+    threshold = 0.0 if args.method == "logistic" else 0.5
+    print "Predicts the winner of %.1f%% of the positions" % (100 * getPredictionAccuracy(evaluator, samples, threshold))
+    print "Saved the weights to " + output
+  print "Total elapsed time: %.1f seconds" % (time.time() - startTime)